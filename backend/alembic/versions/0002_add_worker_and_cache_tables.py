@@ -0,0 +1,244 @@
+"""Add the tables and indexes the baseline schema did not have
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:35:50.118204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# Kept in sync with app.utils.spatial, which creates it for create_all databases
+POSTGIS_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS ix_addresses_geography ON addresses USING gist "
+    "((geography(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326))))"
+)
+ENUM_NAMES = ("distancefailurereason", "distancejobkind", "distancejobstatus")
+
+
+def postgis_installed(bind) -> bool:
+    if bind.dialect.name != "postgresql":
+        return False
+    return (
+        bind.execute(
+            sa.text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+        ).first()
+        is not None
+    )
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A database stamped at 0001 may have been made by create_all after some of
+    # these were added to the models, so only create what is missing
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    def index_names(table):
+        return {index["name"] for index in inspector.get_indexes(table)}
+
+    if "distance_jobs" not in tables:
+        op.create_table(
+            "distance_jobs",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column(
+                "kind",
+                sa.Enum("HOME", "LOCATION", name="distancejobkind"),
+                nullable=False,
+            ),
+            sa.Column("target_id", sa.Integer(), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum(
+                    "PENDING", "RUNNING", "DONE", "FAILED", name="distancejobstatus"
+                ),
+                nullable=False,
+            ),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("last_error", sa.String(), nullable=True),
+            sa.Column("locked_until", sa.DateTime(), nullable=True),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        with op.batch_alter_table("distance_jobs", schema=None) as batch_op:
+            batch_op.create_index(
+                batch_op.f("ix_distance_jobs_id"), ["id"], unique=False
+            )
+            batch_op.create_index(
+                batch_op.f("ix_distance_jobs_status"), ["status"], unique=False
+            )
+
+    if "geocode_cache" not in tables:
+        op.create_table(
+            "geocode_cache",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("query_key", sa.String(), nullable=False),
+            sa.Column("longitude", sa.Float(), nullable=True),
+            sa.Column("latitude", sa.Float(), nullable=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        with op.batch_alter_table("geocode_cache", schema=None) as batch_op:
+            batch_op.create_index(
+                batch_op.f("ix_geocode_cache_id"), ["id"], unique=False
+            )
+            batch_op.create_index(
+                batch_op.f("ix_geocode_cache_query_key"), ["query_key"], unique=True
+            )
+
+    if "route_durations" not in tables:
+        op.create_table(
+            "route_durations",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("route_key", sa.String(), nullable=False),
+            sa.Column("duration_minutes", sa.Float(), nullable=True),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        with op.batch_alter_table("route_durations", schema=None) as batch_op:
+            batch_op.create_index(
+                batch_op.f("ix_route_durations_id"), ["id"], unique=False
+            )
+            batch_op.create_index(
+                batch_op.f("ix_route_durations_route_key"), ["route_key"], unique=True
+            )
+
+    if "distance_failures" not in tables:
+        op.create_table(
+            "distance_failures",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("source_home_id", sa.Integer(), nullable=True),
+            sa.Column("destination_location_id", sa.Integer(), nullable=True),
+            sa.Column(
+                "reason",
+                sa.Enum(
+                    "UNROUTABLE", "OUT_OF_RANGE", "ERROR", name="distancefailurereason"
+                ),
+                nullable=False,
+            ),
+            sa.Column("error", sa.String(), nullable=True),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.ForeignKeyConstraint(
+                ["destination_location_id"], ["locations.id"], ondelete="CASCADE"
+            ),
+            sa.ForeignKeyConstraint(
+                ["source_home_id"], ["homes.id"], ondelete="CASCADE"
+            ),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("source_home_id", "destination_location_id"),
+        )
+        with op.batch_alter_table("distance_failures", schema=None) as batch_op:
+            batch_op.create_index(
+                batch_op.f("ix_distance_failures_id"), ["id"], unique=False
+            )
+
+    if "ix_addresses_latitude_longitude" not in index_names("addresses"):
+        with op.batch_alter_table("addresses", schema=None) as batch_op:
+            batch_op.create_index(
+                "ix_addresses_latitude_longitude",
+                ["latitude", "longitude"],
+                unique=False,
+            )
+
+    distance_index = "ix_distances_source_home_id_walking_distance_minutes"
+    if distance_index not in index_names("distances"):
+        with op.batch_alter_table("distances", schema=None) as batch_op:
+            batch_op.create_index(
+                distance_index,
+                ["source_home_id", "walking_distance_minutes", "id"],
+                unique=False,
+            )
+
+    if postgis_installed(op.get_bind()):
+        op.execute(POSTGIS_INDEX_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_addresses_geography")
+    with op.batch_alter_table("distances", schema=None) as batch_op:
+        batch_op.drop_index("ix_distances_source_home_id_walking_distance_minutes")
+
+    with op.batch_alter_table("addresses", schema=None) as batch_op:
+        batch_op.drop_index("ix_addresses_latitude_longitude")
+
+    with op.batch_alter_table("distance_failures", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_distance_failures_id"))
+
+    op.drop_table("distance_failures")
+    with op.batch_alter_table("route_durations", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_route_durations_route_key"))
+        batch_op.drop_index(batch_op.f("ix_route_durations_id"))
+
+    op.drop_table("route_durations")
+    with op.batch_alter_table("geocode_cache", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_geocode_cache_query_key"))
+        batch_op.drop_index(batch_op.f("ix_geocode_cache_id"))
+
+    op.drop_table("geocode_cache")
+    with op.batch_alter_table("distance_jobs", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_distance_jobs_status"))
+        batch_op.drop_index(batch_op.f("ix_distance_jobs_id"))
+
+    op.drop_table("distance_jobs")
+
+    # PostgreSQL keeps enum types around after their tables are dropped
+    for name in ENUM_NAMES:
+        sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,85 @@
+"""Index foreign keys and make distance pairs unique
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:36:00.605818
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNIQUE_PAIR = "uq_distances_source_home_id_destination_location_id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the oldest row of any duplicated pair so the constraint can be added
+    op.execute(
+        sa.text(
+            "DELETE FROM distances WHERE id NOT IN ("
+            "SELECT MIN(id) FROM distances "
+            "GROUP BY source_home_id, destination_location_id)"
+        )
+    )
+    with op.batch_alter_table("distances", schema=None) as batch_op:
+        batch_op.create_unique_constraint(
+            UNIQUE_PAIR, ["source_home_id", "destination_location_id"]
+        )
+        batch_op.create_index(
+            batch_op.f("ix_distances_destination_location_id"),
+            ["destination_location_id"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("distance_failures", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_distance_failures_destination_location_id"),
+            ["destination_location_id"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("homes", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_homes_address_id"), ["address_id"], unique=False
+        )
+        batch_op.create_index(
+            batch_op.f("ix_homes_creation_user_id"), ["creation_user_id"], unique=False
+        )
+
+    with op.batch_alter_table("locations", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_locations_address_id"), ["address_id"], unique=False
+        )
+        batch_op.create_index(
+            batch_op.f("ix_locations_creation_user_id"),
+            ["creation_user_id"],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("locations", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_locations_creation_user_id"))
+        batch_op.drop_index(batch_op.f("ix_locations_address_id"))
+
+    with op.batch_alter_table("homes", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_homes_creation_user_id"))
+        batch_op.drop_index(batch_op.f("ix_homes_address_id"))
+
+    with op.batch_alter_table("distance_failures", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_distance_failures_destination_location_id"))
+
+    with op.batch_alter_table("distances", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_distances_destination_location_id"))
+        batch_op.drop_constraint(UNIQUE_PAIR, type_="unique")
@@ -0,0 +1,76 @@
+"""Add home location rankings
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:38:45.472554
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "home_location_rankings",
+        sa.Column("home_id", sa.Integer(), nullable=False),
+        sa.Column("location_id", sa.Integer(), nullable=False),
+        sa.Column("walking_distance_minutes", sa.Integer(), nullable=False),
+        sa.Column("location_name", sa.String(), nullable=False),
+        sa.Column("price_estimate_min", sa.Integer(), nullable=False),
+        sa.Column("price_estimate_max", sa.Integer(), nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["home_id"], ["homes.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["location_id"], ["locations.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("home_id", "location_id"),
+    )
+    with op.batch_alter_table("home_location_rankings", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_home_location_rankings_home_id_walking_distance_minutes",
+            ["home_id", "walking_distance_minutes", "location_id"],
+            unique=False,
+        )
+        batch_op.create_index(
+            batch_op.f("ix_home_location_rankings_location_id"),
+            ["location_id"],
+            unique=False,
+        )
+
+    # Fill it from the distances computed so far
+    op.execute(
+        sa.text(
+            "INSERT INTO home_location_rankings (home_id, location_id, "
+            "walking_distance_minutes, location_name, price_estimate_min, "
+            "price_estimate_max, city, latitude, longitude) "
+            "SELECT distances.source_home_id, distances.destination_location_id, "
+            "distances.walking_distance_minutes, locations.name, "
+            "locations.price_estimate_min, locations.price_estimate_max, "
+            "addresses.city, addresses.latitude, addresses.longitude "
+            "FROM distances "
+            "JOIN locations ON locations.id = distances.destination_location_id "
+            "JOIN addresses ON addresses.id = locations.address_id"
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("home_location_rankings", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_home_location_rankings_location_id"))
+        batch_op.drop_index(
+            "ix_home_location_rankings_home_id_walking_distance_minutes"
+        )
+
+    op.drop_table("home_location_rankings")
@@ -0,0 +1,33 @@
+"""Index distance jobs by kind and target
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:12:31.208443
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("distance_jobs", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_distance_jobs_kind_target_id_id",
+            ["kind", "target_id", "id"],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("distance_jobs", schema=None) as batch_op:
+        batch_op.drop_index("ix_distance_jobs_kind_target_id_id")
@@ -0,0 +1,68 @@
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from ..services.response_cache import make_etag, response_cache
+
+_adapters = {}
+
+
+def _serialise(response_model: Any, content: Any) -> bytes:
+    # Same validation and JSON as FastAPI's response_model, done once per miss
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match compares weakly, so W/"x" matches "x"
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def _response(request: Request, etag: str, body: bytes) -> Response:
+    # no-cache: clients may keep the body but must revalidate it every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def cached_response(
+    request: Request,
+    namespaces: Iterable[str],
+    response_model: Any,
+    load: Callable[[], Awaitable[Any]],
+    cacheable: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """
+    Serve a GET from the response cache, answering If-None-Match with a 304.
+
+    On a miss `load` is awaited to build the content, which is serialised as `response_model`
+    and cached unless `cacheable` says otherwise. Errors are raised from `load`
+    as HTTPException and never cached. The cache is invalidated through
+    response_cache.invalidate by the CRUD functions touching `namespaces`.
+    """
+    if not response_cache.enabled:
+        return await load()
+
+    key = await response_cache.key(str(request.url), namespaces)
+    if key is None:
+        # The backend is unavailable, serve the request uncached
+        return await load()
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return _response(request, *cached)
+
+    content = await load()
+    body = _serialise(response_model, content)
+    etag = make_etag(body)
+    if cacheable is None or cacheable(content):
+        await response_cache.set(key, etag, body)
+    return _response(request, etag, body)
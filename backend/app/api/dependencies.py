@@ -1,30 +1,35 @@
 import os
+import secrets
 from datetime import datetime, timedelta
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.roles import Role
 from ..models.user import User
 from ..schemas.auth import TokenData
-from ..services.openrouteservice import OpenRouteServiceClient
-from ..utils.database import SessionLocal
+from ..services.routing import RoutingClient
+from ..services.user_cache import user_cache
+from ..utils.database import AsyncSessionLocal
 
 SECRET_KEY = os.getenv("AUTH_HASH_SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 240
+# Put the user's role in new tokens, so require_role needs no query. A role
+# change then only applies to tokens issued after it.
+AUTH_TOKEN_ROLE_CLAIMS = os.getenv("AUTH_TOKEN_ROLE_CLAIMS", "false").lower() == "true"
+
+# Bearer token Prometheus scrapes /metrics with, which is closed while unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/signin")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -36,42 +41,81 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    print("Handling get current user")
-    credentials_exception = HTTPException(
+def token_claims(user: User) -> dict:
+    claims = {"sub": str(user.id)}
+    if AUTH_TOKEN_ROLE_CLAIMS:
+        claims["role"] = Role(user.role).value
+    return claims
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def get_token_data(token: str = Depends(oauth2_scheme)) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int = int(payload.get("sub"))
-        token_data = TokenData(user_id=user_id)
-    except JWTError:
-        raise credentials_exception
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+        role = payload.get("role")
+        return TokenData(user_id=user_id, role=Role(role) if role else None)
+    except (JWTError, TypeError, ValueError):
+        raise _credentials_exception()
+
+
+async def get_current_user(
+    token_data: TokenData = Depends(get_token_data), db: AsyncSession = Depends(get_db)
+) -> User:
+    # A copy not attached to the request's session, see UserCache
+    user = await user_cache.get_user(db, token_data.user_id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
+async def get_current_role(
+    token_data: TokenData = Depends(get_token_data), db: AsyncSession = Depends(get_db)
+) -> Role:
+    # Tokens issued without role claims (or before they were turned on) still work
+    if AUTH_TOKEN_ROLE_CLAIMS and token_data.role is not None:
+        return token_data.role
+    return (await get_current_user(token_data, db)).role
+
+
 def require_role(required_role: Role):
     role_to_index = {role: index for index, role in enumerate(Role)}
     required_role_index = role_to_index[required_role]
 
-    def role_dependency(current_user: User = Depends(get_current_user)):
-        current_role_index = role_to_index[current_user.role]
+    def role_dependency(current_role: Role = Depends(get_current_role)):
+        current_role_index = role_to_index[current_role]
         if current_role_index < required_role_index:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Operation not permitted for your role.",
             )
-        return current_user
+        return current_role
 
     return role_dependency
 
 
-def get_ors_client():
-    return OpenRouteServiceClient()
+def get_ors_client(request: Request) -> RoutingClient:
+    # Shared by every request so they reuse one connection pool, see main.lifespan.
+    # Which backend it is (ORS or the offline one) is set by ROUTING_BACKEND.
+    return request.app.state.ors_client
+
+
+def require_metrics_token(request: Request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if (
+        not METRICS_TOKEN
+        or scheme.lower() != "bearer"
+        or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="A valid metrics token is required.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,94 @@
+import re
+import time
+import uuid
+
+from ..services.metrics import (
+    RequestQueries,
+    current_request_queries,
+    db_queries_per_request,
+    http_request_duration,
+    http_requests,
+    route_label,
+)
+from ..utils.log import request_id
+
+REQUEST_ID_HEADER = b"x-request-id"
+# IDs from a proxy or client are kept if they look like one, to follow a request
+# through every service it passed through
+_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestIdMiddleware:
+    """
+    Gives each HTTP request an ID, added to its log records and returned in
+    the X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        if _REQUEST_ID_PATTERN.fullmatch(incoming):
+            current_id = incoming
+        else:
+            current_id = uuid.uuid4().hex
+        token = request_id.set(current_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER, current_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    Records each HTTP request's latency, status code and SQL statement count,
+    labelled by route template.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, which would run the
+    app in another task and lose the context track_queries counts in.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = current_request_queries.set(queries)
+        status = 500  # Unless a response starts before an exception
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_queries.reset(token)
+            # Routing sets scope["route"], so the label is only known now
+            method = scope["method"]
+            route = route_label(scope)
+            http_requests.inc(method=method, route=route, status=status)
+            http_request_duration.observe(elapsed, method=method, route=route)
+            db_queries_per_request.observe(queries.count, method=method, route=route)
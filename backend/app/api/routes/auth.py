@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ... import crud, schemas
-from ...utils.hashing import verify_password
-from ..dependencies import create_access_token, get_db
+from ..dependencies import create_access_token, get_db, token_claims
 
 router = APIRouter(
     prefix="/auth",
@@ -12,17 +11,20 @@ router = APIRouter(
 
 
 @router.post("/signup", response_model=schemas.UserRead)
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.user.get_user_by_email(db, email=user.email)
+async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.user.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.user.create_user(db=db, user=user)
+    return await crud.user.create_user(db=db, user=user)
 
 
 @router.post("/signin", response_model=schemas.SignInResponse)
-def signin(form_data: schemas.UserSignIn, db: Session = Depends(get_db)):
-    user = crud.user.get_user_by_email(db, email=form_data.email)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def signin(form_data: schemas.UserSignIn, db: AsyncSession = Depends(get_db)):
+    # Hashing runs on its own executor, see utils.hashing
+    user = await crud.user.authenticate_user(
+        db, email=form_data.email, password=form_data.password
+    )
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=token_claims(user))
     return {"access_token": access_token, "token_type": "bearer", "user": user}
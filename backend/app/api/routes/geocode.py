@@ -1,8 +1,15 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...schemas.geocode import GeocodeSearchInput, GeocodeSearchOutput
+from ... import models
+from ...schemas.geocode import (
+    GeocodeCacheStats,
+    GeocodeSearchInput,
+    GeocodeSearchOutput,
+)
+from ...services.geocode_cache import geocode_cache
 from ...services.openrouteservice import OpenRouteServiceClient
-from ..dependencies import get_current_user
+from ..dependencies import get_current_user, get_db, get_ors_client, require_role
 
 router = APIRouter(
     prefix="/geocode",
@@ -15,7 +22,25 @@ router = APIRouter(
     response_model=GeocodeSearchOutput,
     dependencies=[Depends(get_current_user)],
 )
-def search_geolocation(search: GeocodeSearchInput):
-    ors_client = OpenRouteServiceClient()
-    (long, lat) = ors_client.get_coordinates(search.search_term)
+async def search_geolocation(
+    search: GeocodeSearchInput,
+    db: AsyncSession = Depends(get_db),
+    ors_client: OpenRouteServiceClient = Depends(get_ors_client),
+):
+    try:
+        long, lat = await geocode_cache.get_coordinates(
+            db, search.search_term, ors_client
+        )
+    finally:
+        # Keep what the cache stored, including a search that found nothing
+        await db.commit()
     return GeocodeSearchOutput(longitude=long, latitude=lat)
+
+
+@router.get(
+    "/cache/stats",
+    response_model=GeocodeCacheStats,
+    dependencies=[Depends(require_role(models.Role.ADMIN))],
+)
+async def read_geocode_cache_stats():
+    return geocode_cache.stats()
@@ -0,0 +1,34 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import DBAPIError
+
+from ... import models
+from ...schemas.health import PoolStats, ReadinessRead
+from ...utils.database import async_engine, check_database
+from ...utils.pool import pool_stats
+from ..dependencies import require_role
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+
+@router.get("/ready", response_model=ReadinessRead)
+async def read_readiness():
+    # For load balancer and container health checks: up only if the database is
+    try:
+        await check_database()
+    except (DBAPIError, OSError):
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "ready"}
+
+
+@router.get(
+    "/db-pool",
+    response_model=PoolStats,
+    dependencies=[Depends(require_role(models.Role.ADMIN))],
+)
+async def read_db_pool_stats():
+    return {"pid": os.getpid(), **pool_stats(async_engine.pool)}
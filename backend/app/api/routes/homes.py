@@ -1,10 +1,12 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ... import crud, models, schemas
 from ...services.openrouteservice import OpenRouteServiceClient
+from ...services.response_cache import DISTANCES, HOMES
+from ..caching import cached_response
 from ..dependencies import get_current_user, get_db, get_ors_client, require_role
 
 router = APIRouter(
@@ -14,47 +16,89 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[schemas.HomeRead])
-def read_homes(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
-    users = crud.home.get_homes(db, skip=skip, limit=limit)
-    return users
+async def read_homes(
+    request: Request,
+    skip: int = 0,
+    limit: int = 1000,
+    db: AsyncSession = Depends(get_db),
+):
+    return await cached_response(
+        request,
+        [HOMES],
+        List[schemas.HomeRead],
+        lambda: crud.home.get_homes(db, skip=skip, limit=limit),
+    )
+
+
+# Registered before /{home_id}, which would otherwise match "page"
+@router.get("/page", response_model=schemas.Page[schemas.HomeRead])
+async def read_homes_page(
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await crud.home.get_homes_page(db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{home_id}", response_model=schemas.HomeRead)
-def read_location(home_id: int, db: Session = Depends(get_db)):
-    location = crud.home.get_home(db, home_id=home_id)
-    if not location:
-        raise HTTPException(status_code=404, detail="Location not found")
-    return location
+async def read_location(
+    request: Request, home_id: int, db: AsyncSession = Depends(get_db)
+):
+    async def load():
+        location = await crud.home.get_home(db, home_id=home_id)
+        if not location:
+            raise HTTPException(status_code=404, detail="Location not found")
+        return location
+
+    return await cached_response(request, [HOMES], schemas.HomeRead, load)
 
 
 @router.post("/", response_model=schemas.HomeRead)
-def create_home(
+async def create_home(
     home: schemas.HomeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
     ors_client: OpenRouteServiceClient = Depends(get_ors_client),
 ):
-    return crud.home.create_home(
+    return await crud.home.create_home(
         db=db, home=home, user_id=current_user.id, ors_client=ors_client
     )
 
 
+@router.post("/bulk", response_model=List[schemas.BulkItemResult[schemas.HomeRead]])
+async def create_homes(
+    homes: List[schemas.HomeCreate] = Body(
+        ..., min_length=1, max_length=schemas.BULK_CREATE_MAX_ITEMS
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+    ors_client: OpenRouteServiceClient = Depends(get_ors_client),
+):
+    # Homes whose address cannot be geocoded fail on their own, see the results
+    return await crud.home.create_homes(
+        db=db, homes=homes, user_id=current_user.id, ors_client=ors_client
+    )
+
+
 @router.put("/{home_id}", response_model=schemas.HomeRead)
-def update_home(
+async def update_home(
     home_id: int,
     home: schemas.HomeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
     ors_client: OpenRouteServiceClient = Depends(get_ors_client),
 ):
-    db_location = crud.home.get_home(db, home_id=home_id)
+    db_location = await crud.home.get_home(db, home_id=home_id)
     if not db_location:
         raise HTTPException(status_code=404, detail="Location not found")
     # if db_location.creation_user_id != current_user.id:
     #     raise HTTPException(
     #         status_code=403, detail="Not authorized to update this home"
     #     )
-    return crud.home.update_home(
+    return await crud.home.update_home(
         db=db,
         home=home,
         home_id=home_id,
@@ -65,13 +109,88 @@ def update_home(
 
 @router.get(
     "/{home_id}/distances",
-    response_model=List[schemas.DistanceRead],
+    response_model=schemas.HomeDistancesRead,
 )
-def get_distance(home_id: int, db: Session = Depends(get_db)):
-    distances = crud.home.get_distances(db, home_id=home_id)
-    if not distances:
-        raise HTTPException(status_code=404, detail="Distances not found")
-    return distances
+async def get_distance(
+    request: Request,
+    home_id: int,
+    max_minutes: Optional[int] = Query(None, ge=0),
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    order_by: schemas.DistanceOrder = schemas.DistanceOrder.WALKING_DISTANCE_MINUTES,
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    async def load():
+        try:
+            distances = await crud.home.get_distances(
+                db,
+                home_id=home_id,
+                max_minutes=max_minutes,
+                min_price=min_price,
+                max_price=max_price,
+                order_by=order_by,
+                limit=limit,
+                cursor=cursor,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not distances:
+            raise HTTPException(status_code=404, detail="Home not found")
+        return distances
+
+    # Clients poll this until status is no longer "pending". Pending responses
+    # are not cached, the worker may finish in another process at any moment.
+    return await cached_response(
+        request,
+        [DISTANCES],
+        schemas.HomeDistancesRead,
+        load,
+        cacheable=lambda d: d["status"] != schemas.DistancesStatus.PENDING,
+    )
+
+
+@router.get(
+    "/{home_id}/nearby",
+    response_model=List[schemas.NearbyLocationRead],
+)
+async def get_nearby_locations(
+    home_id: int,
+    radius_km: float = Query(2.0, gt=0, le=100),
+    limit: int = Query(50, gt=0, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    nearby = await crud.home.get_nearby_locations(
+        db, home_id=home_id, radius_km=radius_km, limit=limit
+    )
+    if nearby is None:
+        raise HTTPException(status_code=404, detail="Home not found")
+    return nearby
+
+
+@router.get(
+    "/{home_id}/rankings",
+    response_model=List[schemas.RankedLocationRead],
+)
+async def get_ranked_locations(
+    home_id: int,
+    max_minutes: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, gt=0, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    # Closest first, only locations whose cheapest estimate is within max_price
+    ranked = await crud.home.get_ranked_locations(
+        db,
+        home_id=home_id,
+        max_minutes=max_minutes,
+        max_price=max_price,
+        limit=limit,
+    )
+    if ranked is None:
+        raise HTTPException(status_code=404, detail="Home not found")
+    return ranked
 
 
 @router.delete(
@@ -79,9 +198,9 @@ def get_distance(home_id: int, db: Session = Depends(get_db)):
     status_code=204,
     dependencies=[Depends(require_role(models.Role.ADMIN))],
 )
-def delete_home(home_id: int, db: Session = Depends(get_db)):
-    db_home = crud.home.get_home(db, home_id=home_id)
+async def delete_home(home_id: int, db: AsyncSession = Depends(get_db)):
+    db_home = await crud.home.get_home(db, home_id=home_id)
     if not db_home:
         raise HTTPException(status_code=404, detail="Home not found")
-    crud.home.delete_home(db=db, home_id=home_id)
+    await crud.home.delete_home(db=db, home_id=home_id)
     return
@@ -1,10 +1,12 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ... import crud, models, schemas
 from ...services.openrouteservice import OpenRouteServiceClient
+from ...services.response_cache import LOCATIONS
+from ..caching import cached_response
 from ..dependencies import get_current_user, get_db, get_ors_client, require_role
 
 router = APIRouter(
@@ -14,47 +16,89 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[schemas.LocationRead])
-def read_locations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    locations = crud.locations.get_locations(db, skip=skip, limit=limit)
-    return locations
+async def read_locations(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+):
+    return await cached_response(
+        request,
+        [LOCATIONS],
+        List[schemas.LocationRead],
+        lambda: crud.locations.get_locations(db, skip=skip, limit=limit),
+    )
+
+
+# Registered before /{location_id}, which would otherwise match "page"
+@router.get("/page", response_model=schemas.Page[schemas.LocationRead])
+async def read_locations_page(
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await crud.locations.get_locations_page(db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/", response_model=schemas.LocationRead)
-def create_location(
+async def create_location(
     location: schemas.LocationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.UserRead = Depends(get_current_user),
     ors_client: OpenRouteServiceClient = Depends(get_ors_client),
 ):
-    return crud.locations.create_location(
+    return await crud.locations.create_location(
         db=db, location=location, user_id=current_user.id, ors_client=ors_client
     )
 
 
+@router.post("/bulk", response_model=List[schemas.BulkItemResult[schemas.LocationRead]])
+async def create_locations(
+    locations: List[schemas.LocationCreate] = Body(
+        ..., min_length=1, max_length=schemas.BULK_CREATE_MAX_ITEMS
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserRead = Depends(get_current_user),
+    ors_client: OpenRouteServiceClient = Depends(get_ors_client),
+):
+    # Locations whose address cannot be geocoded fail on their own, see the results
+    return await crud.locations.create_locations(
+        db=db, locations=locations, user_id=current_user.id, ors_client=ors_client
+    )
+
+
 @router.get("/{location_id}", response_model=schemas.LocationRead)
-def read_location(location_id: int, db: Session = Depends(get_db)):
-    location = crud.locations.get_location(db, location_id=location_id)
-    if not location:
-        raise HTTPException(status_code=404, detail="Location not found")
-    return location
+async def read_location(
+    request: Request, location_id: int, db: AsyncSession = Depends(get_db)
+):
+    async def load():
+        location = await crud.locations.get_location(db, location_id=location_id)
+        if not location:
+            raise HTTPException(status_code=404, detail="Location not found")
+        return location
+
+    return await cached_response(request, [LOCATIONS], schemas.LocationRead, load)
 
 
 @router.put("/{location_id}", response_model=schemas.LocationRead)
-def update_location(
+async def update_location(
     location_id: int,
     location: schemas.LocationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     ors_client: OpenRouteServiceClient = Depends(get_ors_client),
     current_user: schemas.UserRead = Depends(get_current_user),
 ):
-    db_location = crud.locations.get_location(db, location_id=location_id)
+    db_location = await crud.locations.get_location(db, location_id=location_id)
     if not db_location:
         raise HTTPException(status_code=404, detail="Location not found")
     # if db_location.creation_user_id != current_user.id:
     #     raise HTTPException(
     #         status_code=403, detail="Not authorized to update this location"
     #     )
-    return crud.locations.update_location(
+    return await crud.locations.update_location(
         db=db,
         location=location,
         location_id=location_id,
@@ -68,17 +112,17 @@ def update_location(
     status_code=204,
     dependencies=[Depends(require_role(models.Role.ADMIN))],
 )
-def delete_location(
+async def delete_location(
     location_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.UserRead = Depends(get_current_user),
 ):
-    db_location = crud.locations.get_location(db, location_id=location_id)
+    db_location = await crud.locations.get_location(db, location_id=location_id)
     if not db_location:
         raise HTTPException(status_code=404, detail="Location not found")
     # if db_location.creation_user_id != current_user.id:
     #     raise HTTPException(
     #         status_code=403, detail="Not authorized to delete this location"
     #     )
-    crud.locations.delete_location(db=db, location_id=location_id)
+    await crud.locations.delete_location(db=db, location_id=location_id)
     return
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from ...services.geocode_cache import geocode_cache
+from ...services.metrics import registry
+from ...services.response_cache import response_cache
+from ...services.route_cache import route_cache
+from ...services.user_cache import user_cache
+from ...utils.database import async_engine
+from ...utils.pool import pool_stats
+from ..dependencies import require_metrics_token
+
+router = APIRouter(
+    tags=["metrics"],
+)
+
+# Prometheus' text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+cache_lookups = registry.counter(
+    "cache_lookups_total",
+    "In-process cache lookups by cache and result (miss: fetched from the source).",
+    ("cache", "result"),
+)
+cache_entries = registry.gauge(
+    "cache_entries",
+    "Entries held in each in-process cache.",
+    ("cache",),
+)
+db_pool_connections = registry.gauge(
+    "db_pool_connections",
+    "Database connections in this process's pool by state.",
+    ("state",),
+)
+db_pool_checkouts = registry.counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the pool.",
+)
+db_pool_timeouts = registry.counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a free connection.",
+)
+db_pool_wait_seconds = registry.counter(
+    "db_pool_wait_seconds_total",
+    "Time spent waiting for a free connection.",
+)
+
+
+def collect_cache_stats():
+    response, user = response_cache.stats(), user_cache.stats()
+    geocode, route = geocode_cache.stats(), route_cache.stats()
+    for cache, result, value in (
+        ("response", "hit", response["hits"]),
+        ("response", "miss", response["misses"]),
+        ("user", "hit", user["hits"]),
+        ("user", "miss", user["misses"]),
+        ("geocode", "memory_hit", geocode["memory_hits"]),
+        ("geocode", "database_hit", geocode["database_hits"]),
+        ("geocode", "miss", geocode["provider_calls"]),
+        ("route", "memory_hit", route["memory_hits"]),
+        ("route", "database_hit", route["database_hits"]),
+        ("route", "miss", route["provider_routes"]),
+    ):
+        cache_lookups.set(value, cache=cache, result=result)
+    cache_entries.set(user["entries"], cache="user")
+    cache_entries.set(geocode["memory_entries"], cache="geocode")
+    cache_entries.set(route["memory_entries"], cache="route")
+
+
+def collect_pool_stats():
+    # SQLite's pools do not track connections, so these are PostgreSQL only
+    stats = pool_stats(async_engine.pool)
+    for state in ("checked_out", "checked_in", "overflow"):
+        if stats[state] is not None:
+            db_pool_connections.set(stats[state], state=state)
+    if stats["checkouts"] is not None:
+        db_pool_checkouts.set(stats["checkouts"])
+        db_pool_timeouts.set(stats["timeouts"])
+        db_pool_wait_seconds.set(stats["wait_seconds_total"])
+
+
+registry.add_collector(collect_cache_stats)
+registry.add_collector(collect_pool_stats)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(require_metrics_token)],
+)
+async def read_metrics():
+    # Scraped by Prometheus: request, SQL and ORS metrics for this process
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -1,7 +1,7 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ... import crud, models, schemas
 from ..dependencies import get_current_user, get_db, require_role
@@ -17,19 +17,37 @@ router = APIRouter(
     response_model=List[schemas.UserRead],
     dependencies=[Depends(require_role(models.Role.ADMIN))],
 )
-def read_users(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
-    users = crud.user.get_users(db, skip=skip, limit=limit)
+async def read_users(
+    skip: int = 0, limit: int = 1000, db: AsyncSession = Depends(get_db)
+):
+    users = await crud.user.get_users(db, skip=skip, limit=limit)
     return users
 
 
+@router.get(
+    "/page",
+    response_model=schemas.Page[schemas.UserRead],
+    dependencies=[Depends(require_role(models.Role.ADMIN))],
+)
+async def read_users_page(
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        return await crud.user.get_users_page(db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.put("/{user_id}", response_model=schemas.UserRead)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    updating_user = crud.user.get_user(db, user_id=user_id)
+    updating_user = await crud.user.get_user(db, user_id=user_id)
     if not updating_user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -57,7 +75,7 @@ def update_user(
         )
 
     # Root users can update any user's profile
-    updated_user = crud.user.update_user(
+    updated_user = await crud.user.update_user(
         db, updating_user=updating_user, user_update=user_update
     )
     return updated_user
@@ -72,10 +90,10 @@ def update_user(
         404: {"description": "User not found"},
     },
 )
-def deleter_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.user.get_user(db, user_id=user_id)
+async def deleter_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.user.get_user(db, user_id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    crud.user.delete_user(db=db, user_id=user_id)
+    await crud.user.delete_user(db=db, user_id=user_id)
     return
@@ -1,26 +1,43 @@
-from typing import Union
+from typing import List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy.orm import Session
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
+from ..services.circuit_breaker import CircuitOpenError
+from ..services.geocode_cache import geocode_cache, normalize_geocode_query
 from ..services.openrouteservice import OpenRouteServiceClient
 
+# Fields that make up the text of an address, and so its geocoded coordinates
+ADDRESS_FIELDS = ("street", "city", "postal_code", "country")
+
 
 def sqlalchemy_object_to_dict(obj):
     """Converts SQLAlchemy model object to a dictionary."""
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
 
 
-def get_coordinates(
-    address_data: schemas.AddressCreate, ors_client: OpenRouteServiceClient
+def address_query(address_data: schemas.AddressCreate) -> str:
+    """The text an address is geocoded from."""
+    return (
+        f"{address_data.street}, {address_data.city}, "
+        f"{address_data.postal_code}, {address_data.country}"
+    )
+
+
+async def get_coordinates(
+    db: AsyncSession,
+    address_data: schemas.AddressCreate,
+    ors_client: OpenRouteServiceClient,
 ):
-    return ors_client.get_coordinates(
-        f"{address_data.street}, {address_data.city}, {address_data.postal_code}, {address_data.country}"
+    return await geocode_cache.get_coordinates(
+        db, address_query(address_data), ors_client
     )
 
 
-def create_address(
-    db: Session,
+async def create_address(
+    db: AsyncSession,
     address_data: schemas.AddressCreate,
     ors_client: OpenRouteServiceClient,
 ) -> schemas.AddressRead:
@@ -29,46 +46,114 @@ def create_address(
 
     # If no coordinates given in input then this will attempt to find them itself
     if address_data.latitude is None or address_data.longitude is None:
-        (long, lat) = get_coordinates(address_data, ors_client)
+        long, lat = await get_coordinates(db, address_data, ors_client)
         address_dict["latitude"] = lat
         address_dict["longitude"] = long
 
     db_address = models.Address(**address_dict)
     db.add(db_address)
-    db.commit()
-    db.refresh(db_address)
+    await db.commit()
+    await db.refresh(db_address)
 
     return db_address
 
 
-def update_address(
-    db: Session,
+async def create_addresses(
+    db: AsyncSession,
+    addresses: Sequence[schemas.AddressCreate],
+    ors_client: OpenRouteServiceClient,
+) -> List[Tuple[Optional[int], Optional[str]]]:
+    """
+    Insert many addresses in one statement, geocoding each distinct address
+    without coordinates once. Returns (address id, None) for each address, or
+    (None, error) for those that could not be geocoded and were left out.
+    Does not commit.
+    """
+    coordinates = {}
+    rows = []
+    errors = []
+    for address_data in addresses:
+        row = address_data.model_dump()
+        error = None
+        if address_data.latitude is None or address_data.longitude is None:
+            key = normalize_geocode_query(address_query(address_data))
+            if key not in coordinates:
+                try:
+                    coordinates[key] = await get_coordinates(
+                        db, address_data, ors_client
+                    )
+                except (ValueError, httpx.HTTPError, CircuitOpenError) as e:
+                    # Kept, so repeats of the address fail without asking again
+                    coordinates[key] = e
+            if isinstance(coordinates[key], Exception):
+                error = str(coordinates[key]) or repr(coordinates[key])
+            else:
+                row["longitude"], row["latitude"] = coordinates[key]
+        errors.append(error)
+        if error is None:
+            rows.append(row)
+
+    address_ids = []
+    if rows:
+        address_ids = (
+            await db.scalars(
+                insert(models.Address).returning(
+                    models.Address.id, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+        ).all()
+    address_ids = iter(address_ids)
+    return [(None, error) if error else (next(address_ids), None) for error in errors]
+
+
+def address_changed(
+    db_address: models.Address, address_data: schemas.AddressCreate
+) -> bool:
+    """Whether applying address_data would move db_address."""
+    if any(
+        getattr(db_address, field) != getattr(address_data, field)
+        for field in ADDRESS_FIELDS
+    ):
+        return True
+    # Coordinates left out by the caller keep their stored values
+    if address_data.latitude is None or address_data.longitude is None:
+        return False
+    return (address_data.latitude, address_data.longitude) != (
+        db_address.latitude,
+        db_address.longitude,
+    )
+
+
+async def update_address(
+    db: AsyncSession,
     address_data: Union[schemas.AddressCreate, dict],
     existing_address_id: int,
     ors_client: OpenRouteServiceClient,
 ) -> schemas.AddressRead:
-    # Get coordinates based on the address data
-    (long, lat) = get_coordinates(address_data, ors_client)
-
     # Query the existing address by ID
-    db_address = (
-        db.query(models.Address)
-        .filter(models.Address.id == existing_address_id)
-        .first()
-    )
+    db_address = await db.get(models.Address, existing_address_id)
 
     if hasattr(address_data, "model_dump"):
         address_data_dict = address_data.model_dump()
     else:
         address_data_dict = sqlalchemy_object_to_dict(address_data)
 
+    # Nothing to geocode or save if the address has not changed
+    if not address_changed(db_address, address_data):
+        return db_address
+
+    # Like create_address, only look up coordinates if none were given
+    if address_data.latitude is None or address_data.longitude is None:
+        long, lat = await get_coordinates(db, address_data, ors_client)
+        address_data_dict["latitude"] = lat
+        address_data_dict["longitude"] = long
+
     # Update fields
-    db_address.longitude = long
-    db_address.latitude = lat
     for key, value in address_data_dict.items():
         setattr(db_address, key, value)
 
-    db.commit()
-    db.refresh(db_address)
+    await db.commit()
+    await db.refresh(db_address)
 
     return db_address
@@ -0,0 +1,47 @@
+import os
+from typing import List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import DistanceFailure, DistanceFailureReason
+from ..schemas.distance import FailedDistance
+from ..utils.upsert import insert_for
+
+# Pairs that keep erroring are given up on after this many tries
+DISTANCE_FAILURE_MAX_ATTEMPTS = int(os.getenv("DISTANCE_FAILURE_MAX_ATTEMPTS", "5"))
+
+
+async def record_distance_failures(db: AsyncSession, failed: List[FailedDistance]):
+    """
+    Add failed pairs, without committing, for the retry sweep to pick up. A
+    pair already recorded (e.g. by a job running at the same time) is replaced.
+    """
+    if failed:
+        stmt = insert_for(db, DistanceFailure)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["source_home_id", "destination_location_id"],
+                set_={
+                    "reason": stmt.excluded.reason,
+                    "error": stmt.excluded.error,
+                    "attempts": stmt.excluded.attempts,
+                    "updated_at": func.now(),
+                },
+            ),
+            [failure.model_dump() for failure in failed],
+        )
+
+
+async def get_retryable_failures(db: AsyncSession, limit: int) -> List[DistanceFailure]:
+    return (
+        await db.scalars(
+            select(DistanceFailure)
+            .where(
+                DistanceFailure.reason == DistanceFailureReason.ERROR,
+                DistanceFailure.attempts < DISTANCE_FAILURE_MAX_ATTEMPTS,
+            )
+            .order_by(DistanceFailure.updated_at, DistanceFailure.id)
+            .limit(limit)
+        )
+    ).all()
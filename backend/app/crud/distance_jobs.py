@@ -0,0 +1,176 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from ..models import DistanceJob, DistanceJobKind, DistanceJobStatus
+
+# How long a worker may hold a job before another worker can pick it up again
+JOB_LEASE_SECONDS = int(os.getenv("DISTANCE_JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("DISTANCE_JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs are deleted by the worker once they are this old
+JOB_RETENTION_SECONDS = int(os.getenv("DISTANCE_JOB_RETENTION_SECONDS", "86400"))
+
+UNFINISHED_STATUSES = (DistanceJobStatus.PENDING, DistanceJobStatus.RUNNING)
+
+
+async def enqueue_distance_job(db: AsyncSession, kind: DistanceJobKind, target_id: int):
+    # A job that has not started yet will already pick up the latest state
+    db_job = await db.scalar(
+        select(DistanceJob)
+        .where(
+            DistanceJob.kind == kind,
+            DistanceJob.target_id == target_id,
+            DistanceJob.status == DistanceJobStatus.PENDING,
+        )
+        .limit(1)
+    )
+    if db_job:
+        return db_job
+
+    db_job = DistanceJob(kind=kind, target_id=target_id)
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+
+async def enqueue_new_distance_jobs(
+    db: AsyncSession, kind: DistanceJobKind, target_ids: Sequence[int]
+):
+    """
+    Queue a job for each of `target_ids` in one INSERT. Only for homes or
+    locations just created, which cannot have a pending job already.
+    """
+    if target_ids:
+        await db.execute(
+            insert(DistanceJob),
+            [{"kind": kind, "target_id": target_id} for target_id in target_ids],
+        )
+        await db.commit()
+
+
+def _claimable_jobs():
+    return select(DistanceJob).where(
+        or_(
+            DistanceJob.status == DistanceJobStatus.PENDING,
+            (DistanceJob.status == DistanceJobStatus.RUNNING)
+            & (DistanceJob.locked_until < datetime.utcnow()),
+        )
+    )
+
+
+async def claim_next_jobs(db: AsyncSession, limit: int) -> List[DistanceJob]:
+    """
+    Claim up to `limit` jobs of the same kind as the oldest claimable one, so
+    the worker can compute their distances together.
+    """
+    oldest = await db.scalar(
+        _claimable_jobs()
+        .order_by(DistanceJob.id)
+        .limit(1)
+        # Lets several workers poll the same table without claiming the same job
+        .with_for_update(skip_locked=True)
+    )
+    if oldest is None:
+        return []
+    db_jobs = [oldest]
+    if limit > 1:
+        db_jobs += (
+            await db.scalars(
+                _claimable_jobs()
+                .where(DistanceJob.kind == oldest.kind, DistanceJob.id > oldest.id)
+                .order_by(DistanceJob.id)
+                .limit(limit - 1)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+
+    locked_until = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+    for db_job in db_jobs:
+        db_job.status = DistanceJobStatus.RUNNING
+        db_job.attempts += 1
+        db_job.locked_until = locked_until
+    await db.commit()
+    return db_jobs
+
+
+async def complete_job(db: AsyncSession, db_job: DistanceJob):
+    db_job.status = DistanceJobStatus.DONE
+    db_job.last_error = None
+    db_job.locked_until = None
+    await db.commit()
+
+
+async def fail_job(db: AsyncSession, db_job: DistanceJob, error: str):
+    # Put the job back in the queue until it has used up its attempts
+    if db_job.attempts < JOB_MAX_ATTEMPTS:
+        db_job.status = DistanceJobStatus.PENDING
+    else:
+        db_job.status = DistanceJobStatus.FAILED
+    db_job.last_error = error
+    db_job.locked_until = None
+    await db.commit()
+
+
+async def has_unfinished_job(db: AsyncSession, kind: DistanceJobKind, target_id: int):
+    return (
+        await db.scalar(
+            select(DistanceJob.id)
+            .where(
+                DistanceJob.kind == kind,
+                DistanceJob.target_id == target_id,
+                DistanceJob.status.in_(UNFINISHED_STATUSES),
+            )
+            .limit(1)
+        )
+        is not None
+    )
+
+
+async def last_job_failed(db: AsyncSession, kind: DistanceJobKind, target_id: int):
+    # Uses ix_distance_jobs_kind_target_id_id
+    last_job = await db.scalar(
+        select(DistanceJob)
+        .where(DistanceJob.kind == kind, DistanceJob.target_id == target_id)
+        .order_by(DistanceJob.id.desc())
+        .limit(1)
+    )
+    return last_job is not None and last_job.status == DistanceJobStatus.FAILED
+
+
+async def purge_finished_jobs(db: AsyncSession) -> int:
+    """
+    Delete jobs done more than JOB_RETENTION_SECONDS ago, and failed jobs a
+    later job for the same home or location has replaced. Returns how many.
+    """
+    later_job = aliased(DistanceJob)
+    replaced = (
+        select(later_job.id)
+        .where(
+            later_job.kind == DistanceJob.kind,
+            later_job.target_id == DistanceJob.target_id,
+            later_job.id > DistanceJob.id,
+        )
+        .exists()
+    )
+    # Replaced failures first, while the jobs that replaced them still exist
+    failed = await db.execute(
+        delete(DistanceJob)
+        .where(DistanceJob.status == DistanceJobStatus.FAILED, replaced)
+        .execution_options(synchronize_session=False)
+    )
+    done = await db.execute(
+        delete(DistanceJob)
+        .where(
+            DistanceJob.status == DistanceJobStatus.DONE,
+            DistanceJob.updated_at
+            < datetime.now(timezone.utc) - timedelta(seconds=JOB_RETENTION_SECONDS),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return failed.rowcount + done.rowcount
@@ -1,81 +1,378 @@
-from sqlalchemy.orm import Session
+import os
+from collections import defaultdict
+from typing import List, Sequence, Tuple
 
-from ..models import Distance, Home, Location
+import httpx
+import numpy as np
+from sqlalchemy import column, delete, func, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from ..models import (
+    Address,
+    Distance,
+    DistanceFailure,
+    DistanceFailureReason,
+    DistanceJob,
+    DistanceJobKind,
+    Home,
+    Location,
+)
+from ..schemas.distance import DistanceFanOutResult, DistancesStatus, FailedDistance
 from ..schemas.home import HomeRead
 from ..schemas.location import LocationRead
+from ..services.circuit_breaker import CircuitOpenError
 from ..services.openrouteservice import OpenRouteServiceClient
+from ..services.response_cache import DISTANCES, response_cache
+from ..services.route_cache import route_cache
+from ..utils.geo import haversine_km_matrix
+from ..utils.spatial import bounding_box
+from ..utils.upsert import insert_for
+from .distance_failures import get_retryable_failures, record_distance_failures
+from .distance_jobs import (
+    UNFINISHED_STATUSES,
+    enqueue_distance_job,
+    has_unfinished_job,
+    last_job_failed,
+)
+from .rankings import (
+    refresh_home_rankings,
+    refresh_homes_rankings,
+    refresh_locations_rankings,
+)
+
+# Below this many rows a plain executemany is as quick as setting up a COPY
+COPY_MIN_ROWS = 1000
+# Pairs further apart than this in a straight line are not sent to the router,
+# the walking route can only be longer. 0 turns the check off.
+DISTANCE_MAX_KM = float(os.getenv("DISTANCE_MAX_KM", "20"))
+
+
+def address_coordinates(entity):
+    return (entity.address.longitude, entity.address.latitude)
+
+
+DISTANCE_COLUMNS = [
+    "source_home_id",
+    "destination_location_id",
+    "walking_distance_minutes",
+]
 
 
-def get_distance_minutes(
-    home: HomeRead, location: LocationRead, ors_client: OpenRouteServiceClient
-):
-    return ors_client.get_route_duration_minutes(
-        start_long=home.address.longitude,
-        start_lat=home.address.latitude,
-        end_lat=location.address.latitude,
-        end_long=location.address.longitude,
+def _replace_conflicting(stmt):
+    # A HOME and a LOCATION job running at once both write the pairs between
+    # them, whichever commits last keeps its walking time
+    return stmt.on_conflict_do_update(
+        index_elements=["source_home_id", "destination_location_id"],
+        set_={
+            "walking_distance_minutes": stmt.excluded.walking_distance_minutes,
+            "updated_at": func.now(),
+        },
     )
 
 
-def create_location_distances(
-    db: Session, location: LocationRead, ors_client: OpenRouteServiceClient
-):
-    for home in db.query(Home).all():
-        try:
-            distance_minutes = get_distance_minutes(home, location, ors_client)
-            db_distance = Distance(
-                source_home_id=home.id,
-                destination_location_id=location.id,
-                walking_distance_minutes=distance_minutes,
-            )
-            db.add(db_distance)
-            db.commit()
-            db.refresh(location)
-        # Capture ValueErrors when no distance is found, as depending on user locations distances are sometimes not easily calculable
-        except ValueError:
-            print(
-                f"Failed to get distance between home id: {home.id} and location {location.id}"
-            )
+async def _copy_distances(db: AsyncSession, rows: list):
+    # COPY cannot skip conflicting rows, so copy into a temporary table and
+    # upsert from there. Runs on the session's own connection, so it is part of
+    # the same transaction.
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    await driver_connection.execute(
+        "CREATE TEMPORARY TABLE distances_copy (source_home_id integer, "
+        "destination_location_id integer, walking_distance_minutes integer) "
+        "ON COMMIT DROP"
+    )
+    await driver_connection.copy_records_to_table(
+        "distances_copy",
+        records=[tuple(row[column] for column in DISTANCE_COLUMNS) for row in rows],
+        columns=DISTANCE_COLUMNS,
+    )
+    copied = table("distances_copy", *(column(name) for name in DISTANCE_COLUMNS))
+    await db.execute(
+        _replace_conflicting(
+            insert_for(db, Distance).from_select(DISTANCE_COLUMNS, select(copied))
+        )
+    )
+    await driver_connection.execute("DROP TABLE distances_copy")
+
+
+async def bulk_insert_distances(db: AsyncSession, rows: list):
+    """
+    Insert distance rows (dicts of Distance columns) in one statement,
+    replacing the walking time of pairs that already have one.
+
+    Uses COPY on PostgreSQL for large batches and executemany everywhere else.
+    Does not commit, so callers can keep the insert in their own transaction.
+    """
+    if not rows:
+        return
+
+    bind = db.get_bind()
+    if (
+        bind.dialect.name == "postgresql"
+        and bind.dialect.driver == "asyncpg"
+        and len(rows) >= COPY_MIN_ROWS
+    ):
+        await _copy_distances(db, rows)
+    else:
+        await db.execute(_replace_conflicting(insert_for(db, Distance)), rows)
+
+
+def within_range(sources: list, destinations: list) -> np.ndarray:
+    """Which source -> destination pairs are close enough to be worth routing."""
+    if DISTANCE_MAX_KM <= 0 or not sources or not destinations:
+        return np.ones((len(sources), len(destinations)), dtype=bool)
+    return haversine_km_matrix(sources, destinations) <= DISTANCE_MAX_KM
+
+
+async def has_unfinished_location_jobs_near(
+    db: AsyncSession, longitude: float, latitude: float
+) -> bool:
+    """
+    Whether a queued or running location job may still add a distance from
+    this point, i.e. its location is within DISTANCE_MAX_KM. Jobs for further
+    away locations only record them as out of range.
+    """
+    statement = (
+        select(Address.longitude, Address.latitude)
+        .select_from(DistanceJob)
+        .join(Location, Location.id == DistanceJob.target_id)
+        .join(Address, Address.id == Location.address_id)
+        .where(
+            DistanceJob.kind == DistanceJobKind.LOCATION,
+            DistanceJob.status.in_(UNFINISHED_STATUSES),
+        )
+    )
+    if DISTANCE_MAX_KM > 0 and longitude is not None and latitude is not None:
+        (min_lat, max_lat), longitude_ranges = bounding_box(
+            longitude, latitude, DISTANCE_MAX_KM
+        )
+        statement = statement.where(
+            Address.latitude.between(min_lat, max_lat),
+            or_(
+                *(
+                    Address.longitude.between(min_long, max_long)
+                    for min_long, max_long in longitude_ranges
+                )
+            ),
+        )
+    candidates = [tuple(row) for row in (await db.execute(statement)).all()]
+    if not candidates or longitude is None or latitude is None:
+        return bool(candidates)
+    # The box's corners are further away than DISTANCE_MAX_KM, so check exactly
+    return bool(within_range([(longitude, latitude)], candidates).any())
+
+
+async def get_home_distances_status(db: AsyncSession, home_id: int) -> DistancesStatus:
+    if await has_unfinished_job(db, DistanceJobKind.HOME, home_id):
+        return DistancesStatus.PENDING
+    coordinates = (
+        await db.execute(
+            select(Address.longitude, Address.latitude)
+            .join(Home, Home.address_id == Address.id)
+            .where(Home.id == home_id)
+        )
+    ).first()
+    if coordinates is not None and await has_unfinished_location_jobs_near(
+        db, *coordinates
+    ):
+        return DistancesStatus.PENDING
+    if await last_job_failed(db, DistanceJobKind.HOME, home_id):
+        return DistancesStatus.FAILED
+    return DistancesStatus.READY
+
 
+async def fetch_distances(
+    db: AsyncSession,
+    homes: Sequence[Home],
+    locations: Sequence[Location],
+    ors_client: OpenRouteServiceClient,
+) -> Tuple[List[dict], List[FailedDistance]]:
+    """
+    Look up every home -> location pair, returning Distance rows for the pairs
+    that worked and the failed pairs. Homes and locations need their address
+    loaded.
+    """
+    sources = [address_coordinates(home) for home in homes]
+    destinations = [address_coordinates(location) for location in locations]
+    in_range = within_range(sources, destinations)
+    # Only homes and locations with at least one pair in range go to the router
+    source_indexes = np.flatnonzero(in_range.any(axis=1)).tolist()
+    destination_indexes = np.flatnonzero(in_range.any(axis=0)).tolist()
 
-def create_home_distances(
-    db: Session, home: HomeRead, ors_client: OpenRouteServiceClient
-):
-    for location in db.query(Location).all():
-        try:
-            distance_minutes = get_distance_minutes(home, location, ors_client)
-            db_distance = Distance(
-                source_home_id=home.id,
-                destination_location_id=location.id,
-                walking_distance_minutes=distance_minutes,
+    error = None
+    try:
+        # One matrix lookup covers every pair not already cached
+        matrix = (
+            await route_cache.get_duration_matrix_minutes(
+                db,
+                ors_client,
+                sources=[sources[i] for i in source_indexes],
+                destinations=[destinations[j] for j in destination_indexes],
             )
-            db.add(db_distance)
-            db.commit()
-            db.refresh(home)
-        # Capture ValueErrors when no distance is found, as depending on user locations distances are sometimes not easily calculable
-        except ValueError:
-            print(
-                f"Failed to get distance between home id: {home.id} and location {location.id}"
+            if source_indexes
+            else []
+        )
+    except (ValueError, httpx.HTTPError, CircuitOpenError) as e:
+        matrix = None
+        error = repr(e)
+    row_of = {i: row for row, i in enumerate(source_indexes)}
+    column_of = {j: column for column, j in enumerate(destination_indexes)}
+
+    rows = []
+    failed = []
+    for i, home in enumerate(homes):
+        for j, location in enumerate(locations):
+            pair = {"source_home_id": home.id, "destination_location_id": location.id}
+            if not in_range[i, j]:
+                failed.append(
+                    FailedDistance(**pair, reason=DistanceFailureReason.OUT_OF_RANGE)
+                )
+                continue
+            if matrix is None:
+                failed.append(
+                    FailedDistance(
+                        **pair, reason=DistanceFailureReason.ERROR, error=error
+                    )
+                )
+                continue
+            minutes = matrix[row_of[i]][column_of[j]]
+            # Depending on user locations distances are sometimes not easily calculable
+            if minutes is None:
+                failed.append(
+                    FailedDistance(**pair, reason=DistanceFailureReason.UNROUTABLE)
+                )
+            else:
+                rows.append({**pair, "walking_distance_minutes": round(minutes)})
+    return rows, failed
+
+
+async def compute_location_distances(
+    db: AsyncSession, location: LocationRead, ors_client: OpenRouteServiceClient
+) -> DistanceFanOutResult:
+    return await compute_locations_distances(db, [location], ors_client)
+
+
+async def compute_locations_distances(
+    db: AsyncSession,
+    locations: Sequence[LocationRead],
+    ors_client: OpenRouteServiceClient,
+) -> DistanceFanOutResult:
+    """Distances from every home to each of `locations`, in one matrix lookup."""
+    homes = (await db.scalars(select(Home).options(joinedload(Home.address)))).all()
+    rows, failed = await fetch_distances(db, homes, locations, ors_client)
+    location_ids = [location.id for location in locations]
+
+    # Replace the old rows in one transaction, once the new ones are ready
+    await db.execute(
+        delete(Distance).where(Distance.destination_location_id.in_(location_ids))
+    )
+    await db.execute(
+        delete(DistanceFailure).where(
+            DistanceFailure.destination_location_id.in_(location_ids)
+        )
+    )
+    await bulk_insert_distances(db, rows)
+    await record_distance_failures(db, failed)
+    await refresh_locations_rankings(db, location_ids)
+    await db.commit()
+    await response_cache.invalidate(DISTANCES)
+    return DistanceFanOutResult(created=len(rows), failed=failed)
+
+
+async def compute_home_distances(
+    db: AsyncSession, home: HomeRead, ors_client: OpenRouteServiceClient
+) -> DistanceFanOutResult:
+    return await compute_homes_distances(db, [home], ors_client)
+
+
+async def compute_homes_distances(
+    db: AsyncSession, homes: Sequence[HomeRead], ors_client: OpenRouteServiceClient
+) -> DistanceFanOutResult:
+    """Distances from each of `homes` to every location, in one matrix lookup."""
+    locations = (
+        await db.scalars(select(Location).options(joinedload(Location.address)))
+    ).all()
+    rows, failed = await fetch_distances(db, homes, locations, ors_client)
+    home_ids = [home.id for home in homes]
+
+    # Replace the old rows in one transaction, once the new ones are ready
+    await db.execute(delete(Distance).where(Distance.source_home_id.in_(home_ids)))
+    await db.execute(
+        delete(DistanceFailure).where(DistanceFailure.source_home_id.in_(home_ids))
+    )
+    await bulk_insert_distances(db, rows)
+    await record_distance_failures(db, failed)
+    await refresh_homes_rankings(db, home_ids)
+    await db.commit()
+    await response_cache.invalidate(DISTANCES)
+    return DistanceFanOutResult(created=len(rows), failed=failed)
+
+
+async def retry_distance_failures(
+    db: AsyncSession, ors_client: OpenRouteServiceClient, limit: int = 1000
+) -> DistanceFanOutResult:
+    """Retry up to `limit` pairs that previously failed with a retryable error."""
+    failures_by_home = defaultdict(list)
+    for db_failure in await get_retryable_failures(db, limit):
+        failures_by_home[db_failure.source_home_id].append(db_failure)
+
+    created = 0
+    still_failed = []
+    for home_id, db_failures in failures_by_home.items():
+        # populate_existing, in case they are already in the session without
+        # their address loaded
+        home = await db.get(
+            Home, home_id, options=[joinedload(Home.address)], populate_existing=True
+        )
+        locations = [
+            await db.get(
+                Location,
+                db_failure.destination_location_id,
+                options=[joinedload(Location.address)],
+                populate_existing=True,
             )
+            for db_failure in db_failures
+        ]
+        rows, failed = await fetch_distances(db, [home], locations, ors_client)
+
+        failed_by_location = {
+            failure.destination_location_id: failure for failure in failed
+        }
+        for db_failure in db_failures:
+            failure = failed_by_location.get(db_failure.destination_location_id)
+            if failure is None:
+                await db.delete(db_failure)
+                continue
+            db_failure.reason = failure.reason
+            db_failure.error = failure.error
+            db_failure.attempts += 1
+        await bulk_insert_distances(db, rows)
+        await refresh_home_rankings(db, home_id)
+        await db.commit()
+        await response_cache.invalidate(DISTANCES)
+        created += len(rows)
+        still_failed.extend(failed)
+    return DistanceFanOutResult(created=created, failed=still_failed)
+
+
+# Distances are computed by the background worker (see app/worker.py), these only
+# queue the work so requests can return straight away. The worker replaces any
+# existing rows, so creating and updating queue the same job.
+
+
+async def create_home_distances(db: AsyncSession, home: HomeRead):
+    return await enqueue_distance_job(db, DistanceJobKind.HOME, home.id)
 
 
-def update_home_distances(
-    db: Session, home: HomeRead, ors_client: OpenRouteServiceClient
-):
-    # Delete existing distances where source_home_id matches the home's id
-    db.query(Distance).filter(Distance.source_home_id == home.id).delete()
-    db.commit()
+async def create_location_distances(db: AsyncSession, location: LocationRead):
+    return await enqueue_distance_job(db, DistanceJobKind.LOCATION, location.id)
 
-    # Recreate distances
-    create_home_distances(db, home, ors_client)
 
+async def update_home_distances(db: AsyncSession, home: HomeRead):
+    return await enqueue_distance_job(db, DistanceJobKind.HOME, home.id)
 
-def update_location_distances(
-    db: Session, location: LocationRead, ors_client: OpenRouteServiceClient
-):
-    # Delete existing distances where destination_location_id matches the location's id
-    db.query(Distance).filter(Distance.destination_location_id == location.id).delete()
-    db.commit()
 
-    # Recreate distances
-    create_location_distances(db, location, ors_client)
+async def update_location_distances(db: AsyncSession, location: LocationRead):
+    return await enqueue_distance_job(db, DistanceJobKind.LOCATION, location.id)
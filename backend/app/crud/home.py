@@ -1,28 +1,73 @@
-from sqlalchemy.orm import Session
+from typing import List, Optional, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from .. import models, schemas
 from ..models.home import Home
 from ..services.openrouteservice import OpenRouteServiceClient
-from .address import create_address, update_address
-from .distances import create_home_distances, update_home_distances
+from ..services.response_cache import DISTANCES, HOMES, response_cache
+from ..utils.pagination import paginate
+from .address import (
+    address_changed,
+    create_address,
+    create_addresses,
+    update_address,
+)
+from .distance_jobs import enqueue_new_distance_jobs
+from .distances import (
+    create_home_distances,
+    get_home_distances_status,
+    update_home_distances,
+)
+from .locations import get_locations_near
+from .rankings import get_rankings
+
+# Load what HomeRead nests up front, rather than one query per home for each.
+# Async sessions cannot lazy load them later in any case.
+HOME_READ_OPTIONS = (joinedload(Home.address), joinedload(Home.creator))
 
 
-def get_homes(db: Session, skip: int = 0, limit: int = 1000):
-    return db.query(models.Home).offset(skip).limit(limit).all()
+async def get_homes(db: AsyncSession, skip: int = 0, limit: int = 1000):
+    return (
+        await db.scalars(
+            select(models.Home)
+            .options(*HOME_READ_OPTIONS)
+            .order_by(models.Home.id)
+            .offset(skip)
+            .limit(limit)
+        )
+    ).all()
 
 
-def get_home(db: Session, home_id: int):
-    return db.query(models.Home).filter(models.Home.id == home_id).first()
+async def get_homes_page(
+    db: AsyncSession, limit: int = 100, cursor: Optional[str] = None
+):
+    statement = select(models.Home).options(*HOME_READ_OPTIONS)
+    homes, next_cursor = await paginate(db, statement, (models.Home.id,), limit, cursor)
+    return {"items": homes, "next_cursor": next_cursor}
 
 
-def create_home(
-    db: Session,
+async def get_home(db: AsyncSession, home_id: int):
+    # populate_existing, so a home already in the session after a write is
+    # reloaded with its address and creator
+    return await db.scalar(
+        select(models.Home)
+        .options(*HOME_READ_OPTIONS)
+        .where(models.Home.id == home_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def create_home(
+    db: AsyncSession,
     home: schemas.HomeCreate,
     user_id: int,
     ors_client: OpenRouteServiceClient,
 ):
     # Create new address for new home
-    db_address = create_address(db, home.address, ors_client)
+    db_address = await create_address(db, home.address, ors_client)
 
     # Create new home itself
     db_home = Home(
@@ -31,46 +76,192 @@ def create_home(
         address_id=db_address.id,
     )
     db.add(db_home)
-    db.commit()
-    db.refresh(db_home)
+    await db.commit()
+    db_home = await get_home(db, db_home.id)
 
-    # Create distances from home
-    create_home_distances(db, db_home, ors_client)
+    # Queue distances from home to be computed in the background
+    await create_home_distances(db, db_home)
+    db_home.distances_status = schemas.DistancesStatus.PENDING
+    await response_cache.invalidate(HOMES, DISTANCES)
 
     return db_home
 
 
-def update_home(
-    db: Session,
+async def create_homes(
+    db: AsyncSession,
+    homes: Sequence[schemas.HomeCreate],
+    user_id: int,
+    ors_client: OpenRouteServiceClient,
+) -> List[dict]:
+    """
+    Create many homes at once, returning a result per item in order. See
+    crud.locations.create_locations.
+    """
+    addresses = await create_addresses(db, [home.address for home in homes], ors_client)
+    rows = [
+        {
+            **home.model_dump(exclude={"address"}),
+            "creation_user_id": user_id,
+            "address_id": address_id,
+        }
+        for home, (address_id, _) in zip(homes, addresses)
+        if address_id is not None
+    ]
+    home_ids = []
+    if rows:
+        home_ids = (
+            await db.scalars(
+                insert(Home).returning(Home.id, sort_by_parameter_order=True), rows
+            )
+        ).all()
+    await db.commit()
+    await enqueue_new_distance_jobs(db, models.DistanceJobKind.HOME, home_ids)
+    await response_cache.invalidate(HOMES, DISTANCES)
+
+    db_homes = {
+        db_home.id: db_home
+        for db_home in await db.scalars(
+            select(Home).options(*HOME_READ_OPTIONS).where(Home.id.in_(home_ids))
+        )
+    }
+    home_ids = iter(home_ids)
+    results = []
+    for index, (address_id, error) in enumerate(addresses):
+        if address_id is None:
+            results.append(
+                {
+                    "index": index,
+                    "status": schemas.BulkItemStatus.FAILED,
+                    "error": error,
+                }
+            )
+            continue
+        db_home = db_homes[next(home_ids)]
+        db_home.distances_status = schemas.DistancesStatus.PENDING
+        results.append(
+            {"index": index, "status": schemas.BulkItemStatus.CREATED, "item": db_home}
+        )
+    return results
+
+
+async def update_home(
+    db: AsyncSession,
     home: schemas.HomeCreate,
     home_id: int,
     address_id: int,
     ors_client: OpenRouteServiceClient,
 ):
-    db_home = db.query(models.Home).filter(models.Home.id == home_id).first()
+    db_home = await get_home(db, home_id)
     if db_home:
         for key, value in home.model_dump().items():
             if key not in ["address"]:
                 setattr(db_home, key, value)
 
+        # Distances only need recomputing if the home has moved
+        moved = address_changed(db_home.address, home.address)
+
         # Invoke update address
-        update_address(db, home.address, address_id, ors_client)
+        await update_address(db, home.address, address_id, ors_client)
 
-        db.commit()
-        db.refresh(db_home)
+        await db.commit()
+        db_home = await get_home(db, home_id)
 
-    update_home_distances(db, db_home, ors_client)
+        if moved:
+            await update_home_distances(db, db_home)
+            db_home.distances_status = schemas.DistancesStatus.PENDING
+        await response_cache.invalidate(HOMES, DISTANCES)
     return db_home
 
 
-# Return all distances from a home
-def get_distances(db: Session, home_id: int):
-    db_home = db.query(Home).filter(Home.id == home_id).first()
-    return db_home.distances if db_home else None
+# Return a page of distances from a home, along with whether they are still
+# being computed. Filtering, sorting and paging all happen in one SQL query.
+async def get_distances(
+    db: AsyncSession,
+    home_id: int,
+    max_minutes: Optional[int] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    order_by: schemas.DistanceOrder = schemas.DistanceOrder.WALKING_DISTANCE_MINUTES,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+):
+    if not await db.scalar(select(Home.id).where(Home.id == home_id)):
+        return None
+
+    Distance = models.Distance
+    if order_by == schemas.DistanceOrder.WALKING_DISTANCE_MINUTES:
+        sort_columns = (Distance.walking_distance_minutes, Distance.id)
+    else:
+        sort_columns = (Distance.id,)
+
+    statement = select(Distance).where(Distance.source_home_id == home_id)
+    if max_minutes is not None:
+        statement = statement.where(Distance.walking_distance_minutes <= max_minutes)
+    if min_price is not None or max_price is not None:
+        # Locations whose price estimate overlaps the requested range
+        statement = statement.join(Distance.destination)
+        if min_price is not None:
+            statement = statement.where(models.Location.price_estimate_max >= min_price)
+        if max_price is not None:
+            statement = statement.where(models.Location.price_estimate_min <= max_price)
+    distances, next_cursor = await paginate(db, statement, sort_columns, limit, cursor)
+    return {
+        "status": await get_home_distances_status(db, home_id),
+        "distances": distances,
+        "next_cursor": next_cursor,
+    }
+
+
+# Locations within radius_km of a home, with walking times where already computed
+async def get_nearby_locations(
+    db: AsyncSession, home_id: int, radius_km: float, limit: int
+):
+    db_home = await get_home(db, home_id)
+    if not db_home:
+        return None
+    nearby = await get_locations_near(
+        db, db_home.address.longitude, db_home.address.latitude, radius_km, limit
+    )
+    walking_minutes = await db.execute(
+        select(
+            models.Distance.destination_location_id,
+            models.Distance.walking_distance_minutes,
+        ).where(
+            models.Distance.source_home_id == home_id,
+            models.Distance.destination_location_id.in_(
+                [location.id for location, _ in nearby]
+            ),
+        )
+    )
+    walking_minutes = dict(walking_minutes.all())
+    return [
+        {
+            "location": location,
+            "distance_km": distance_km,
+            "walking_distance_minutes": walking_minutes.get(location.id),
+        }
+        for location, distance_km in nearby
+    ]
+
+
+# A home's closest locations, read straight from the home_location_rankings table
+async def get_ranked_locations(
+    db: AsyncSession,
+    home_id: int,
+    max_minutes: Optional[int] = None,
+    max_price: Optional[int] = None,
+    limit: int = 20,
+):
+    if not await db.scalar(select(Home.id).where(Home.id == home_id)):
+        return None
+    return await get_rankings(
+        db, home_id, max_minutes=max_minutes, max_price=max_price, limit=limit
+    )
 
 
-def delete_home(db: Session, home_id: int):
-    db_home = db.query(models.Home).filter(models.Home.id == home_id).first()
+async def delete_home(db: AsyncSession, home_id: int):
+    db_home = await db.get(models.Home, home_id)
     if db_home:
-        db.delete(db_home)
-        db.commit()
+        await db.delete(db_home)
+        await db.commit()
+        await response_cache.invalidate(HOMES, DISTANCES)
@@ -1,27 +1,141 @@
-from sqlalchemy.orm import Session
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
 
 from .. import models, schemas
 from ..services.openrouteservice import OpenRouteServiceClient
-from .address import create_address, update_address
+from ..services.response_cache import DISTANCES, LOCATIONS, response_cache
+from ..utils.geo import haversine_km_matrix
+from ..utils.pagination import paginate
+from ..utils.spatial import bounding_box, has_postgis
+from .address import (
+    address_changed,
+    create_address,
+    create_addresses,
+    update_address,
+)
+from .distance_jobs import enqueue_new_distance_jobs
 from .distances import create_location_distances, update_location_distances
+from .rankings import refresh_location_rankings
+
+# Load what LocationRead nests up front, rather than one query per location for each
+LOCATION_READ_OPTIONS = (
+    joinedload(models.Location.address),
+    joinedload(models.Location.creator),
+)
+
+
+async def get_location(db: AsyncSession, location_id: int):
+    # populate_existing, so a location already in the session after a write is
+    # reloaded with its address and creator
+    return await db.scalar(
+        select(models.Location)
+        .options(*LOCATION_READ_OPTIONS)
+        .where(models.Location.id == location_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def get_locations(db: AsyncSession, skip: int = 0, limit: int = 500):
+    return (
+        await db.scalars(
+            select(models.Location)
+            .options(*LOCATION_READ_OPTIONS)
+            .order_by(models.Location.id)
+            .offset(skip)
+            .limit(limit)
+        )
+    ).all()
+
+
+async def get_locations_page(
+    db: AsyncSession, limit: int = 100, cursor: Optional[str] = None
+):
+    statement = select(models.Location).options(*LOCATION_READ_OPTIONS)
+    locations, next_cursor = await paginate(
+        db, statement, (models.Location.id,), limit, cursor
+    )
+    return {"items": locations, "next_cursor": next_cursor}
+
+
+def _postgis_point(longitude, latitude):
+    return func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326))
 
 
-def get_location(db: Session, location_id: int):
-    return db.query(models.Location).filter(models.Location.id == location_id).first()
+async def get_locations_near(
+    db: AsyncSession, longitude: float, latitude: float, radius_km: float, limit: int
+) -> List[Tuple[models.Location, float]]:
+    """
+    Locations within radius_km of a point, nearest first, with their distance
+    in km. Uses the PostGIS index when available, else a bounding box on the
+    (latitude, longitude) index narrowed down by the exact distance.
+    """
+    statement = (
+        select(models.Location)
+        .join(models.Location.address)
+        .options(
+            contains_eager(models.Location.address),
+            joinedload(models.Location.creator),
+        )
+    )
+
+    if await has_postgis(db):
+        address_point = _postgis_point(
+            models.Address.longitude, models.Address.latitude
+        )
+        target = _postgis_point(longitude, latitude)
+        distance_km = (func.ST_Distance(address_point, target) / 1000).label(
+            "distance_km"
+        )
+        result = await db.execute(
+            statement.add_columns(distance_km)
+            .where(func.ST_DWithin(address_point, target, radius_km * 1000))
+            .order_by(distance_km, models.Location.id)
+            .limit(limit)
+        )
+        return [tuple(row) for row in result.all()]
 
+    (min_lat, max_lat), longitude_ranges = bounding_box(longitude, latitude, radius_km)
+    candidates = (
+        await db.scalars(
+            statement.where(
+                models.Address.latitude.between(min_lat, max_lat),
+                or_(
+                    *(
+                        models.Address.longitude.between(min_long, max_long)
+                        for min_long, max_long in longitude_ranges
+                    )
+                ),
+            )
+        )
+    ).all()
+    if not candidates:
+        return []
 
-def get_locations(db: Session, skip: int = 0, limit: int = 500):
-    return db.query(models.Location).offset(skip).limit(limit).all()
+    # The box's corners are further away than radius_km, so check exactly
+    distances = haversine_km_matrix(
+        [(longitude, latitude)],
+        [(c.address.longitude, c.address.latitude) for c in candidates],
+    )[0]
+    nearby = [
+        (location, float(distance_km))
+        for location, distance_km in zip(candidates, distances)
+        if distance_km <= radius_km
+    ]
+    nearby.sort(key=lambda pair: (pair[1], pair[0].id))
+    return nearby[:limit]
 
 
-def create_location(
-    db: Session,
+async def create_location(
+    db: AsyncSession,
     location: schemas.LocationCreate,
     user_id: int,
     ors_client: OpenRouteServiceClient,
 ):
     # Create address for location
-    db_address = create_address(db, location.address, ors_client)
+    db_address = await create_address(db, location.address, ors_client)
 
     # Create location itself
     db_location = models.Location(
@@ -30,44 +144,127 @@ def create_location(
         address_id=db_address.id,
     )
     db.add(db_location)
-    db.commit()
-    db.refresh(db_location)
+    await db.commit()
+    db_location = await get_location(db, db_location.id)
 
-    # Create distances for new location
-    create_location_distances(db, db_location, ors_client)
+    # Queue distances for new location to be computed in the background
+    await create_location_distances(db, db_location)
+    db_location.distances_status = schemas.DistancesStatus.PENDING
+    await response_cache.invalidate(LOCATIONS, DISTANCES)
     return db_location
 
 
-def update_location(
-    db: Session,
+async def create_locations(
+    db: AsyncSession,
+    locations: Sequence[schemas.LocationCreate],
+    user_id: int,
+    ors_client: OpenRouteServiceClient,
+) -> List[dict]:
+    """
+    Create many locations at once, returning a result per item in order.
+
+    Each distinct address is geocoded once, addresses and locations are each
+    inserted in one statement, and their distances are queued together so the
+    worker computes them in one batch. Items whose address cannot be geocoded
+    are left out and reported as failed.
+    """
+    addresses = await create_addresses(
+        db, [location.address for location in locations], ors_client
+    )
+    rows = [
+        {
+            **location.model_dump(exclude={"address"}),
+            "creation_user_id": user_id,
+            "address_id": address_id,
+        }
+        for location, (address_id, _) in zip(locations, addresses)
+        if address_id is not None
+    ]
+    location_ids = []
+    if rows:
+        location_ids = (
+            await db.scalars(
+                insert(models.Location).returning(
+                    models.Location.id, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+        ).all()
+    await db.commit()
+    await enqueue_new_distance_jobs(db, models.DistanceJobKind.LOCATION, location_ids)
+    await response_cache.invalidate(LOCATIONS, DISTANCES)
+
+    db_locations = {
+        db_location.id: db_location
+        for db_location in await db.scalars(
+            select(models.Location)
+            .options(*LOCATION_READ_OPTIONS)
+            .where(models.Location.id.in_(location_ids))
+        )
+    }
+    location_ids = iter(location_ids)
+    results = []
+    for index, (address_id, error) in enumerate(addresses):
+        if address_id is None:
+            results.append(
+                {
+                    "index": index,
+                    "status": schemas.BulkItemStatus.FAILED,
+                    "error": error,
+                }
+            )
+            continue
+        db_location = db_locations[next(location_ids)]
+        db_location.distances_status = schemas.DistancesStatus.PENDING
+        results.append(
+            {
+                "index": index,
+                "status": schemas.BulkItemStatus.CREATED,
+                "item": db_location,
+            }
+        )
+    return results
+
+
+async def update_location(
+    db: AsyncSession,
     location: schemas.LocationCreate,
     location_id: int,
     address_id: int,
     ors_client: OpenRouteServiceClient,
 ):
-    db_location = (
-        db.query(models.Location).filter(models.Location.id == location_id).first()
-    )
+    db_location = await get_location(db, location_id)
     if db_location:
         for key, value in location.model_dump().items():
             if key not in ["address"]:
                 setattr(db_location, key, value)
 
+        # Distances only need recomputing if the location has moved
+        moved = address_changed(db_location.address, location.address)
+
         # Invoke update address here
-        update_address(db, location.address, address_id, ors_client)
+        await update_address(db, location.address, address_id, ors_client)
+
+        # A moved location is re-ranked by the worker, otherwise its name or
+        # price may still have changed
+        if not moved:
+            await refresh_location_rankings(db, location_id)
 
-        db.commit()
-        db.refresh(db_location)
+        await db.commit()
+        db_location = await get_location(db, location_id)
 
-    update_location_distances(db, db_location, ors_client)
+        if moved:
+            await update_location_distances(db, db_location)
+            db_location.distances_status = schemas.DistancesStatus.PENDING
+        # Distances are filtered on location prices
+        await response_cache.invalidate(LOCATIONS, DISTANCES)
 
     return db_location
 
 
-def delete_location(db: Session, location_id: int):
-    db_location = (
-        db.query(models.Location).filter(models.Location.id == location_id).first()
-    )
+async def delete_location(db: AsyncSession, location_id: int):
+    db_location = await db.get(models.Location, location_id)
     if db_location:
-        db.delete(db_location)
-        db.commit()
+        await db.delete(db_location)
+        await db.commit()
+        await response_cache.invalidate(LOCATIONS, DISTANCES)
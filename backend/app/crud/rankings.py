@@ -0,0 +1,111 @@
+from typing import Optional, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Address, Distance, HomeLocationRanking, Location
+from ..utils.upsert import insert_for
+
+RANKING_COLUMNS = (
+    "home_id",
+    "location_id",
+    "walking_distance_minutes",
+    "location_name",
+    "price_estimate_min",
+    "price_estimate_max",
+    "city",
+    "latitude",
+    "longitude",
+)
+
+
+def _ranking_rows(*conditions):
+    # Same order as RANKING_COLUMNS
+    return (
+        select(
+            Distance.source_home_id,
+            Distance.destination_location_id,
+            Distance.walking_distance_minutes,
+            Location.name,
+            Location.price_estimate_min,
+            Location.price_estimate_max,
+            Address.city,
+            Address.latitude,
+            Address.longitude,
+        )
+        .join(Location, Location.id == Distance.destination_location_id)
+        .join(Address, Address.id == Location.address_id)
+        .where(*conditions)
+    )
+
+
+async def _refresh(db: AsyncSession, ranking_condition, distance_condition):
+    # Pending changes (e.g. a new price) have to reach the database to be copied
+    await db.flush()
+    await db.execute(delete(HomeLocationRanking).where(ranking_condition))
+    stmt = insert_for(db, HomeLocationRanking).from_select(
+        RANKING_COLUMNS, _ranking_rows(distance_condition)
+    )
+    # A job for a home and one for a location both copy the pair between them
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["home_id", "location_id"],
+            set_={
+                name: getattr(stmt.excluded, name)
+                for name in RANKING_COLUMNS
+                if name not in ("home_id", "location_id")
+            },
+        )
+    )
+
+
+# These rebuild the rows for some homes or locations in place, without
+# committing, so they land in the same transaction as the change that caused them.
+
+
+async def refresh_home_rankings(db: AsyncSession, home_id: int):
+    await refresh_homes_rankings(db, [home_id])
+
+
+async def refresh_homes_rankings(db: AsyncSession, home_ids: Sequence[int]):
+    await _refresh(
+        db,
+        HomeLocationRanking.home_id.in_(home_ids),
+        Distance.source_home_id.in_(home_ids),
+    )
+
+
+async def refresh_location_rankings(db: AsyncSession, location_id: int):
+    await refresh_locations_rankings(db, [location_id])
+
+
+async def refresh_locations_rankings(db: AsyncSession, location_ids: Sequence[int]):
+    await _refresh(
+        db,
+        HomeLocationRanking.location_id.in_(location_ids),
+        Distance.destination_location_id.in_(location_ids),
+    )
+
+
+async def get_rankings(
+    db: AsyncSession,
+    home_id: int,
+    max_minutes: Optional[int] = None,
+    max_price: Optional[int] = None,
+    limit: int = 20,
+):
+    """A home's closest locations, optionally only those affordable for max_price."""
+    statement = select(HomeLocationRanking).where(
+        HomeLocationRanking.home_id == home_id
+    )
+    if max_minutes is not None:
+        statement = statement.where(
+            HomeLocationRanking.walking_distance_minutes <= max_minutes
+        )
+    if max_price is not None:
+        statement = statement.where(HomeLocationRanking.price_estimate_min <= max_price)
+    statement = statement.order_by(
+        HomeLocationRanking.walking_distance_minutes,
+        HomeLocationRanking.location_id,
+    ).limit(limit)
+    return (await db.scalars(statement)).all()
@@ -1,45 +1,88 @@
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
-from ..utils.hashing import hash_password
+from ..services.response_cache import HOMES, LOCATIONS, response_cache
+from ..services.user_cache import user_cache
+from ..utils.hashing import hash_password_async, verify_and_update_password_async
+from ..utils.pagination import paginate
 
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_pwd = hash_password(user.password)
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_pwd = await hash_password_async(user.password)
     db_user = models.User(
         name=user.name, email=user.email, hashed_password=hashed_pwd, role="user"
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    """The user with this email and password, or None."""
+    db_user = await get_user_by_email(db, email)
+    if not db_user:
+        return None
+    verified, new_hash = await verify_and_update_password_async(
+        password, db_user.hashed_password
+    )
+    if not verified:
+        return None
+    # Hashed with an outdated scheme or cost, e.g. after BCRYPT_ROUNDS changed
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+        await db.refresh(db_user)
+        user_cache.invalidate(db_user.id)
     return db_user
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return (
+        await db.scalars(
+            select(models.User).order_by(models.User.id).offset(skip).limit(limit)
+        )
+    ).all()
+
+
+async def get_users_page(
+    db: AsyncSession, limit: int = 100, cursor: Optional[str] = None
+):
+    users, next_cursor = await paginate(
+        db, select(models.User), (models.User.id,), limit, cursor
+    )
+    return {"items": users, "next_cursor": next_cursor}
 
 
-def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
 
 
-def update_user(
-    db: Session, updating_user: models.User, user_update=schemas.UserUpdate
+async def update_user(
+    db: AsyncSession, updating_user: models.User, user_update=schemas.UserUpdate
 ):
     for key, value in user_update.model_dump().items():
         setattr(updating_user, key, value)
 
-    db.commit()
-    db.refresh(updating_user)
+    await db.commit()
+    await db.refresh(updating_user)
+    user_cache.invalidate(updating_user.id)
+    # Homes and locations are read with their creator nested
+    await response_cache.invalidate(HOMES, LOCATIONS)
     return updating_user
 
 
-def delete_user(db: Session, user_id: int):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def delete_user(db: AsyncSession, user_id: int):
+    db_user = await db.get(models.User, user_id)
     if db_user:
-        db.delete(db_user)
-        db.commit()
+        await db.delete(db_user)
+        await db.commit()
+        user_cache.invalidate(user_id)
+        await response_cache.invalidate(HOMES, LOCATIONS)
@@ -1,16 +1,34 @@
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
-from .api.routes import auth, geocode, homes, locations, users
-from .utils.database import Base, engine
+from .api.middleware import MetricsMiddleware, RequestIdMiddleware
+from .api.routes import auth, geocode, health, homes, locations, metrics, users
+from .services.metrics import track_queries
+from .services.routing import create_routing_client
+from .utils.database import async_engine, wait_for_database_async
+from .utils.log import configure_logging
+
+# The schema is managed by Alembic, run `python -m app.migrate` before starting
+
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # Engines connect lazily, so check the database is reachable before serving
+    await wait_for_database_async()
+    # One client per worker process, so requests share its connection pool.
+    # ROUTING_BACKEND=local swaps ORS for the offline backend.
+    app.state.ors_client = create_routing_client()
+    yield
+    await app.state.ors_client.aclose()
 
-app = FastAPI(title="Location Locator API")
+
+app = FastAPI(title="Location Locator API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,15 +37,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# The middleware added last wraps the others: RequestIdMiddleware is outermost,
+# so MetricsMiddleware times everything below it with the request ID already set
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+track_queries(async_engine.sync_engine)
+
 # Include Routers
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(locations.router)
 app.include_router(homes.router)
 app.include_router(geocode.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
-def read_root():
-    print("Request received")
+async def read_root():
     return {"message": "Welcome to Lochlan's Location Locator API"}
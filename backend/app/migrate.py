@@ -0,0 +1,59 @@
+"""
+Bring the database schema up to date with the Alembic migrations in alembic/.
+
+Run before starting the API or the worker with `python -m app.migrate`. New
+migrations are written with `alembic revision --autogenerate -m "..."`.
+"""
+
+import logging
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+from alembic import command
+from alembic.config import Config
+
+from .utils.database import engine, wait_for_database
+from .utils.log import configure_logging
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+# The schema Base.metadata.create_all made before there were migrations
+INITIAL_REVISION = "0001"
+
+
+def alembic_config(connection: Connection) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def run_migrations(connection: Connection, revision: str = "head"):
+    config = alembic_config(connection)
+    tables = inspect(connection).get_table_names()
+    if "alembic_version" not in tables and "users" in tables:
+        # Created by create_all before migrations, so mark it as already there
+        logger.info(
+            "Existing schema found, stamping it as revision %s", INITIAL_REVISION
+        )
+        command.stamp(config, INITIAL_REVISION)
+    command.upgrade(config, revision)
+
+
+def main():
+    configure_logging()
+    wait_for_database()
+    with engine.begin() as connection:
+        run_migrations(connection)
+    logger.info("Database schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,28 @@
 from .address import Address
 from .distance import Distance
+from .distance_failure import DistanceFailure, DistanceFailureReason
+from .distance_job import DistanceJob, DistanceJobKind, DistanceJobStatus
+from .geocode_cache import GeocodeCacheEntry
 from .home import Home
+from .home_location_ranking import HomeLocationRanking
 from .location import Location
 from .roles import Role
+from .route_duration import RouteDuration
 from .user import User
 
 __all__ = [
     "Address",
     "Distance",
+    "DistanceFailure",
+    "DistanceFailureReason",
+    "DistanceJob",
+    "DistanceJobKind",
+    "DistanceJobStatus",
+    "GeocodeCacheEntry",
     "Home",
+    "HomeLocationRanking",
     "Location",
     "Role",
+    "RouteDuration",
     "User",
 ]
@@ -1,12 +1,17 @@
-from sqlalchemy import Column, Float, Integer, String
+from sqlalchemy import DDL, Column, Float, Index, Integer, String, event
 from sqlalchemy.orm import relationship
 
 from ..utils.database import Base
+from ..utils.spatial import POSTGIS_INDEX_SQL, postgis_installed
 from .mixins import TimestampMixin
 
 
 class Address(TimestampMixin, Base):
     __tablename__ = "addresses"
+    # Bounding box lookups for nearby queries, see crud.locations.get_locations_near
+    __table_args__ = (
+        Index("ix_addresses_latitude_longitude", "latitude", "longitude"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     street = Column(String, nullable=False)
@@ -18,3 +23,13 @@ class Address(TimestampMixin, Base):
 
     locations = relationship("Location", back_populates="address")
     homes = relationship("Home", back_populates="address")
+
+
+# With PostGIS, nearby queries use a GiST index on the address's geography instead
+event.listen(
+    Address.__table__,
+    "after_create",
+    DDL(POSTGIS_INDEX_SQL).execute_if(
+        callable_=lambda ddl, target, bind, **kw: postgis_installed(bind)
+    ),
+)
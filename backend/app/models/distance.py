@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy import Column, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from ..utils.database import Base
@@ -7,11 +7,27 @@ from .mixins import TimestampMixin
 
 class Distance(TimestampMixin, Base):
     __tablename__ = "distances"
+    # One distance per pair. Lookups by home use either of these, as both start
+    # with source_home_id.
+    __table_args__ = (
+        UniqueConstraint(
+            "source_home_id",
+            "destination_location_id",
+            name="uq_distances_source_home_id_destination_location_id",
+        ),
+        # A home's distances by walking time, with id to keep keyset pages stable
+        Index(
+            "ix_distances_source_home_id_walking_distance_minutes",
+            "source_home_id",
+            "walking_distance_minutes",
+            "id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     source_home_id = Column(Integer, ForeignKey("homes.id", ondelete="CASCADE"))
     destination_location_id = Column(
-        Integer, ForeignKey("locations.id", ondelete="CASCADE")
+        Integer, ForeignKey("locations.id", ondelete="CASCADE"), index=True
     )
     walking_distance_minutes = Column(Integer, nullable=False)
 
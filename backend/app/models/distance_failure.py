@@ -0,0 +1,32 @@
+from enum import Enum
+
+from sqlalchemy import Column
+from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import ForeignKey, Integer, String, UniqueConstraint
+
+from ..utils.database import Base
+from .mixins import TimestampMixin
+
+
+class DistanceFailureReason(str, Enum):
+    # ORS found no walking route, retrying will not help
+    UNROUTABLE = "unroutable"
+    # Further apart in a straight line than anyone would walk, ORS is not asked
+    OUT_OF_RANGE = "out_of_range"
+    # ORS could not be reached or returned an error, worth retrying later
+    ERROR = "error"
+
+
+class DistanceFailure(TimestampMixin, Base):
+    __tablename__ = "distance_failures"
+    __table_args__ = (UniqueConstraint("source_home_id", "destination_location_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_home_id = Column(Integer, ForeignKey("homes.id", ondelete="CASCADE"))
+    # source_home_id is covered by the unique constraint, which starts with it
+    destination_location_id = Column(
+        Integer, ForeignKey("locations.id", ondelete="CASCADE"), index=True
+    )
+    reason = Column(SQLAlchemyEnum(DistanceFailureReason), nullable=False)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=1)
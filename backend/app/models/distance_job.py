@@ -0,0 +1,45 @@
+from enum import Enum
+
+from sqlalchemy import Column, DateTime
+from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import Index, Integer, String
+
+from ..utils.database import Base
+from .mixins import TimestampMixin
+
+
+class DistanceJobKind(str, Enum):
+    # Recompute every distance from a home
+    HOME = "home"
+    # Recompute every distance to a location
+    LOCATION = "location"
+
+
+class DistanceJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class DistanceJob(TimestampMixin, Base):
+    __tablename__ = "distance_jobs"
+    # A home or location's jobs, latest last, e.g. for its distances status
+    __table_args__ = (
+        Index("ix_distance_jobs_kind_target_id_id", "kind", "target_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(SQLAlchemyEnum(DistanceJobKind), nullable=False)
+    # Not a foreign key, the home or location may be deleted before the job runs
+    target_id = Column(Integer, nullable=False)
+    status = Column(
+        SQLAlchemyEnum(DistanceJobStatus),
+        nullable=False,
+        default=DistanceJobStatus.PENDING,
+        index=True,
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    # A running job whose lease has expired is assumed to belong to a dead worker
+    locked_until = Column(DateTime, nullable=True)
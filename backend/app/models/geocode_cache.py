@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from ..utils.database import Base
+from .mixins import TimestampMixin
+
+
+class GeocodeCacheEntry(TimestampMixin, Base):
+    __tablename__ = "geocode_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Normalised search text, see services.geocode_cache.normalize_geocode_query
+    query_key = Column(String, unique=True, index=True, nullable=False)
+    # Both null when the provider found nothing for the query
+    longitude = Column(Float, nullable=True)
+    latitude = Column(Float, nullable=True)
+    expires_at = Column(DateTime, nullable=False)
@@ -10,11 +10,24 @@ class Home(TimestampMixin, Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    address_id = Column(Integer, ForeignKey("addresses.id"))
-    creation_user_id = Column(Integer, ForeignKey("users.id"))
+    address_id = Column(Integer, ForeignKey("addresses.id"), index=True)
+    creation_user_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     address = relationship("Address", back_populates="homes")
     creator = relationship("User", back_populates="homes")
     distances = relationship(
-        "Distance", back_populates="source", cascade="all, delete-orphan"
+        "Distance",
+        back_populates="source",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    distance_failures = relationship(
+        "DistanceFailure",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    rankings = relationship(
+        "HomeLocationRanking",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, String
+
+from ..utils.database import Base
+
+
+class HomeLocationRanking(Base):
+    """
+    Denormalised copy of distances joined with their locations and addresses,
+    so ranking a home's locations needs no joins. Kept up to date by
+    crud.rankings whenever distances or locations change.
+    """
+
+    __tablename__ = "home_location_rankings"
+    # Closest first for a home, the price filter is checked on the same rows
+    __table_args__ = (
+        Index(
+            "ix_home_location_rankings_home_id_walking_distance_minutes",
+            "home_id",
+            "walking_distance_minutes",
+            "location_id",
+        ),
+    )
+
+    home_id = Column(
+        Integer, ForeignKey("homes.id", ondelete="CASCADE"), primary_key=True
+    )
+    location_id = Column(
+        Integer,
+        ForeignKey("locations.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    walking_distance_minutes = Column(Integer, nullable=False)
+    location_name = Column(String, nullable=False)
+    price_estimate_min = Column(Integer, nullable=False)
+    price_estimate_max = Column(Integer, nullable=False)
+    city = Column(String, nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
@@ -14,12 +14,27 @@ class Location(TimestampMixin, Base):
     description = Column(String, nullable=False)
     price_estimate_min = Column(Integer, nullable=False)
     price_estimate_max = Column(Integer, nullable=False)
-    address_id = Column(Integer, ForeignKey("addresses.id"))
+    address_id = Column(Integer, ForeignKey("addresses.id"), index=True)
     # Explicitly specify cascasde delete in DB to delete location when creation user is deleted
-    creation_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    creation_user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
 
     address = relationship("Address", back_populates="locations")
     creator = relationship("User", back_populates="locations")
     distances = relationship(
-        "Distance", back_populates="destination", cascade="all, delete-orphan"
+        "Distance",
+        back_populates="destination",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    distance_failures = relationship(
+        "DistanceFailure",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    rankings = relationship(
+        "HomeLocationRanking",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
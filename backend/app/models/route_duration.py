@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Float, Integer, String
+
+from ..utils.database import Base
+from .mixins import TimestampMixin
+
+
+class RouteDuration(TimestampMixin, Base):
+    __tablename__ = "route_durations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Profile and rounded coordinates, see services.route_cache.route_cache_key
+    route_key = Column(String, unique=True, index=True, nullable=False)
+    # Null when no route could be found between the two points
+    duration_minutes = Column(Float, nullable=True)
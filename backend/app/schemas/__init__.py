@@ -1,8 +1,22 @@
 from .address import AddressCreate, AddressRead
 from .auth import SignInResponse, Token, TokenData
-from .distance import DistanceRead
+from .bulk import BULK_CREATE_MAX_ITEMS, BulkItemResult, BulkItemStatus
+from .distance import (
+    DistanceFanOutResult,
+    DistanceOrder,
+    DistanceRead,
+    DistancesStatus,
+    FailedDistance,
+    HomeDistancesRead,
+)
 from .home import HomeCreate, HomeRead
-from .location import LocationCreate, LocationRead
+from .location import (
+    LocationCreate,
+    LocationRead,
+    NearbyLocationRead,
+    RankedLocationRead,
+)
+from .pagination import Page
 from .user import UserCreate, UserRead, UserSignIn, UserUpdate
 
 __all__ = [
@@ -13,14 +27,27 @@ __all__ = [
     "SignInResponse",
     "Token",
     "TokenData",
+    # bulk
+    "BULK_CREATE_MAX_ITEMS",
+    "BulkItemResult",
+    "BulkItemStatus",
     # distance
+    "DistanceFanOutResult",
+    "DistanceOrder",
     "DistanceRead",
+    "DistancesStatus",
+    "FailedDistance",
+    "HomeDistancesRead",
     # home
     "HomeCreate",
     "HomeRead",
     # location
     "LocationCreate",
     "LocationRead",
+    "NearbyLocationRead",
+    "RankedLocationRead",
+    # pagination
+    "Page",
     # user
     "UserCreate",
     "UserRead",
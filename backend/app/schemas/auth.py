@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 
+from ..models.roles import Role
 from .user import UserRead
 
 
@@ -10,6 +11,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     user_id: int | None = None
+    # Only in tokens issued with AUTH_TOKEN_ROLE_CLAIMS on
+    role: Role | None = None
 
 
 class SignInResponse(Token):
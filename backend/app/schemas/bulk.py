@@ -0,0 +1,24 @@
+import os
+from enum import Enum
+from typing import Generic, Optional, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+# Most items accepted by one POST /homes/bulk or /locations/bulk request
+BULK_CREATE_MAX_ITEMS = int(os.getenv("BULK_CREATE_MAX_ITEMS", "1000"))
+
+
+class BulkItemStatus(str, Enum):
+    CREATED = "created"
+    # Nothing was stored for the item, see `error`
+    FAILED = "failed"
+
+
+class BulkItemResult(BaseModel, Generic[T]):
+    # Position of the item in the request
+    index: int
+    status: BulkItemStatus
+    item: Optional[T] = None
+    error: Optional[str] = None
@@ -1,7 +1,24 @@
 from datetime import datetime
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel
 
+from ..models.distance_failure import DistanceFailureReason
+
+
+class DistancesStatus(str, Enum):
+    # Distances are still being computed in the background
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class DistanceOrder(str, Enum):
+    WALKING_DISTANCE_MINUTES = "walking_distance_minutes"
+    # The order distances were stored in
+    ID = "id"
+
 
 class DistanceRead(BaseModel):
     source_home_id: int
@@ -12,3 +29,22 @@ class DistanceRead(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class HomeDistancesRead(BaseModel):
+    status: DistancesStatus
+    distances: List[DistanceRead]
+    # Pass as `cursor` to get the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
+class FailedDistance(BaseModel):
+    source_home_id: int
+    destination_location_id: int
+    reason: DistanceFailureReason
+    error: Optional[str] = None
+
+
+class DistanceFanOutResult(BaseModel):
+    created: int
+    failed: List[FailedDistance]
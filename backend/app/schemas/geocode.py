@@ -8,3 +8,11 @@ class GeocodeSearchInput(BaseModel):
 class GeocodeSearchOutput(BaseModel):
     longitude: float
     latitude: float
+
+
+class GeocodeCacheStats(BaseModel):
+    memory_hits: int
+    database_hits: int
+    # Each of these is a paid request to the geocoding provider
+    provider_calls: int
+    memory_entries: int
@@ -0,0 +1,24 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ReadinessRead(BaseModel):
+    status: str
+
+
+class PoolStats(BaseModel):
+    # Per process: each gunicorn worker reports its own pool
+    pid: int
+    pool: str
+    # None for pools without a fixed size, e.g. SQLite's
+    size: Optional[int]
+    max_overflow: Optional[int]
+    checked_out: Optional[int]
+    checked_in: Optional[int]
+    overflow: Optional[int]
+    # Since the process started
+    checkouts: Optional[int]
+    timeouts: Optional[int]
+    wait_seconds_total: Optional[float]
+    wait_seconds_max: Optional[float]
@@ -1,8 +1,10 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel
 
 from .address import AddressCreate, AddressRead
+from .distance import DistancesStatus
 from .user import UserRead
 
 
@@ -20,6 +22,8 @@ class HomeRead(HomeBase):
     created_at: datetime
     updated_at: datetime
     creator: UserRead
+    # Only set by create/update, when distances are computed in the background
+    distances_status: Optional[DistancesStatus] = None
 
     class Config:
         orm_mode = True
@@ -1,8 +1,10 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel
 
 from .address import AddressCreate, AddressRead
+from .distance import DistancesStatus
 from .user import UserRead
 
 
@@ -24,6 +26,30 @@ class LocationRead(LocationBase):
     creator: UserRead
     created_at: datetime
     updated_at: datetime
+    # Only set by create/update, when distances are computed in the background
+    distances_status: Optional[DistancesStatus] = None
+
+    class Config:
+        orm_mode = True
+
+
+class NearbyLocationRead(BaseModel):
+    location: LocationRead
+    # Straight-line distance from the home
+    distance_km: float
+    # None until the background worker has computed it, or if it could not
+    walking_distance_minutes: Optional[int] = None
+
+
+class RankedLocationRead(BaseModel):
+    location_id: int
+    location_name: str
+    walking_distance_minutes: int
+    price_estimate_min: int
+    price_estimate_max: int
+    city: str
+    latitude: float
+    longitude: float
 
     class Config:
         orm_mode = True
@@ -0,0 +1,52 @@
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider that is known to be down."""
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing dependency for a while so callers fail fast.
+
+    After `failure_threshold` consecutive failures the circuit opens and every
+    call is rejected for `reset_timeout` seconds. Then a single trial call is let
+    through: success closes the circuit again, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._trial_in_flight):
+            raise CircuitOpenError("Provider is unavailable, not calling it for now.")
+        if state == self.HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self._trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import GeocodeCacheEntry
+from ..utils.lru import LRUCache
+from ..utils.upsert import insert_for
+from .openrouteservice import OpenRouteServiceClient
+
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+GEOCODE_CACHE_TTL_SECONDS = int(
+    os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60))
+)
+# Shorter, so a place the provider learns about later is picked up reasonably soon
+GEOCODE_CACHE_NEGATIVE_TTL_SECONDS = int(
+    os.getenv("GEOCODE_CACHE_NEGATIVE_TTL_SECONDS", str(24 * 60 * 60))
+)
+
+NOT_FOUND_MESSAGE = "No coordinates found for the given location."
+
+_APOSTROPHES = re.compile(r"['\u2019]")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_geocode_query(text: str) -> str:
+    """Fold case, punctuation and whitespace so equivalent searches share a key."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _APOSTROPHES.sub("", text)
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class GeocodeCache:
+    """
+    Caches geocoding results in process, backed by the geocode_cache table.
+
+    Lookups go memory -> database -> provider. Searches the provider has no
+    result for are cached too (for a shorter time) and raise ValueError again.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = GEOCODE_CACHE_SIZE,
+        ttl_seconds: int = GEOCODE_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: int = GEOCODE_CACHE_NEGATIVE_TTL_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.memory = LRUCache(maxsize)
+        self.database_hits = 0
+        self.provider_calls = 0
+        self._lock = threading.Lock()
+
+    async def get_coordinates(
+        self, db: AsyncSession, location_name: str, ors_client: OpenRouteServiceClient
+    ):
+        key = normalize_geocode_query(location_name)
+
+        coordinates = self.memory.get(key)
+        if coordinates is None:
+            coordinates = await self._get_from_database(db, key)
+        if coordinates is None:
+            coordinates = await self._get_from_provider(
+                db, key, location_name, ors_client
+            )
+
+        longitude, latitude = coordinates
+        if longitude is None or latitude is None:
+            raise ValueError(NOT_FOUND_MESSAGE)
+        return longitude, latitude
+
+    async def _get_from_database(self, db: AsyncSession, key: str):
+        db_entry = await db.scalar(
+            select(GeocodeCacheEntry).where(
+                GeocodeCacheEntry.query_key == key,
+                GeocodeCacheEntry.expires_at > datetime.utcnow(),
+            )
+        )
+        if db_entry is None:
+            return None
+
+        with self._lock:
+            self.database_hits += 1
+        coordinates = (db_entry.longitude, db_entry.latitude)
+        remaining = (db_entry.expires_at - datetime.utcnow()).total_seconds()
+        self.memory.set(key, coordinates, ttl_seconds=remaining)
+        return coordinates
+
+    async def _get_from_provider(
+        self,
+        db: AsyncSession,
+        key: str,
+        location_name: str,
+        ors_client: OpenRouteServiceClient,
+    ):
+        with self._lock:
+            self.provider_calls += 1
+        try:
+            coordinates = await ors_client.get_coordinates(location_name)
+            ttl_seconds = self.ttl_seconds
+        except ValueError:
+            # Only "nothing found" is cached, network and HTTP errors are not
+            coordinates = (None, None)
+            ttl_seconds = self.negative_ttl_seconds
+
+        await self._store(db, key, coordinates, ttl_seconds)
+        self.memory.set(key, coordinates, ttl_seconds=ttl_seconds)
+        return coordinates
+
+    async def _store(self, db: AsyncSession, key: str, coordinates, ttl_seconds: int):
+        """Write the entry in the caller's transaction, left for it to commit."""
+        longitude, latitude = coordinates
+        stmt = insert_for(db, GeocodeCacheEntry).values(
+            query_key=key,
+            longitude=longitude,
+            latitude=latitude,
+            expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds),
+        )
+        # Replaces an expired entry, or one another worker stored meanwhile
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["query_key"],
+                set_={
+                    "longitude": stmt.excluded.longitude,
+                    "latitude": stmt.excluded.latitude,
+                    "expires_at": stmt.excluded.expires_at,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory.hits,
+            "database_hits": self.database_hits,
+            "provider_calls": self.provider_calls,
+            "memory_entries": len(self.memory),
+        }
+
+    def clear(self):
+        self.memory.clear()
+        with self._lock:
+            self.database_hits = 0
+            self.provider_calls = 0
+
+
+geocode_cache = GeocodeCache()
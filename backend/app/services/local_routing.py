@@ -0,0 +1,133 @@
+import csv
+import hashlib
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..utils.geo import EARTH_RADIUS_KM, haversine_km
+from .geocode_cache import NOT_FOUND_MESSAGE, normalize_geocode_query
+from .openrouteservice import Coordinates
+
+GAZETTEER_PATH = os.getenv(
+    "LOCAL_ROUTING_GAZETTEER_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv"),
+)
+LOCAL_ROUTING_WALKING_SPEED_KMH = float(
+    os.getenv("LOCAL_ROUTING_WALKING_SPEED_KMH", "5")
+)
+# Streets are not straight lines, so stretch the great-circle distance a little
+LOCAL_ROUTING_DETOUR_FACTOR = float(os.getenv("LOCAL_ROUTING_DETOUR_FACTOR", "1.3"))
+# Pairs further apart than this are reported as unroutable, like ORS does
+LOCAL_ROUTING_MAX_DISTANCE_KM = float(
+    os.getenv("LOCAL_ROUTING_MAX_DISTANCE_KM", "1000")
+)
+
+# (longitude, latitude, radius in km)
+GazetteerEntry = Tuple[float, float, float]
+
+
+def load_gazetteer(path: str = GAZETTEER_PATH) -> Dict[str, GazetteerEntry]:
+    with open(path, newline="", encoding="utf-8") as gazetteer_file:
+        return {
+            normalize_geocode_query(row["name"]): (
+                float(row["longitude"]),
+                float(row["latitude"]),
+                float(row["radius_km"]),
+            )
+            for row in csv.DictReader(gazetteer_file)
+        }
+
+
+def _offset_within(
+    query: str, longitude: float, latitude: float, radius_km: float
+) -> Coordinates:
+    # Same query -> same point, spread evenly over the place's area
+    digest = hashlib.sha256(query.encode("utf-8")).digest()
+    bearing = int.from_bytes(digest[:4], "big") / 2**32 * 2 * math.pi
+    distance_km = radius_km * math.sqrt(int.from_bytes(digest[4:8], "big") / 2**32)
+
+    delta_lat = math.degrees(distance_km * math.cos(bearing) / EARTH_RADIUS_KM)
+    delta_long = math.degrees(
+        distance_km
+        * math.sin(bearing)
+        / (EARTH_RADIUS_KM * math.cos(math.radians(latitude)))
+    )
+    return longitude + delta_long, latitude + delta_lat
+
+
+class LocalRoutingClient:
+    """
+    Offline stand-in for OpenRouteServiceClient, for load tests and CI.
+
+    Geocodes from a bundled gazetteer and estimates walking durations from the
+    haversine distance and a walking speed, so no ORS quota is used. Addresses
+    resolve to the most specific comma-separated part found in the gazetteer,
+    offset by a stable amount within that place so different streets in the
+    same city get different coordinates.
+    """
+
+    def __init__(
+        self,
+        gazetteer: Optional[Dict[str, GazetteerEntry]] = None,
+        walking_speed_kmh: float = LOCAL_ROUTING_WALKING_SPEED_KMH,
+        detour_factor: float = LOCAL_ROUTING_DETOUR_FACTOR,
+        max_distance_km: float = LOCAL_ROUTING_MAX_DISTANCE_KM,
+    ):
+        self.gazetteer = load_gazetteer() if gazetteer is None else gazetteer
+        self.walking_speed_kmh = walking_speed_kmh
+        self.detour_factor = detour_factor
+        self.max_distance_km = max_distance_km
+
+    async def aclose(self):
+        pass
+
+    async def get_coordinates(self, location_name: str):
+        """Look up GPS coordinates (longitude, latitude) in the gazetteer."""
+        query = normalize_geocode_query(location_name)
+        parts = [normalize_geocode_query(part) for part in location_name.split(",")]
+        for part in [query] + parts:
+            entry = self.gazetteer.get(part)
+            if entry is None:
+                continue
+            longitude, latitude, radius_km = entry
+            if part == query:
+                return longitude, latitude
+            return _offset_within(query, longitude, latitude, radius_km)
+        raise ValueError(NOT_FOUND_MESSAGE)
+
+    def _duration_minutes(
+        self, start_long: float, start_lat: float, end_long: float, end_lat: float
+    ) -> Optional[float]:
+        distance_km = haversine_km(start_long, start_lat, end_long, end_lat)
+        if distance_km > self.max_distance_km:
+            return None
+        return distance_km * self.detour_factor / self.walking_speed_kmh * 60
+
+    async def get_route_duration_minutes(
+        self,
+        start_long: float,
+        start_lat: float,
+        end_long: float,
+        end_lat: float,
+        profile="foot-walking",
+    ):
+        """Estimate the walking duration in minutes between two coordinate pairs."""
+        minutes = self._duration_minutes(start_long, start_lat, end_long, end_lat)
+        if minutes is None:
+            raise ValueError("No route data found for the given coordinates.")
+        return minutes
+
+    async def get_duration_matrix_minutes(
+        self,
+        sources: Sequence[Coordinates],
+        destinations: Sequence[Coordinates],
+        profile="foot-walking",
+    ) -> List[List[Optional[float]]]:
+        """Same grid as OpenRouteServiceClient.get_duration_matrix_minutes."""
+        return [
+            [
+                self._duration_minutes(*source, *destination)
+                for destination in destinations
+            ]
+            for source in sources
+        ]
@@ -1,26 +1,216 @@
+import asyncio
 import os
+import random
+import time
+from typing import List, Optional, Sequence, Tuple
 
-import requests
+import httpx
+
+from ..utils.pool import WEB_CONCURRENCY
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .metrics import ors_errors, ors_request_duration, ors_requests
+from .rate_limit import RateLimiter
+
+# (longitude, latitude) pair, matching the order ORS uses for coordinates
+Coordinates = Tuple[float, float]
+
+
+ORS_TIMEOUT_SECONDS = float(os.getenv("ORS_TIMEOUT_SECONDS", "30"))
+ORS_CONNECT_TIMEOUT_SECONDS = float(os.getenv("ORS_CONNECT_TIMEOUT_SECONDS", "5"))
+ORS_MAX_CONNECTIONS = int(os.getenv("ORS_MAX_CONNECTIONS", "20"))
+ORS_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ORS_MAX_KEEPALIVE_CONNECTIONS", "10"))
+ORS_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("ORS_KEEPALIVE_EXPIRY_SECONDS", "30"))
+# Most requests in flight at once, across every caller sharing the client
+ORS_MAX_CONCURRENCY = int(os.getenv("ORS_MAX_CONCURRENCY", "10"))
+# Retries for rate limited (429), 5xx, timed out and dropped requests
+ORS_MAX_RETRIES = int(os.getenv("ORS_MAX_RETRIES", "3"))
+# Exponential backoff between retries: base, 2 x base, 4 x base... up to the max
+ORS_RETRY_BASE_SECONDS = float(os.getenv("ORS_RETRY_BASE_SECONDS", "0.5"))
+ORS_RETRY_MAX_SECONDS = float(os.getenv("ORS_RETRY_MAX_SECONDS", "10"))
+# Requests that fail after their retries in a row before ORS is treated as down
+ORS_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("ORS_CIRCUIT_FAILURE_THRESHOLD", "5"))
+# How long to fail fast before trying ORS again
+ORS_CIRCUIT_RESET_SECONDS = float(os.getenv("ORS_CIRCUIT_RESET_SECONDS", "30"))
+# Turn off for plans without the matrix API, routes then use concurrent directions calls
+ORS_USE_MATRIX = os.getenv("ORS_USE_MATRIX", "true").lower() == "true"
+
+# Distance workers running against the same API key, see process_quota
+DISTANCE_WORKERS = int(os.getenv("DISTANCE_WORKERS", "1"))
+
+# Requests per minute and per day for each ORS API, the free plan's quotas by
+# default. These are for the whole API key, and the limiters are per process, so
+# each process takes a share of the quotas it uses, see process_quota.
+ORS_QUOTAS = {
+    "directions": (
+        int(os.getenv("ORS_DIRECTIONS_PER_MINUTE", "40")),
+        int(os.getenv("ORS_DIRECTIONS_PER_DAY", "2000")),
+    ),
+    "matrix": (
+        int(os.getenv("ORS_MATRIX_PER_MINUTE", "40")),
+        int(os.getenv("ORS_MATRIX_PER_DAY", "500")),
+    ),
+    "geocode": (
+        int(os.getenv("ORS_GEOCODE_PER_MINUTE", "100")),
+        int(os.getenv("ORS_GEOCODE_PER_DAY", "1000")),
+    ),
+}
+
+
+def process_quota(api_name: str, quota: int) -> int:
+    """
+    This process's share of a quota for the API key. Only the WEB_CONCURRENCY
+    gunicorn workers geocode and only the DISTANCE_WORKERS distance workers
+    route, so each API's quota is split between the processes calling it.
+    """
+    processes = WEB_CONCURRENCY if api_name == "geocode" else DISTANCE_WORKERS
+    return max(1, quota // processes)
+
+
+def _backoff_seconds(attempt: int) -> float:
+    delay = min(ORS_RETRY_MAX_SECONDS, ORS_RETRY_BASE_SECONDS * 2**attempt)
+    # Full jitter, so clients that failed together do not retry together
+    return random.uniform(0, delay)
+
+
+def _is_client_error(error: Exception) -> bool:
+    return (
+        isinstance(error, httpx.HTTPStatusError)
+        and 400 <= error.response.status_code < 500
+    )
 
 
 class OpenRouteServiceClient:
+    """
+    Async ORS client sharing one pool of keep-alive connections.
+
+    Create one per process (the API does so at startup, see main.lifespan) and
+    close it with aclose() when done.
+    """
+
     BASE_URL = "https://api.openrouteservice.org"
+    # ORS caps a single matrix request at sources x destinations routes
+    MATRIX_MAX_ROUTES = 3500
 
-    def __init__(self, api_key: str = os.getenv("OPENROUTESERVICE_API_KEY")):
+    def __init__(
+        self,
+        api_key: str = os.getenv("OPENROUTESERVICE_API_KEY"),
+        timeout: float = ORS_TIMEOUT_SECONDS,
+        connect_timeout: float = ORS_CONNECT_TIMEOUT_SECONDS,
+        max_connections: int = ORS_MAX_CONNECTIONS,
+        max_keepalive_connections: int = ORS_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = ORS_KEEPALIVE_EXPIRY_SECONDS,
+        max_concurrency: int = ORS_MAX_CONCURRENCY,
+        use_matrix: bool = ORS_USE_MATRIX,
+    ):
         self.api_key = api_key
+        self.use_matrix = use_matrix
+        self.rate_limiters = {
+            name: RateLimiter(
+                process_quota(name, per_minute), process_quota(name, per_day)
+            )
+            for name, (per_minute, per_day) in ORS_QUOTAS.items()
+        }
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+        self.circuit_breaker = CircuitBreaker(
+            ORS_CIRCUIT_FAILURE_THRESHOLD, ORS_CIRCUIT_RESET_SECONDS
+        )
+        self._http = httpx.AsyncClient(
+            base_url=self.BASE_URL,
+            headers={"Authorization": f"{api_key}"},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
 
-    def _request(self, endpoint: str, params: dict):
-        url = f"{self.BASE_URL}{endpoint}"
-        headers = {"Authorization": f"{self.api_key}"}
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()  # Raise an exception for bad status codes
+    async def aclose(self):
+        await self._http.aclose()
+
+    def _api_name(self, endpoint: str) -> str:
+        # e.g. "/v2/matrix/foot-walking" -> "matrix", "/geocode/search" -> "geocode"
+        for name in self.rate_limiters:
+            if f"/{name}" in endpoint:
+                return name
+        raise ValueError(f"No rate limit configured for {endpoint}")
+
+    async def _send(self, method: str, endpoint: str, **kwargs):
+        api_name = self._api_name(endpoint)
+        # Fails fast with CircuitOpenError while ORS is down
+        try:
+            self.circuit_breaker.before_call()
+        except CircuitOpenError:
+            ors_errors.inc(endpoint=api_name, reason="circuit_open")
+            raise
+        try:
+            response = await self._send_with_retries(method, endpoint, **kwargs)
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            # ORS answered a client error (bad input, out of quota), so it is up
+            if _is_client_error(e):
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.record_failure()
+            reason = (
+                "transport" if isinstance(e, httpx.TransportError) else "http_status"
+            )
+            ors_errors.inc(endpoint=api_name, reason=reason)
+            raise
+        except BaseException:
+            # Anything else, e.g. an undecodable body or the task being cancelled,
+            # must still end a half-open trial, or the circuit never closes again
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
         return response.json()
 
-    def get_coordinates(self, location_name: str):
+    async def _send_with_retries(self, method: str, endpoint: str, **kwargs):
+        api_name = self._api_name(endpoint)
+        rate_limiter = self.rate_limiters[api_name]
+        for attempt in range(ORS_MAX_RETRIES + 1):
+            is_last_attempt = attempt == ORS_MAX_RETRIES
+            await rate_limiter.acquire()
+            try:
+                async with self._concurrency:
+                    start = time.perf_counter()
+                    try:
+                        response = await self._http.request(method, endpoint, **kwargs)
+                    finally:
+                        ors_request_duration.observe(
+                            time.perf_counter() - start, endpoint=api_name
+                        )
+            except httpx.TransportError:
+                # Timeouts, refused and dropped connections
+                ors_requests.inc(endpoint=api_name, status="error")
+                if is_last_attempt:
+                    raise
+                await asyncio.sleep(_backoff_seconds(attempt))
+                continue
+
+            ors_requests.inc(endpoint=api_name, status=response.status_code)
+            # Backs off every caller of this API (in acquire), not just this request
+            rate_limited = (
+                rate_limiter.observe(response.status_code, response.headers) is not None
+            )
+            server_error = response.status_code >= 500
+            if is_last_attempt or not (rate_limited or server_error):
+                break
+            if server_error:
+                await asyncio.sleep(_backoff_seconds(attempt))
+        response.raise_for_status()  # Raise an exception for bad status codes
+        return response
+
+    async def _request(self, endpoint: str, params: dict):
+        return await self._send("GET", endpoint, params=params)
+
+    async def _post(self, endpoint: str, body: dict):
+        return await self._send("POST", endpoint, json=body)
+
+    async def get_coordinates(self, location_name: str):
         """Fetch GPS coordinates (longitude, latitude) for a given location string."""
         endpoint = "/geocode/search"
         params = {"text": location_name, "size": 1}
-        data = self._request(endpoint, params)
+        data = await self._request(endpoint, params)
 
         # Extract coordinates from the first result (features[0].geometry.coordinates)
         features = data.get("features")
@@ -31,7 +221,7 @@ class OpenRouteServiceClient:
         longitude, latitude = coordinates[0], coordinates[1]
         return longitude, latitude
 
-    def get_route_duration_minutes(
+    async def get_route_duration_minutes(
         self,
         start_long: float,
         start_lat: float,
@@ -46,7 +236,7 @@ class OpenRouteServiceClient:
             "start": f"{start_long},{start_lat}",
             "end": f"{end_long},{end_lat}",
         }
-        data = self._request(endpoint, params)
+        data = await self._request(endpoint, params)
 
         # Extract duration from the first result (features[0].properties.summary.duration)
         features = data.get("features")
@@ -59,3 +249,125 @@ class OpenRouteServiceClient:
 
         duration = features[0]["properties"]["summary"]["duration"]
         return duration / 60
+
+    async def get_duration_matrix_minutes(
+        self,
+        sources: Sequence[Coordinates],
+        destinations: Sequence[Coordinates],
+        profile="foot-walking",
+    ) -> List[List[Optional[float]]]:
+        """
+        Fetch durations in minutes from every source to every destination.
+
+        Returns a len(sources) x len(destinations) grid. Pairs ORS cannot route
+        between are None. Large inputs are split into as many matrix requests as
+        needed to stay within the provider's per-request limits. Without the
+        matrix API (use_matrix=False) each pair is a directions call instead.
+        """
+        matrix: List[List[Optional[float]]] = [
+            [None] * len(destinations) for _ in sources
+        ]
+        if not sources or not destinations:
+            return matrix
+        if not self.use_matrix:
+            return await self._get_duration_grid_by_directions(
+                sources, destinations, profile
+            )
+
+        source_chunk_size, destination_chunk_size = self._matrix_chunk_sizes(
+            len(sources), len(destinations)
+        )
+        chunks = [
+            (source_start, destination_start)
+            for source_start in range(0, len(sources), source_chunk_size)
+            for destination_start in range(0, len(destinations), destination_chunk_size)
+        ]
+        # Chunks are independent, so fetch them concurrently over the shared pool
+        results = await asyncio.gather(
+            *(
+                self._request_matrix(
+                    sources[source_start : source_start + source_chunk_size],
+                    destinations[
+                        destination_start : destination_start + destination_chunk_size
+                    ],
+                    profile,
+                )
+                for source_start, destination_start in chunks
+            )
+        )
+        for (source_start, destination_start), durations in zip(chunks, results):
+            for i, row in enumerate(durations):
+                for j, duration in enumerate(row):
+                    matrix[source_start + i][destination_start + j] = duration
+        return matrix
+
+    async def _get_duration_grid_by_directions(
+        self,
+        sources: Sequence[Coordinates],
+        destinations: Sequence[Coordinates],
+        profile: str,
+    ) -> List[List[Optional[float]]]:
+        async def get_duration(source: Coordinates, destination: Coordinates):
+            try:
+                return await self.get_route_duration_minutes(
+                    start_long=source[0],
+                    start_lat=source[1],
+                    end_long=destination[0],
+                    end_lat=destination[1],
+                    profile=profile,
+                )
+            except ValueError:
+                return None
+
+        # Runs as many at once as the concurrency limit and quota allow
+        durations = await asyncio.gather(
+            *(
+                get_duration(source, destination)
+                for source in sources
+                for destination in destinations
+            )
+        )
+        width = len(destinations)
+        return [
+            list(durations[row * width : (row + 1) * width])
+            for row in range(len(sources))
+        ]
+
+    def _matrix_chunk_sizes(self, source_count: int, destination_count: int):
+        # Keep the smaller side whole where possible so the larger side gets the
+        # biggest chunks, e.g. one home against every location.
+        if source_count <= destination_count:
+            source_chunk_size = min(source_count, self.MATRIX_MAX_ROUTES)
+            destination_chunk_size = self.MATRIX_MAX_ROUTES // source_chunk_size
+        else:
+            destination_chunk_size = min(destination_count, self.MATRIX_MAX_ROUTES)
+            source_chunk_size = self.MATRIX_MAX_ROUTES // destination_chunk_size
+        return source_chunk_size, destination_chunk_size
+
+    async def _request_matrix(
+        self,
+        sources: Sequence[Coordinates],
+        destinations: Sequence[Coordinates],
+        profile: str,
+    ) -> List[List[Optional[float]]]:
+        endpoint = f"/v2/matrix/{profile}"
+        locations = [list(coordinates) for coordinates in sources] + [
+            list(coordinates) for coordinates in destinations
+        ]
+        body = {
+            "locations": locations,
+            "sources": list(range(len(sources))),
+            "destinations": list(range(len(sources), len(locations))),
+            "metrics": ["duration"],
+        }
+        data = await self._post(endpoint, body)
+
+        durations = data.get("durations")
+        if durations is None or len(durations) != len(sources):
+            raise ValueError("No matrix data found for the given coordinates.")
+
+        # Durations are in seconds, and null where no route could be found
+        return [
+            [None if duration is None else duration / 60 for duration in row]
+            for row in durations
+        ]
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+class TokenBucket:
+    """
+    Allows `capacity` calls in a burst, refilled at `capacity` per `period` seconds.
+    """
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.refill_per_second = capacity / period
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated_at) * self.refill_per_second,
+        )
+        self._updated_at = now
+
+    def time_until_available(self) -> float:
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.refill_per_second
+
+    def take(self):
+        self._refill()
+        self._tokens -= 1
+
+    def drain(self):
+        """Give up all remaining tokens, e.g. when the provider says we are out."""
+        self._refill()
+        self._tokens = min(self._tokens, 0)
+
+
+class RateLimiter:
+    """
+    Per-minute and per-day token buckets for one provider quota.
+
+    Also backs off when told to by the provider, either through a 429 or its
+    rate limit headers, until the time the provider says the quota resets.
+    """
+
+    def __init__(self, per_minute: int, per_day: int):
+        self.minute = TokenBucket(per_minute, 60)
+        self.day = TokenBucket(per_day, 24 * 60 * 60)
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # One waiter at a time, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                wait = max(
+                    self._resume_at - time.monotonic(),
+                    self.minute.time_until_available(),
+                    self.day.time_until_available(),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.minute.take()
+            self.day.take()
+
+    def back_off(self, seconds: float):
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> Optional[float]:
+        """
+        Adjust to a provider response, returning how long to back off for if the
+        request was rate limited.
+        """
+        remaining = _parse_float(headers.get("x-ratelimit-remaining"))
+        reset_in = _seconds_until_reset(headers.get("x-ratelimit-reset"))
+        if remaining is not None and remaining < 1:
+            self.minute.drain()
+            if reset_in is not None:
+                self.back_off(reset_in)
+
+        if status_code != 429:
+            return None
+        delay = _parse_retry_after(headers.get("retry-after"))
+        if delay is None:
+            delay = reset_in
+        if delay is None:
+            # Nothing to go on, so assume our bucket is out of step with theirs
+            self.minute.drain()
+            delay = 60 / self.minute.capacity
+        self.back_off(delay)
+        return delay
+
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _seconds_until_reset(value: Optional[str]) -> Optional[float]:
+    # ORS sends the reset time as a unix timestamp
+    reset_at = _parse_float(value)
+    if reset_at is None:
+        return None
+    return max(0.0, reset_at - time.time())
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Either a number of seconds or an HTTP date
+    seconds = _parse_float(value)
+    if seconds is not None or value is None:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import os
+import threading
+from typing import Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from ..utils.lru import LRUCache
+
+# "memory" keeps responses per process, "redis" shares them between gunicorn
+# workers (and sees invalidations from the distance worker), "none" disables it
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://redis:6379/0")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+# Upper bound on how stale a response can be when an invalidation is missed,
+# e.g. by another process with the memory backend
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+
+# What a cached response depends on, invalidated by the CRUD functions
+HOMES = "homes"
+LOCATIONS = "locations"
+DISTANCES = "distances"
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheBackend(Protocol):
+    """
+    Where responses and namespace generations are kept. A backend that cannot
+    be reached answers None, for a miss, and skips writes.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl_seconds: int): ...
+
+    async def generations(self, namespaces: Sequence[str]) -> Optional[List[int]]: ...
+
+    async def bump(self, namespace: str): ...
+
+    async def clear(self): ...
+
+
+class MemoryBackend:
+    """Responses in an in-process LRU, generations in a dict."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.entries = LRUCache(maxsize)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: int):
+        self.entries.set(key, value, ttl_seconds=ttl_seconds)
+
+    async def generations(self, namespaces: Sequence[str]) -> Optional[List[int]]:
+        return [self._generations.get(namespace, 0) for namespace in namespaces]
+
+    async def bump(self, namespace: str):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    async def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self._generations.clear()
+
+
+class RedisBackend:
+    """
+    Responses and generations in Redis, shared by every process using it.
+
+    While Redis is down requests are served uncached rather than failing.
+    Invalidations made meanwhile are lost, so entries can be stale for up to
+    their TTL once it is back.
+    """
+
+    def __init__(
+        self,
+        url: str = RESPONSE_CACHE_REDIS_URL,
+        prefix: str = "response:",
+        client=None,
+    ):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError(
+                "RESPONSE_CACHE_BACKEND=redis needs the redis package installed"
+            )
+        self._errors = redis.RedisError
+        self.client = client or redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"{self.prefix}generation:{namespace}"
+
+    def _unavailable(self, operation: str):
+        logger.warning("Response cache %s failed, Redis is unavailable", operation)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.client.get(self.prefix + key)
+        except self._errors:
+            self._unavailable("get")
+            return None
+
+    async def set(self, key: str, value: bytes, ttl_seconds: int):
+        try:
+            await self.client.set(self.prefix + key, value, ex=ttl_seconds)
+        except self._errors:
+            self._unavailable("set")
+
+    async def generations(self, namespaces: Sequence[str]) -> Optional[List[int]]:
+        # One round trip for every namespace a response depends on
+        try:
+            values = await self.client.mget(
+                [self._generation_key(namespace) for namespace in namespaces]
+            )
+        except self._errors:
+            self._unavailable("generation lookup")
+            return None
+        return [int(value or 0) for value in values]
+
+    async def bump(self, namespace: str):
+        try:
+            await self.client.incr(self._generation_key(namespace))
+        except self._errors:
+            self._unavailable("invalidation")
+
+    async def clear(self):
+        try:
+            async for key in self.client.scan_iter(match=self.prefix + "*"):
+                await self.client.delete(key)
+        except self._errors:
+            self._unavailable("clear")
+
+
+def make_etag(body: bytes) -> str:
+    # Strong, as the body is reproduced byte for byte. Every item in it carries
+    # its updated_at, so any change to a row changes the tag.
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class ResponseCache:
+    """
+    Caches serialised GET responses along with their ETags.
+
+    Entries are keyed by the request URL and the current generation of every
+    namespace the response depends on. Invalidating a namespace bumps its
+    generation, so stale entries are never read again and simply expire.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[ResponseCacheBackend] = None,
+        ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def key(self, url: str, namespaces: Iterable[str]) -> Optional[str]:
+        """The entry's key, or None if the backend is unavailable."""
+        namespaces = sorted(namespaces)
+        generations = await self.backend.generations(namespaces)
+        if generations is None:
+            return None
+        return (
+            ",".join(
+                f"{namespace}:{generation}"
+                for namespace, generation in zip(namespaces, generations)
+            )
+            + f"|{url}"
+        )
+
+    async def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, body = value.split(b"\n", 1)
+        return etag.decode(), body
+
+    async def set(self, key: str, etag: str, body: bytes):
+        await self.backend.set(key, etag.encode() + b"\n" + body, self.ttl_seconds)
+
+    async def invalidate(self, *namespaces: str):
+        if not self.enabled:
+            return
+        for namespace in namespaces:
+            await self.backend.bump(namespace)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    async def clear(self):
+        if self.enabled:
+            await self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def create_response_cache(backend: str = RESPONSE_CACHE_BACKEND) -> ResponseCache:
+    if backend == "none":
+        return ResponseCache(None)
+    if backend == "memory":
+        return ResponseCache(MemoryBackend())
+    if backend == "redis":
+        return ResponseCache(RedisBackend())
+    raise ValueError(
+        f"Unknown RESPONSE_CACHE_BACKEND {backend!r}, expected memory, redis or none"
+    )
+
+
+response_cache = create_response_cache()
@@ -0,0 +1,150 @@
+import os
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import RouteDuration
+from ..utils.lru import LRUCache
+from ..utils.upsert import insert_for
+from .openrouteservice import Coordinates, OpenRouteServiceClient
+
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "100000"))
+# Decimal places coordinates are rounded to, 5 places is roughly a metre
+ROUTE_CACHE_PRECISION = int(os.getenv("ROUTE_CACHE_PRECISION", "5"))
+ROUTE_CACHE_PERSISTENT = os.getenv("ROUTE_CACHE_PERSISTENT", "true").lower() == "true"
+
+# Keeps "IN (...)" lookups under SQLite's bound parameter limit
+_LOOKUP_BATCH_SIZE = 500
+_MISSING = object()
+
+
+def route_cache_key(
+    profile: str, start: Coordinates, end: Coordinates, precision: int
+) -> str:
+    start_long, start_lat = (round(value, precision) for value in start)
+    end_long, end_lat = (round(value, precision) for value in end)
+    return f"{profile}|{start_long},{start_lat}|{end_long},{end_lat}"
+
+
+class RouteDurationCache:
+    """
+    Caches route durations by profile and rounded start/end coordinates.
+
+    Durations are kept in an in-process LRU and, when persistent, in the
+    route_durations table so they survive restarts and are shared by workers.
+    Unroutable pairs are cached as None like any other result.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = ROUTE_CACHE_SIZE,
+        precision: int = ROUTE_CACHE_PRECISION,
+        persistent: bool = ROUTE_CACHE_PERSISTENT,
+    ):
+        self.precision = precision
+        self.persistent = persistent
+        self.memory = LRUCache(maxsize)
+        self.database_hits = 0
+        self.provider_routes = 0
+
+    async def get_duration_matrix_minutes(
+        self,
+        db: AsyncSession,
+        ors_client: OpenRouteServiceClient,
+        sources: Sequence[Coordinates],
+        destinations: Sequence[Coordinates],
+        profile="foot-walking",
+    ) -> List[List[Optional[float]]]:
+        """Same as OpenRouteServiceClient.get_duration_matrix_minutes, but cached."""
+        keys = [
+            [
+                route_cache_key(profile, source, destination, self.precision)
+                for destination in destinations
+            ]
+            for source in sources
+        ]
+        durations = await self._lookup(db, {key for row in keys for key in row})
+
+        # Only ask the provider for the sources and destinations with a miss
+        missing_sources = sorted(
+            {i for i, row in enumerate(keys) for key in row if key not in durations}
+        )
+        missing_destinations = sorted(
+            {j for row in keys for j, key in enumerate(row) if key not in durations}
+        )
+        if missing_sources:
+            matrix = await ors_client.get_duration_matrix_minutes(
+                sources=[sources[i] for i in missing_sources],
+                destinations=[destinations[j] for j in missing_destinations],
+                profile=profile,
+            )
+            fetched = {}
+            for row_index, i in enumerate(missing_sources):
+                for column_index, j in enumerate(missing_destinations):
+                    # The rectangle fetched can cover pairs that were already cached
+                    if keys[i][j] not in durations:
+                        fetched[keys[i][j]] = matrix[row_index][column_index]
+            self.provider_routes += len(fetched)
+            await self._store(db, fetched)
+            durations.update(fetched)
+
+        return [[durations[key] for key in row] for row in keys]
+
+    async def _lookup(self, db: AsyncSession, keys: set) -> Dict[str, Optional[float]]:
+        durations = {}
+        for key in keys:
+            duration = self.memory.get(key, _MISSING)
+            if duration is not _MISSING:
+                durations[key] = duration
+        if not self.persistent:
+            return durations
+
+        missing = [key for key in keys if key not in durations]
+        for start in range(0, len(missing), _LOOKUP_BATCH_SIZE):
+            batch = missing[start : start + _LOOKUP_BATCH_SIZE]
+            result = await db.execute(
+                select(RouteDuration.route_key, RouteDuration.duration_minutes).where(
+                    RouteDuration.route_key.in_(batch)
+                )
+            )
+            for route_key, duration_minutes in result:
+                durations[route_key] = duration_minutes
+                self.memory.set(route_key, duration_minutes)
+                self.database_hits += 1
+        return durations
+
+    async def _store(self, db: AsyncSession, durations: Dict[str, Optional[float]]):
+        for key, duration in durations.items():
+            self.memory.set(key, duration)
+        if not self.persistent or not durations:
+            return
+
+        rows = [
+            {"route_key": key, "duration_minutes": duration}
+            for key, duration in durations.items()
+        ]
+        # Another worker may have stored some of the same routes meanwhile, keep
+        # theirs rather than failing the batch. Left for the caller to commit.
+        await db.execute(
+            insert_for(db, RouteDuration).on_conflict_do_nothing(
+                index_elements=["route_key"]
+            ),
+            rows,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory.hits,
+            "database_hits": self.database_hits,
+            "provider_routes": self.provider_routes,
+            "memory_entries": len(self.memory),
+        }
+
+    def clear(self):
+        self.memory.clear()
+        self.database_hits = 0
+        self.provider_routes = 0
+
+
+route_cache = RouteDurationCache()
@@ -0,0 +1,40 @@
+import os
+from typing import List, Optional, Protocol, Sequence
+
+from .local_routing import LocalRoutingClient
+from .openrouteservice import Coordinates, OpenRouteServiceClient
+
+# "ors" for OpenRouteService, "local" for the offline gazetteer/haversine backend
+ROUTING_BACKEND = os.getenv("ROUTING_BACKEND", "ors").lower()
+
+
+class RoutingClient(Protocol):
+    """What the app needs from a geocoding and routing provider."""
+
+    async def aclose(self): ...
+
+    async def get_coordinates(self, location_name: str): ...
+
+    async def get_route_duration_minutes(
+        self,
+        start_long: float,
+        start_lat: float,
+        end_long: float,
+        end_lat: float,
+        profile="foot-walking",
+    ): ...
+
+    async def get_duration_matrix_minutes(
+        self,
+        sources: Sequence[Coordinates],
+        destinations: Sequence[Coordinates],
+        profile="foot-walking",
+    ) -> List[List[Optional[float]]]: ...
+
+
+def create_routing_client(backend: str = ROUTING_BACKEND) -> RoutingClient:
+    if backend == "ors":
+        return OpenRouteServiceClient()
+    if backend == "local":
+        return LocalRoutingClient()
+    raise ValueError(f"Unknown routing backend {backend!r}, expected 'ors' or 'local'")
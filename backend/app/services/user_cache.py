@@ -0,0 +1,55 @@
+import os
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.user import User
+from ..utils.lru import LRUCache
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Also how long another process can see a user as it was before an update
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+
+class UserCache:
+    """
+    Caches the users behind authenticated requests, by id.
+
+    Only column values are kept, and every lookup returns a fresh User that is
+    not attached to any session, so requests never share an instance.
+    Invalidated by crud.user.update_user and delete_user.
+    """
+
+    def __init__(
+        self, maxsize: int = USER_CACHE_SIZE, ttl_seconds: int = USER_CACHE_TTL_SECONDS
+    ):
+        self.memory = LRUCache(maxsize, ttl_seconds=ttl_seconds)
+
+    async def get_user(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        values = self.memory.get(user_id)
+        if values is None:
+            db_user = await db.get(User, user_id)
+            if db_user is None:
+                return None
+            values = {
+                column.key: getattr(db_user, column.key)
+                for column in User.__table__.columns
+            }
+            self.memory.set(user_id, values)
+        return User(**values)
+
+    def invalidate(self, user_id: int):
+        self.memory.delete(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.memory.hits,
+            "misses": self.memory.misses,
+            "entries": len(self.memory),
+        }
+
+    def clear(self):
+        self.memory.clear()
+
+
+user_cache = UserCache()
@@ -1,11 +1,16 @@
+import asyncio
+import logging
 import os
 import time
 
-from sqlalchemy import create_engine
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+
+from .pool import engine_options
 
 DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
@@ -13,24 +18,89 @@ DATABASE_URL = os.getenv("DATABASE_URL") or (
 )
 
 
-print("DB_USER:", os.getenv("DB_USER"))
-print("DATABASE_URL:", DATABASE_URL)
+# How long startup waits for the database, e.g. while its container starts
+DB_CONNECT_ATTEMPTS = int(os.getenv("DB_CONNECT_ATTEMPTS", "10"))
+DB_CONNECT_RETRY_SECONDS = float(os.getenv("DB_CONNECT_RETRY_SECONDS", "1"))
+
+logger = logging.getLogger(__name__)
+
+engine = create_engine(DATABASE_URL, **engine_options(make_url(DATABASE_URL)))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+Base = declarative_base()
+
+
+def async_database_url(url: str) -> URL:
+    """The same database through an asyncio driver, asyncpg or aiosqlite."""
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+# Requests and the worker use the async engine. The sync one above is for
+# Alembic and scripts that do not go through the CRUD functions.
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, asyncio=True)
+)
+
 
-for _ in range(10):
-    try:
-        if DATABASE_URL.startswith("sqlite"):
-            engine = create_engine(
-                DATABASE_URL,
-                connect_args={"check_same_thread": False},
-                poolclass=StaticPool,
+# SQLite leaves foreign keys unchecked unless asked, and relationships leave
+# ON DELETE CASCADE to the database (passive_deletes), as on PostgreSQL
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _enable_sqlite_foreign_keys)
+
+# Not expiring on commit, as reloading an attribute would need IO outside an await
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+# Engines connect lazily, so only a query shows whether the database is up
+def wait_for_database(attempts: int = DB_CONNECT_ATTEMPTS):
+    """Block until the database answers a query, raising after `attempts`."""
+    for attempt in range(1, attempts + 1):
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return
+        except (DBAPIError, OSError):
+            if attempt == attempts:
+                raise
+            # A URL's str() masks its password
+            logger.warning(
+                "Database not ready yet, waiting",
+                extra={"attempt": attempt, "database_url": str(engine.url)},
             )
-        else:
-            engine = create_engine(DATABASE_URL)
+            time.sleep(DB_CONNECT_RETRY_SECONDS)
+
 
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async def check_database():
+    """Run one query on the async engine, raising if the database is down."""
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
 
-        Base = declarative_base()
-        break
-    except OperationalError:
-        print("Database not ready yet, waiting...")
-        time.sleep(1)
+
+async def wait_for_database_async(attempts: int = DB_CONNECT_ATTEMPTS):
+    for attempt in range(1, attempts + 1):
+        try:
+            await check_database()
+            return
+        except (DBAPIError, OSError):
+            if attempt == attempts:
+                raise
+            logger.warning(
+                "Database not ready yet, waiting",
+                extra={"attempt": attempt, "database_url": str(async_engine.url)},
+            )
+            await asyncio.sleep(DB_CONNECT_RETRY_SECONDS)
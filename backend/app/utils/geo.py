@@ -0,0 +1,41 @@
+import math
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Mean radius of the earth, as used by the haversine formula
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(
+    start_long: float, start_lat: float, end_long: float, end_lat: float
+) -> float:
+    """Great-circle distance in kilometres between two (longitude, latitude) points."""
+    start_lat, end_lat = math.radians(start_lat), math.radians(end_lat)
+    delta_lat = end_lat - start_lat
+    delta_long = math.radians(end_long - start_long)
+    a = (
+        math.sin(delta_lat / 2) ** 2
+        + math.cos(start_lat) * math.cos(end_lat) * math.sin(delta_long / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_km_matrix(
+    sources: Sequence[Tuple[float, float]], destinations: Sequence[Tuple[float, float]]
+) -> np.ndarray:
+    """
+    Great-circle distances in kilometres from every source to every destination,
+    as a len(sources) x len(destinations) array. Points are (longitude, latitude).
+    """
+    sources = np.radians(np.asarray(sources, dtype=float).reshape(-1, 2))
+    destinations = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+    start_long, start_lat = sources[:, 0:1], sources[:, 1:2]
+    end_long, end_lat = destinations[:, 0], destinations[:, 1]
+
+    a = (
+        np.sin((end_lat - start_lat) / 2) ** 2
+        + np.cos(start_lat) * np.cos(end_lat) * np.sin((end_long - start_long) / 2) ** 2
+    )
+    # Rounding can push a a hair over 1 for antipodal points
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
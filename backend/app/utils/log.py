@@ -0,0 +1,145 @@
+"""
+Structured logging: one JSON object per line on stdout, written by a
+background thread so a slow stdout (a full pipe, a busy log shipper) does not
+hold up requests.
+
+Call configure_logging() once per process, then log through
+logging.getLogger(__name__). Keyword arguments passed as `extra` become
+fields of the JSON object, e.g.
+
+    logger.info("Distance job failed", extra={"job_id": db_job.id})
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Level for every logger without its own in LOG_LEVELS
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per module levels, e.g. "app.worker=DEBUG,sqlalchemy.engine=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# "json" for log collectors, "text" for reading in a terminal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Set per HTTP request by RequestIdMiddleware and added to every record
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has, so anything else was passed in `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "request_id",
+    "taskName",
+}
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_levels(levels: str) -> Dict[str, str]:
+    """Read LOG_LEVELS, e.g. "app.worker=DEBUG" -> {"app.worker": "DEBUG"}."""
+    parsed = {}
+    for item in levels.split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        if not level:
+            raise ValueError(f"LOG_LEVELS entries are module=LEVEL, got {item!r}")
+        parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        )
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, "request_id", None) or "-"
+        return super().format(record)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread, stamped with the current request ID.
+
+    Context variables are not visible from the listener thread, and the record
+    must not hold on to objects the caller may change after logging, so the
+    message and traceback are rendered here and the rest is left to the thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.request_id = request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(
+    level: str = LOG_LEVEL, levels: str = LOG_LEVELS, log_format: str = LOG_FORMAT
+):
+    """Send every logger's records through one queue to stdout."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(records)]
+    root.setLevel(level.upper())
+    # Uvicorn's loggers write to stderr themselves, send them through the queue
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def stop_logging():
+    """Write out the records still queued, e.g. before the process exits."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
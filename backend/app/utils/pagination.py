@@ -0,0 +1,55 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor for the sort values of the last row on a page."""
+    data = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """Sort values from encode_cursor, raising ValueError if it is not ours."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+async def paginate(
+    db: AsyncSession,
+    statement: Select,
+    sort_columns: Sequence,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    One page of the entities `statement` selects in `sort_columns` order, after
+    the row `cursor` points at, along with the cursor for the next page (None on
+    the last page).
+
+    Seeks straight to the page with an indexed WHERE, so deep pages cost the
+    same as the first. The last sort column must be unique, e.g. the id, and
+    every sort column here is an integer.
+    """
+    if cursor is not None:
+        after = decode_cursor(cursor, len(sort_columns))
+        # bool is a subclass of int, but true is not a row's id
+        if not all(type(value) is int for value in after):
+            raise ValueError("Invalid cursor.")
+        statement = statement.where(tuple_(*sort_columns) > tuple_(*after))
+
+    # One extra row tells us whether there is another page
+    rows = (await db.scalars(statement.order_by(*sort_columns).limit(limit + 1))).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*(getattr(rows[-1], c.key) for c in sort_columns))
@@ -0,0 +1,160 @@
+"""
+Connection pool settings, and pools that time how long checkouts wait.
+
+Every API worker process and the distance worker has its own pools, so the
+database sees up to (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections from each.
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool, StaticPool
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# Connections kept open per process, and how many more it may open under load
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW")
+# Connections the database allows this app in total, e.g. from the RDS instance
+# size. When set, the pool size defaults to an equal share for each of the
+# WEB_CONCURRENCY gunicorn workers and the distance worker.
+DB_MAX_CONNECTIONS = _env_int("DB_MAX_CONNECTIONS")
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Replace connections older than this, before the server or a proxy drops them
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection on checkout, so one dropped while idle is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# PostgreSQL cancels statements running longer than this, 0 for no limit
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def pool_size() -> int:
+    if DB_POOL_SIZE is not None:
+        return DB_POOL_SIZE
+    if DB_MAX_CONNECTIONS is not None:
+        return max(1, DB_MAX_CONNECTIONS // (WEB_CONCURRENCY + 1))
+    return 5
+
+
+def max_overflow() -> int:
+    if DB_MAX_OVERFLOW is not None:
+        return DB_MAX_OVERFLOW
+    # A share of a fixed budget leaves nothing to overflow into
+    return 0 if DB_MAX_CONNECTIONS is not None else 10
+
+
+class PoolWaitStats:
+    """How many checkouts a pool has served and how long they waited for it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def clear(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+
+class _TimedPool:
+    # Kept on the class, as engine.dispose() replaces the pool instance
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    wait_stats = PoolWaitStats()
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    wait_stats = PoolWaitStats()
+
+
+def engine_options(url: URL, asyncio: bool = False) -> dict:
+    """Keyword arguments for create_engine or create_async_engine."""
+    if url.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        # An in-memory database only exists on its one connection
+        if url.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+        return options
+
+    options = {
+        "poolclass": TimedAsyncAdaptedQueuePool if asyncio else TimedQueuePool,
+        "pool_size": pool_size(),
+        "max_overflow": max_overflow(),
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        timeout = str(DB_STATEMENT_TIMEOUT_MS)
+        if asyncio:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": timeout}
+            }
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def pool_stats(pool: Pool) -> dict:
+    """Connections in use and checkout waits for one process's pool."""
+    stats = {
+        "pool": type(pool).__name__,
+        "size": None,
+        "max_overflow": None,
+        "checked_out": None,
+        "checked_in": None,
+        "overflow": None,
+        "checkouts": None,
+        "timeouts": None,
+        "wait_seconds_total": None,
+        "wait_seconds_max": None,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # Connections open beyond size, negative while the pool is filling
+            overflow=max(0, pool.overflow()),
+        )
+    if isinstance(pool, _TimedPool):
+        wait_stats = pool.wait_stats
+        stats.update(
+            checkouts=wait_stats.checkouts,
+            timeouts=wait_stats.timeouts,
+            wait_seconds_total=wait_stats.wait_seconds_total,
+            wait_seconds_max=wait_stats.wait_seconds_max,
+        )
+    return stats
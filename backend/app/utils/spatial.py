@@ -0,0 +1,62 @@
+import math
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .geo import EARTH_RADIUS_KM
+
+# Must match the expression the GiST index is built on, or PostgreSQL ignores it
+POSTGIS_POINT_SQL = "geography(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326))"
+POSTGIS_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS ix_addresses_geography "
+    f"ON addresses USING gist (({POSTGIS_POINT_SQL}))"
+)
+
+_postgis_by_url = {}
+
+
+def postgis_installed(connection: Connection) -> bool:
+    """Whether the database has the PostGIS extension, checked once per database."""
+    if connection.dialect.name != "postgresql":
+        return False
+    url = connection.engine.url.render_as_string(hide_password=True)
+    if url not in _postgis_by_url:
+        _postgis_by_url[url] = (
+            connection.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+            ).first()
+            is not None
+        )
+    return _postgis_by_url[url]
+
+
+async def has_postgis(db: AsyncSession) -> bool:
+    connection = await db.connection()
+    return await connection.run_sync(postgis_installed)
+
+
+def bounding_box(
+    longitude: float, latitude: float, radius_km: float
+) -> Tuple[Tuple[float, float], List[Tuple[float, float]]]:
+    """
+    Latitude range and longitude range(s) covering every point within radius_km.
+
+    Two longitude ranges are returned when the box crosses the antimeridian.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    # Near the poles every longitude can be within range
+    if min_lat <= -90 or max_lat >= 90:
+        return (max(min_lat, -90), min(max_lat, 90)), [(-180, 180)]
+
+    # Widest point of the circle, which is not on the centre's latitude
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))
+    delta_long = math.degrees(math.asin(min(1, ratio)))
+    min_long, max_long = longitude - delta_long, longitude + delta_long
+    if min_long < -180:
+        return (min_lat, max_lat), [(min_long + 360, 180), (-180, max_long)]
+    if max_long > 180:
+        return (min_lat, max_lat), [(min_long, 180), (-180, max_long - 360)]
+    return (min_lat, max_lat), [(min_long, max_long)]
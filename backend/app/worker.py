@@ -0,0 +1,176 @@
+"""
+Background worker that computes distances queued by the API.
+
+Run alongside the API with `python -m app.worker`. Any number of workers can
+poll the same database, each job is only claimed by one of them at a time.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from .crud.distance_jobs import (
+    claim_next_jobs,
+    complete_job,
+    fail_job,
+    purge_finished_jobs,
+)
+from .crud.distances import (
+    compute_homes_distances,
+    compute_locations_distances,
+    retry_distance_failures,
+)
+from .models import DistanceJob, DistanceJobKind, Home, Location
+from .schemas.distance import DistanceFanOutResult
+from .services.openrouteservice import OpenRouteServiceClient
+from .services.routing import create_routing_client
+from .utils.database import AsyncSessionLocal, wait_for_database_async
+from .utils.log import configure_logging
+
+POLL_INTERVAL_SECONDS = float(os.getenv("DISTANCE_WORKER_POLL_SECONDS", "1"))
+# How often pairs that failed with a retryable error are tried again
+RETRY_INTERVAL_SECONDS = float(os.getenv("DISTANCE_RETRY_INTERVAL_SECONDS", "300"))
+# Queued jobs of one kind computed together, in one matrix lookup
+JOB_BATCH_SIZE = int(os.getenv("DISTANCE_JOB_BATCH_SIZE", "50"))
+# Longest wait between polls while the database or ORS keeps failing
+MAX_BACKOFF_SECONDS = float(os.getenv("DISTANCE_WORKER_MAX_BACKOFF_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+async def run_jobs(
+    db: AsyncSession, db_jobs: List[DistanceJob], ors_client: OpenRouteServiceClient
+):
+    # Jobs are all of one kind, see claim_next_jobs
+    target_ids = {db_job.target_id for db_job in db_jobs}
+    if db_jobs[0].kind == DistanceJobKind.HOME:
+        homes = (
+            await db.scalars(
+                select(Home)
+                .options(joinedload(Home.address))
+                .where(Home.id.in_(target_ids))
+            )
+        ).all()
+        # Nothing to do for homes deleted after their job was queued
+        if homes:
+            result = await compute_homes_distances(db, homes, ors_client)
+            report_failures(db_jobs, result)
+    else:
+        locations = (
+            await db.scalars(
+                select(Location)
+                .options(joinedload(Location.address))
+                .where(Location.id.in_(target_ids))
+            )
+        ).all()
+        if locations:
+            result = await compute_locations_distances(db, locations, ors_client)
+            report_failures(db_jobs, result)
+
+
+def report_failures(db_jobs: List[DistanceJob], result: DistanceFanOutResult):
+    if result.failed:
+        job_ids = [db_job.id for db_job in db_jobs]
+        logger.warning(
+            "Distance jobs %s: %s distances stored, %s pairs not routed, "
+            "see distance_failures",
+            job_ids,
+            result.created,
+            len(result.failed),
+            extra={"job_ids": job_ids},
+        )
+
+
+async def process_next_job(
+    db: AsyncSession, ors_client: OpenRouteServiceClient
+) -> bool:
+    """
+    Run the next queued job, together with up to JOB_BATCH_SIZE - 1 more of
+    the same kind, returning False when the queue is empty.
+    """
+    db_jobs = await claim_next_jobs(db, JOB_BATCH_SIZE)
+    if not db_jobs:
+        return False
+
+    try:
+        await run_jobs(db, db_jobs, ors_client)
+    except Exception as e:
+        await db.rollback()
+        job_ids = [db_job.id for db_job in db_jobs]
+        logger.exception("Distance jobs %s failed", job_ids, extra={"job_ids": job_ids})
+        for db_job in db_jobs:
+            # The rollback expired the job, and async sessions cannot load it lazily
+            await db.refresh(db_job)
+            await fail_job(db, db_job, repr(e))
+    else:
+        for db_job in db_jobs:
+            await complete_job(db, db_job)
+    return True
+
+
+async def poll(db: AsyncSession, ors_client: OpenRouteServiceClient, retry: bool):
+    # Drain the queue before going back to sleep
+    while await process_next_job(db, ors_client):
+        pass
+    if retry:
+        result = await retry_distance_failures(db, ors_client)
+        if result.created or result.failed:
+            logger.info(
+                "Retried failed distances: %s stored, %s still failing",
+                result.created,
+                len(result.failed),
+            )
+        purged = await purge_finished_jobs(db)
+        if purged:
+            logger.info("Deleted %s finished distance jobs", purged)
+
+
+async def run_worker():
+    await wait_for_database_async()
+    ors_client = create_routing_client()
+    logger.info("Distance worker started")
+    last_retry = time.monotonic()
+    failures = 0
+    try:
+        while True:
+            retry = time.monotonic() - last_retry >= RETRY_INTERVAL_SECONDS
+            try:
+                async with AsyncSessionLocal() as db:
+                    await poll(db, ors_client, retry)
+            except Exception:
+                # E.g. the database restarting, keep polling until it is back
+                failures += 1
+                delay = min(POLL_INTERVAL_SECONDS * 2**failures, MAX_BACKOFF_SECONDS)
+                logger.exception(
+                    "Distance worker poll failed, retrying in %.1fs",
+                    delay,
+                    extra={"failures": failures},
+                )
+            else:
+                failures = 0
+                delay = POLL_INTERVAL_SECONDS
+                if retry:
+                    last_retry = time.monotonic()
+            await asyncio.sleep(delay)
+    finally:
+        await ors_client.aclose()
+
+
+def main():
+    configure_logging()
+    # The schema is managed by Alembic, run `python -m app.migrate` before starting
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 import os
 import sys
+from contextlib import contextmanager
 
+import anyio
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 
 # 1) Tell Python that "app" lives right here in `backend/`
 here = os.path.abspath(os.path.dirname(__file__))
@@ -11,14 +14,23 @@ sys.path.insert(0, here)
 # **1. Force an in-memory SQLite before importing your app**
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock
 
-from app.api.dependencies import get_current_user, get_db, get_ors_client
+from app.api.dependencies import (
+    get_current_role,
+    get_current_user,
+    get_db,
+    get_ors_client,
+)
 from app.main import app
 from app.models.roles import Role
 from app.models.user import User
-from app.utils.database import Base, SessionLocal
-from app.utils.database import engine as app_engine
+from app.services.geocode_cache import geocode_cache
+from app.services.metrics import registry
+from app.services.response_cache import response_cache
+from app.services.route_cache import route_cache
+from app.services.user_cache import user_cache
+from app.utils.database import AsyncSessionLocal, Base, async_engine
 from app.utils.hashing import hash_password
 
 # **2. Create a session-scoped engine** (re-using yours, if you prefer)
@@ -27,47 +39,103 @@ from app.utils.hashing import hash_password
 # SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
+# The sqlite3 driver only opens a transaction before a write, so a SAVEPOINT
+# would start (and its RELEASE commit) one of its own and escape the test's
+# rollback. Have SQLAlchemy emit BEGIN itself instead.
+@event.listens_for(async_engine.sync_engine, "connect")
+def _disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(async_engine.sync_engine, "begin")
+def _begin(connection):
+    # The in-memory database has one connection, which a second Connection
+    # (e.g. the readiness check) shares while the test's transaction is open
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+@pytest.fixture(scope="session")
+def portal():
+    """
+    One event loop, in a background thread, for the whole test session.
+
+    The async engine's connections belong to the loop they were made on, so the
+    test client and `run` both use this one.
+    """
+    with anyio.from_thread.start_blocking_portal() as portal:
+        yield portal
+
+
+@pytest.fixture(scope="session")
+def run(portal):
+    """Run a coroutine on the test loop and return its result, e.g.
+
+    user = run(db_session.get(User, 1))
+    """
+    return lambda awaitable: portal.call(_await, awaitable)
+
+
 @pytest.fixture(scope="session", autouse=True)
-def create_test_database():
+def create_test_database(run):
     """Create the tables once per test session, then drop them at the end."""
-    Base.metadata.create_all(bind=app_engine)
+
+    async def create_all():
+        async with async_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    async def drop_all():
+        async with async_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+
+    run(create_all())
     yield
-    Base.metadata.drop_all(bind=app_engine)
+    run(drop_all())
 
 
 @pytest.fixture
-def db_session():
+def db_session(run):
     """
-    Yield a SQLAlchemy session wrapped in a transaction,
+    Yield an AsyncSession wrapped in a transaction,
     rolling back at the end so tests stay isolated.
     """
-    connection = app_engine.connect()
-    transaction = connection.begin()
-    session = SessionLocal(bind=connection)
-
-    # begin a nested transaction (so that even commits inside your code get rolled back)
-    nested = connection.begin_nested()
+    connection = run(async_engine.connect())
+    transaction = run(connection.begin())
+    # Commits inside your code only release a savepoint, so the rollback below
+    # still undoes them
+    session = AsyncSessionLocal(
+        bind=connection, join_transaction_mode="create_savepoint"
+    )
 
     yield session
 
-    session.close()
-    # rollback nested first, then the outer transaction
-    nested.rollback()
-    transaction.rollback()
-    connection.close()
+    run(session.close())
+    run(transaction.rollback())
+    run(connection.close())
 
 
 @pytest.fixture
-def test_client(db_session):
+def ors_client():
+    """An AsyncMock standing in for the OpenRouteService client."""
+    return AsyncMock()
+
+
+@pytest.fixture
+def test_client(db_session, ors_client, portal):
     """
     Override FastAPI dependencies so that:
       - `get_db` yields our test session
-      - `get_current_user` returns a fake user
-      - `get_ors_client` is a MagicMock
-    Then spin up TestClient(app).
+      - `get_current_user` returns a fake user, and `get_current_role` its role
+      - `get_ors_client` returns the `ors_client` AsyncMock
+    Then spin up TestClient(app) on the test loop. It is not entered with
+    `with`, so the lifespan, which only makes the real ORS client, is skipped.
     """
 
-    def override_get_db():
+    async def override_get_db():
         try:
             yield db_session
         finally:
@@ -82,21 +150,45 @@ def test_client(db_session):
             role=Role.USER,
         )
 
+    def override_get_current_role():
+        return Role.USER
+
     def override_get_ors_client():
-        return MagicMock()
+        return ors_client
 
     app.dependency_overrides[get_db] = override_get_db
     app.dependency_overrides[get_current_user] = override_get_current_user
+    app.dependency_overrides[get_current_role] = override_get_current_role
     app.dependency_overrides[get_ors_client] = override_get_ors_client
 
-    with TestClient(app) as tc:
-        yield tc
+    tc = TestClient(app)
+    tc.portal = portal
+    yield tc
 
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def test_home(test_client):
+    """A home created through the API, as returned by POST /homes/."""
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 12.345678,
+            "longitude": 98.765432,
+        },
+    }
+    response = test_client.post("/homes/", json=home_data)
+    assert response.status_code == 200
+    return response.json()
+
+
 @pytest.fixture(autouse=True)
-def add_test_user(db_session):
+def add_test_user(db_session, run):
     # ensure there's a user with id=1 for get_current_user to point at
     test_user = User(
         id=1,
@@ -106,5 +198,45 @@ def add_test_user(db_session):
         name="testName",
     )
     db_session.add(test_user)
-    db_session.commit()
+    run(db_session.commit())
     yield
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(run):
+    """In-process caches and metrics outlive each test, so reset them."""
+    geocode_cache.clear()
+    route_cache.clear()
+    run(response_cache.clear())
+    user_cache.clear()
+    registry.clear()
+    yield
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager collecting the SQL statements run inside it, e.g.
+
+        with count_queries() as statements:
+            test_client.get("/homes/")
+        assert len(statements) == 3
+    """
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            # Savepoints come from the test transaction, not the code under test
+            if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+                statements.append(statement)
+
+        engine = async_engine.sync_engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
@@ -0,0 +1,236 @@
+"""
+Benchmark requests per second and latency in one API worker under concurrent
+load: a page of distances read through a sync route and Session (how every
+read route worked before the async engine) against the same read through the
+async route and AsyncSession.
+
+Each request first waits IO_LATENCY_MS, standing in for the network round
+trips to ORS or a remote Postgres that a local SQLite file does not have. The
+sync route waits on one of the request thread pool's threads, the async one
+on the event loop.
+
+Usage, from backend/:
+    python scripts/benchmarks/async_load.py [REQUESTS] [CONCURRENCY] [IO_LATENCY_MS]
+
+Defaults to 2000 requests, 400 at a time and 250 ms (about one ORS call),
+against a temporary SQLite file with 100 homes and 100 locations. The response
+cache is turned off so every request reads the database. Starlette runs sync
+routes on 40 threads, so with more requests than that waiting on I/O the sync
+route queues while the async one keeps serving.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, backend_dir)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+os.environ["RESPONSE_CACHE_BACKEND"] = "none"
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.api.dependencies import get_db
+from app.crud.distance_jobs import UNFINISHED_STATUSES
+from app.main import app
+from app.models import (
+    Address,
+    Distance,
+    DistanceJob,
+    DistanceJobKind,
+    Home,
+    Location,
+    User,
+)
+from app.utils.database import Base, SessionLocal, async_engine, engine
+
+HOMES = 100
+LOCATIONS = 100
+PAGE_SIZE = 20
+
+io_latency_seconds = 0.0
+
+
+def get_sync_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@app.get("/benchmark/sync/homes/{home_id}/distances")
+def read_distances_sync(home_id: int, db: Session = Depends(get_sync_db)):
+    # GET /homes/{home_id}/distances as it was: a sync route and Session, run on
+    # the request thread pool, with the same queries as crud.home.get_distances
+    time.sleep(io_latency_seconds)
+    if not db.scalar(select(Home.id).where(Home.id == home_id)):
+        raise HTTPException(status_code=404, detail="Home not found")
+    distances = db.scalars(
+        select(Distance)
+        .where(Distance.source_home_id == home_id)
+        .order_by(Distance.walking_distance_minutes, Distance.id)
+        .limit(PAGE_SIZE + 1)
+    ).all()
+    unfinished = db.scalar(
+        select(DistanceJob.id)
+        .where(
+            DistanceJob.status.in_(UNFINISHED_STATUSES),
+            or_(
+                (DistanceJob.kind == DistanceJobKind.HOME)
+                & (DistanceJob.target_id == home_id),
+                DistanceJob.kind == DistanceJobKind.LOCATION,
+            ),
+        )
+        .limit(1)
+    )
+    db.scalar(
+        select(DistanceJob)
+        .where(
+            DistanceJob.kind == DistanceJobKind.HOME, DistanceJob.target_id == home_id
+        )
+        .order_by(DistanceJob.id.desc())
+        .limit(1)
+    )
+    return schemas.HomeDistancesRead.model_validate(
+        {
+            "status": "pending" if unfinished else "ready",
+            "distances": distances[:PAGE_SIZE],
+            "next_cursor": None,
+        },
+        from_attributes=True,
+    )
+
+
+@app.get("/benchmark/async/homes/{home_id}/distances")
+async def read_distances_async(home_id: int, db: AsyncSession = Depends(get_db)):
+    await asyncio.sleep(io_latency_seconds)
+    distances = await crud.home.get_distances(db, home_id=home_id, limit=PAGE_SIZE)
+    if not distances:
+        raise HTTPException(status_code=404, detail="Home not found")
+    return schemas.HomeDistancesRead.model_validate(distances, from_attributes=True)
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {
+                    "id": 1,
+                    "name": "Bench",
+                    "email": "b@example.com",
+                    "hashed_password": "x",
+                }
+            ],
+        )
+        connection.execute(
+            insert(Address),
+            [
+                {
+                    "id": i,
+                    "street": f"{i} Bench St",
+                    "city": "Cambridge",
+                    "postal_code": "CB1",
+                    "country": "England",
+                    "latitude": 52.2 + i / 10_000,
+                    "longitude": 0.12,
+                }
+                for i in range(1, HOMES + LOCATIONS + 1)
+            ],
+        )
+        connection.execute(
+            insert(Home),
+            [
+                {"id": i, "name": f"Home {i}", "address_id": i, "creation_user_id": 1}
+                for i in range(1, HOMES + 1)
+            ],
+        )
+        connection.execute(
+            insert(Location),
+            [
+                {
+                    "id": i,
+                    "name": f"Location {i}",
+                    "description": "Benchmark location",
+                    "price_estimate_min": 0,
+                    "price_estimate_max": 10,
+                    "address_id": HOMES + i,
+                    "creation_user_id": 1,
+                }
+                for i in range(1, LOCATIONS + 1)
+            ],
+        )
+        connection.execute(
+            insert(Distance),
+            [
+                {
+                    "source_home_id": home_id,
+                    "destination_location_id": location_id,
+                    "walking_distance_minutes": (home_id * location_id) % 60,
+                }
+                for home_id in range(1, HOMES + 1)
+                for location_id in range(1, LOCATIONS + 1)
+            ],
+        )
+
+
+async def run(client, url, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def get(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(url.format(home_id=i % HOMES + 1))
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(get(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return requests / elapsed, statistics.median(latencies), p99
+
+
+async def main():
+    global io_latency_seconds
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    io_latency_seconds = (float(sys.argv[3]) if len(sys.argv) > 3 else 250) / 1000
+
+    seed()
+    print(
+        f"{os.cpu_count()} CPUs, {requests} requests, {concurrency} at a time, "
+        f"{io_latency_seconds * 1000:.0f} ms simulated I/O per request"
+    )
+    print(f"{'route':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for name, url in (
+            ("sync", "/benchmark/sync/homes/{home_id}/distances"),
+            ("async", "/benchmark/async/homes/{home_id}/distances"),
+        ):
+            # Warm up connection pools and the thread pool before timing
+            await run(client, url, concurrency, concurrency)
+            rate, p50, p99 = await run(client, url, requests, concurrency)
+            print(f"{name:>8} {rate:>8.0f} {p50 * 1000:>8.1f} {p99 * 1000:>8.1f}")
+
+    await async_engine.dispose()
+    Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
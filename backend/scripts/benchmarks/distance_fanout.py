@@ -0,0 +1,147 @@
+"""
+Benchmark the full distance fan-out (geocoding, routing, caching and inserts)
+against the offline routing backend, so it uses no ORS quota.
+
+Usage, from backend/:
+    python scripts/benchmarks/distance_fanout.py [HOMES] [LOCATIONS] [DATABASE_URL]
+
+Defaults to 1000 homes and 50 locations in a temporary SQLite file. Each new
+location fans out to every home, like a location created through the API. The
+tables are dropped and recreated, never point this at a database you care about.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, backend_dir)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+
+from app.crud.distances import compute_location_distances
+from app.models import Address, Home, Location, User
+from app.services.geocode_cache import geocode_cache
+from app.services.local_routing import LocalRoutingClient
+from app.services.route_cache import route_cache
+from app.utils.database import Base, async_database_url
+
+CITIES = ["Cambridge", "London", "Bristol", "Oxford", "Manchester"]
+
+
+async def seed(db, routing_client, home_count, location_count):
+    rng = random.Random(0)
+    address_count = home_count + location_count
+    addresses = []
+    for i in range(1, address_count + 1):
+        street, city = f"{i} Bench Street", rng.choice(CITIES)
+        longitude, latitude = await geocode_cache.get_coordinates(
+            db, f"{street}, {city}, England", routing_client
+        )
+        addresses.append(
+            {
+                "id": i,
+                "street": street,
+                "city": city,
+                "postal_code": "",
+                "country": "England",
+                "latitude": latitude,
+                "longitude": longitude,
+            }
+        )
+
+    await db.execute(
+        insert(User),
+        [
+            {
+                "id": 1,
+                "name": "Bench",
+                "email": "bench@example.com",
+                "hashed_password": "x",
+            }
+        ],
+    )
+    await db.execute(insert(Address), addresses)
+    await db.execute(
+        insert(Home),
+        [
+            {"id": i, "name": f"Home {i}", "address_id": i, "creation_user_id": 1}
+            for i in range(1, home_count + 1)
+        ],
+    )
+    await db.execute(
+        insert(Location),
+        [
+            {
+                "id": i,
+                "name": f"Location {i}",
+                "description": "Benchmark location",
+                "price_estimate_min": 0,
+                "price_estimate_max": 10,
+                "address_id": home_count + i,
+                "creation_user_id": 1,
+            }
+            for i in range(1, location_count + 1)
+        ],
+    )
+    await db.commit()
+
+
+async def run(database_url, home_count, location_count):
+    engine = create_async_engine(async_database_url(database_url))
+    SessionLocal = async_sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    routing_client = LocalRoutingClient()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        await seed(db, routing_client, home_count, location_count)
+        print(
+            f"geocoded and seeded {home_count + location_count} addresses in "
+            f"{time.perf_counter() - start:.3f}s"
+        )
+
+        created = failed = 0
+        start = time.perf_counter()
+        locations = await db.scalars(
+            select(Location).options(joinedload(Location.address))
+        )
+        for location in locations.all():
+            result = await compute_location_distances(db, location, routing_client)
+            created += result.created
+            failed += len(result.failed)
+        elapsed = time.perf_counter() - start
+        print(
+            f"fanned out {created + failed} pairs ({failed} not routed) in "
+            f"{elapsed:.3f}s, {(created + failed) / elapsed:.0f} pairs/s"
+        )
+        print(f"route cache: {route_cache.stats()}")
+    finally:
+        await db.close()
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+def main():
+    home_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    location_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    if len(sys.argv) > 3:
+        database_url = sys.argv[3]
+    else:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'fanout.db')}"
+    asyncio.run(run(database_url, home_count, location_count))
+
+
+if __name__ == "__main__":
+    main()
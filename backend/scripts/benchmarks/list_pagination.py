@@ -0,0 +1,136 @@
+"""
+Benchmark deep page latency for GET /homes/: offset pagination (get_homes)
+against keyset pagination (get_homes_page).
+
+Usage, from backend/:
+    python scripts/benchmarks/list_pagination.py [ROWS] [DATABASE_URL]
+
+Defaults to 1,000,000 homes in a temporary SQLite file. The tables are dropped
+and recreated, never point this at a database you care about.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, backend_dir)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.home import get_homes, get_homes_page
+from app.models import Address, Home, User
+from app.utils.database import Base, async_database_url
+from app.utils.pagination import encode_cursor
+
+PAGE_SIZE = 100
+INSERT_BATCH_SIZE = 50_000
+REPEATS = 5
+
+
+def seed(db, row_count):
+    db.execute(
+        insert(User),
+        [
+            {
+                "id": 1,
+                "name": "Bench",
+                "email": "bench@example.com",
+                "hashed_password": "x",
+            }
+        ],
+    )
+    for start in range(1, row_count + 1, INSERT_BATCH_SIZE):
+        ids = range(start, min(start + INSERT_BATCH_SIZE, row_count + 1))
+        db.execute(
+            insert(Address),
+            [
+                {
+                    "id": i,
+                    "street": f"{i} Bench St",
+                    "city": "Cambridge",
+                    "postal_code": "CB1",
+                    "country": "England",
+                    "latitude": 52.2,
+                    "longitude": 0.12,
+                }
+                for i in ids
+            ],
+        )
+        db.execute(
+            insert(Home),
+            [
+                {"id": i, "name": f"Home {i}", "address_id": i, "creation_user_id": 1}
+                for i in ids
+            ],
+        )
+    db.commit()
+
+
+async def time_page(SessionLocal, fetch):
+    best = None
+    for _ in range(REPEATS):
+        async with SessionLocal() as db:
+            start = time.perf_counter()
+            homes = await fetch(db)
+            elapsed = time.perf_counter() - start
+        assert len(homes) == PAGE_SIZE
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def keyset_page(db, cursor):
+    return (await get_homes_page(db, limit=PAGE_SIZE, cursor=cursor))["items"]
+
+
+async def time_pages(database_url, pages):
+    # Timed through the async engine, as the API reads them
+    engine = create_async_engine(async_database_url(database_url))
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+    for page in pages:
+        skip = (page - 1) * PAGE_SIZE
+        # Ids are contiguous, so the cursor for page N is the id before it
+        cursor = encode_cursor(skip) if skip else None
+        offset = await time_page(
+            SessionLocal, lambda db: get_homes(db, skip=skip, limit=PAGE_SIZE)
+        )
+        keyset = await time_page(SessionLocal, lambda db: keyset_page(db, cursor))
+        print(f"{page:>8} {offset * 1000:>10.2f} {keyset * 1000:>10.2f}")
+    await engine.dispose()
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    if len(sys.argv) > 2:
+        database_url = sys.argv[2]
+    else:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pages.db')}"
+
+    engine = create_engine(database_url)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        seed(db, row_count)
+        print(f"seeded {row_count} homes in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+
+    last_page = row_count // PAGE_SIZE
+    pages = sorted({1, 10, 100, 1000, last_page // 2, last_page} - {0})
+    asyncio.run(time_pages(database_url, pages))
+
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
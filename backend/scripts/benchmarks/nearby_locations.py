@@ -0,0 +1,175 @@
+"""
+Benchmark nearby location lookups: get_locations_near (PostGIS, or a bounding box
+on the latitude/longitude index) against loading every location and filtering
+by distance in Python.
+
+Usage, from backend/:
+    python scripts/benchmarks/nearby_locations.py [DATABASE_URL ...]
+
+With no arguments this runs against a temporary SQLite file. Locations are spread
+over Great Britain and queried with a 2 km radius. The tables are dropped and
+recreated, never point this at a database you care about.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, backend_dir)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import contains_eager, sessionmaker
+
+from app.crud.locations import get_locations_near
+from app.models import Address, Location, User
+from app.utils.database import Base, async_database_url
+from app.utils.geo import haversine_km_matrix
+
+LOCATION_COUNTS = [10_000, 100_000]
+RADIUS_KM = 2
+QUERIES = 20
+# Loading every row is slow enough that fewer runs give a fair average
+FULL_SCAN_QUERIES = 3
+INSERT_BATCH_SIZE = 10_000
+
+
+def seed(db, location_count):
+    rng = random.Random(0)
+    db.execute(
+        insert(User),
+        [
+            {
+                "id": 1,
+                "name": "Bench",
+                "email": "bench@example.com",
+                "hashed_password": "x",
+            }
+        ],
+    )
+    for start in range(1, location_count + 1, INSERT_BATCH_SIZE):
+        ids = range(start, min(start + INSERT_BATCH_SIZE, location_count + 1))
+        db.execute(
+            insert(Address),
+            [
+                {
+                    "id": i,
+                    "street": f"{i} Bench St",
+                    "city": "Benchville",
+                    "postal_code": "",
+                    "country": "England",
+                    "latitude": rng.uniform(50.5, 55.5),
+                    "longitude": rng.uniform(-4.0, 1.5),
+                }
+                for i in ids
+            ],
+        )
+        db.execute(
+            insert(Location),
+            [
+                {
+                    "id": i,
+                    "name": f"Location {i}",
+                    "description": "Benchmark location",
+                    "price_estimate_min": 0,
+                    "price_estimate_max": 10,
+                    "address_id": i,
+                    "creation_user_id": 1,
+                }
+                for i in ids
+            ],
+        )
+    db.commit()
+
+
+async def full_scan(db, longitude, latitude, radius_km, limit):
+    locations = (
+        await db.scalars(
+            select(Location)
+            .join(Location.address)
+            .options(contains_eager(Location.address))
+        )
+    ).all()
+    distances = haversine_km_matrix(
+        [(longitude, latitude)],
+        [(lo.address.longitude, lo.address.latitude) for lo in locations],
+    )[0]
+    nearby = sorted(
+        (
+            (location, float(distance_km))
+            for location, distance_km in zip(locations, distances)
+            if distance_km <= radius_km
+        ),
+        key=lambda pair: (pair[1], pair[0].id),
+    )
+    return nearby[:limit]
+
+
+async def time_queries(SessionLocal, search, points):
+    results = []
+    start = time.perf_counter()
+    for longitude, latitude in points:
+        # A fresh session per query, so the identity map does not help
+        async with SessionLocal() as db:
+            nearby = await search(db, longitude, latitude, RADIUS_KM, 50)
+            results.append([location.id for location, _ in nearby])
+    return (time.perf_counter() - start) / len(points), results
+
+
+async def time_searches(database_url, points):
+    # Timed through the async engine, as the API runs them
+    engine = create_async_engine(async_database_url(database_url))
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    indexed = await time_queries(SessionLocal, get_locations_near, points)
+    scan = await time_queries(SessionLocal, full_scan, points[:FULL_SCAN_QUERIES])
+    await engine.dispose()
+    return indexed, scan
+
+
+def run(database_url):
+    engine = create_engine(database_url)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    print(
+        f"\n{engine.dialect.name} ({engine.url.render_as_string(hide_password=True)})"
+    )
+    print(f"{'locations':>10} {'method':>10} {'ms/query':>10}")
+
+    rng = random.Random(1)
+    points = [(rng.uniform(-4.0, 1.5), rng.uniform(50.5, 55.5)) for _ in range(QUERIES)]
+    for location_count in LOCATION_COUNTS:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        try:
+            seed(db, location_count)
+        finally:
+            db.close()
+
+        (indexed, indexed_results), (scan, scan_results) = asyncio.run(
+            time_searches(database_url, points)
+        )
+        assert indexed_results[:FULL_SCAN_QUERIES] == scan_results
+        print(f"{location_count:>10} {'indexed':>10} {indexed * 1000:>10.2f}")
+        print(f"{location_count:>10} {'full scan':>10} {scan * 1000:>10.2f}")
+
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+def main():
+    database_urls = sys.argv[1:]
+    if not database_urls:
+        sqlite_path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+        database_urls = [f"sqlite:///{sqlite_path}"]
+
+    for database_url in database_urls:
+        run(database_url)
+
+
+if __name__ == "__main__":
+    main()
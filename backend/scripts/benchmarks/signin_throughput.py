@@ -0,0 +1,127 @@
+"""
+Benchmark sign ins per second in one API worker, and how long other requests
+wait meanwhile: the old synchronous /auth/signin, which hashed on the request
+thread pool, against the current one using the password hashing executor.
+
+Usage, from backend/:
+    python scripts/benchmarks/signin_throughput.py [SIGNINS] [CONCURRENCY]
+
+Defaults to 200 sign ins, 100 at a time, against a temporary SQLite file.
+Set BCRYPT_ROUNDS and PASSWORD_HASH_WORKERS to try other settings.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, backend_dir)
+os.environ["DATABASE_URL"] = (
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'signin.db')}"
+)
+os.environ.setdefault("AUTH_HASH_SECRET_KEY", "benchmark")
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.main import app
+from app.models import User
+from app.utils.database import Base, SessionLocal, engine
+from app.utils.hashing import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    hash_password,
+    verify_password,
+)
+
+EMAIL = "bench@example.com"
+PASSWORD = "benchmark-password"
+PING_INTERVAL_SECONDS = 0.01
+
+
+def get_sync_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@app.post("/benchmark/signin-sync")
+def signin_sync(form_data: schemas.UserSignIn, db: Session = Depends(get_sync_db)):
+    # /auth/signin as it was: a sync route, so bcrypt ran on the request pool
+    user = db.scalar(select(User).where(User.email == form_data.email))
+    if not user or not verify_password(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    return {"id": user.id}
+
+
+async def run(client, url, signins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    credentials = {"email": EMAIL, "password": PASSWORD}
+
+    async def signin():
+        async with semaphore:
+            response = await client.post(url, json=credentials)
+            assert response.status_code == 200, response.text
+
+    ping_latencies = []
+    done = asyncio.Event()
+
+    async def ping():
+        # A cheap route, standing in for everything else the worker serves
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/")
+            ping_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(PING_INTERVAL_SECONDS)
+
+    pinger = asyncio.create_task(ping())
+    start = time.perf_counter()
+    await asyncio.gather(*(signin() for _ in range(signins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await pinger
+    return signins / elapsed, ping_latencies
+
+
+async def main():
+    signins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(User(name="Bench", email=EMAIL, hashed_password=hash_password(PASSWORD)))
+    db.commit()
+    db.close()
+
+    print(
+        f"bcrypt rounds {BCRYPT_ROUNDS}, {PASSWORD_HASH_WORKERS} hashing threads, "
+        f"{os.cpu_count()} CPUs, {signins} sign ins, {concurrency} at a time"
+    )
+    print(f"{'route':>10} {'signins/s':>10} {'ping p50 ms':>12} {'ping max ms':>12}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for name, url in (
+            ("before", "/benchmark/signin-sync"),
+            ("after", "/auth/signin"),
+        ):
+            rate, pings = await run(client, url, signins, concurrency)
+            print(
+                f"{name:>10} {rate:>10.1f} {statistics.median(pings) * 1000:>12.1f} "
+                f"{max(pings) * 1000:>12.1f}"
+            )
+
+    Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -55,6 +55,28 @@ def insert_csv_into_table(csv_path, table_name, conn):
     print("Updated incremental counter")
 
 
+def fill_rankings(conn):
+    # The distance worker keeps home_location_rankings in step with distances,
+    # but it never sees the seeded ones, so copy them the way crud.rankings does
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO home_location_rankings (
+            home_id, location_id, walking_distance_minutes, location_name,
+            price_estimate_min, price_estimate_max, city, latitude, longitude
+        )
+        SELECT
+            distances.source_home_id, distances.destination_location_id,
+            distances.walking_distance_minutes, locations.name,
+            locations.price_estimate_min, locations.price_estimate_max,
+            addresses.city, addresses.latitude, addresses.longitude
+        FROM distances
+        JOIN locations ON locations.id = distances.destination_location_id
+        JOIN addresses ON addresses.id = locations.address_id;
+        """)
+    conn.commit()
+    print(f"Inserted {cursor.rowcount} rows into home_location_rankings")
+
+
 def database_is_seeded(conn):
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM users;")
@@ -88,6 +110,7 @@ def main():
         for table_name in table_dependency_order:
             csv_path = os.path.join(seeds_dir, table_name + ".csv")
             insert_csv_into_table(csv_path, table_name, conn)
+        fill_rankings(conn)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,114 @@
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app import crud, schemas
+from app.api import dependencies
+from app.api.dependencies import (
+    create_access_token,
+    get_current_role,
+    get_current_user,
+    get_token_data,
+    token_claims,
+)
+from app.models.roles import Role
+from app.models.user import User
+from app.utils import hashing
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(dependencies, "SECRET_KEY", "test-secret")
+
+
+def authenticate(run, db_session, user_id=1):
+    token = create_access_token({"sub": str(user_id)})
+    return run(get_current_user(get_token_data(token), db_session))
+
+
+def test_current_user_is_cached_until_updated(run, db_session, count_queries):
+    # The test user is still in the session, load it as a new request would
+    db_session.expunge_all()
+    with count_queries() as statements:
+        user = authenticate(run, db_session)
+    assert user.name == "testName"
+    assert len(statements) == 1
+
+    with count_queries() as statements:
+        assert authenticate(run, db_session).name == "testName"
+    assert statements == []
+
+    db_user = run(db_session.get(User, 1))
+    update = schemas.UserUpdate(name="Renamed", email=db_user.email, role=db_user.role)
+    run(crud.user.update_user(db_session, updating_user=db_user, user_update=update))
+    assert authenticate(run, db_session).name == "Renamed"
+
+
+def test_deleted_user_is_rejected(run, db_session):
+    authenticate(run, db_session)
+    run(crud.user.delete_user(db_session, user_id=1))
+    with pytest.raises(HTTPException) as exc_info:
+        authenticate(run, db_session)
+    assert exc_info.value.status_code == 401
+
+
+def test_invalid_token_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        get_token_data("not a token")
+    assert exc_info.value.status_code == 401
+
+
+def test_role_claims(run, db_session, count_queries, monkeypatch):
+    user = run(db_session.get(User, 1))
+    assert token_claims(user) == {"sub": "1"}
+
+    monkeypatch.setattr(dependencies, "AUTH_TOKEN_ROLE_CLAIMS", True)
+    assert token_claims(user) == {"sub": "1", "role": "user"}
+    token_data = get_token_data(create_access_token(token_claims(user)))
+    with count_queries() as statements:
+        assert run(get_current_role(token_data, db_session)) == Role.USER
+    assert statements == []
+
+    # Tokens issued before role claims were turned on fall back to the user
+    token_data = get_token_data(create_access_token({"sub": "1"}))
+    assert token_data.role is None
+    db_session.expunge_all()
+    with count_queries() as statements:
+        assert run(get_current_role(token_data, db_session)) == Role.USER
+    assert len(statements) == 1
+
+
+def test_signup_and_signin(test_client):
+    user_data = {"name": "New", "email": "new@example.com", "password": "secret"}
+    response = test_client.post("/auth/signup", json=user_data)
+    assert response.status_code == 200
+    assert response.json()["email"] == "new@example.com"
+
+    credentials = {"email": "new@example.com", "password": "secret"}
+    response = test_client.post("/auth/signin", json=credentials)
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+
+    credentials["password"] = "wrong"
+    response = test_client.post("/auth/signin", json=credentials)
+    assert response.status_code == 400
+
+
+def test_signin_rehashes_outdated_hashes(test_client, run, db_session, monkeypatch):
+    db_user = run(db_session.get(User, 1))
+    db_user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(
+        "old"
+    )
+    run(db_session.commit())
+    monkeypatch.setattr(
+        hashing,
+        "pwd_context",
+        CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5),
+    )
+
+    credentials = {"email": db_user.email, "password": "old"}
+    response = test_client.post("/auth/signin", json=credentials)
+    assert response.status_code == 200
+    run(db_session.refresh(db_user))
+    assert db_user.hashed_password.startswith("$2b$05$")
+    assert hashing.verify_password("old", db_user.hashed_password)
@@ -0,0 +1,14 @@
+from app.utils.database import async_database_url
+
+
+def test_async_database_url_picks_an_asyncio_driver():
+    url = async_database_url("postgresql://user:secret@db:5432/app")
+    assert url.render_as_string(hide_password=False) == (
+        "postgresql+asyncpg://user:secret@db:5432/app"
+    )
+    assert (
+        async_database_url("postgresql+psycopg2://db/app").drivername
+        == "postgresql+asyncpg"
+    )
+    assert async_database_url("sqlite:///:memory:").drivername == "sqlite+aiosqlite"
+    assert async_database_url("sqlite:///app.db").database == "app.db"
@@ -0,0 +1,27 @@
+import pytest
+
+from app.utils.geo import haversine_km, haversine_km_matrix
+from app.utils.spatial import bounding_box
+
+
+def test_haversine_matrix_matches_single_pairs():
+    cambridge = (0.1218, 52.2053)
+    london = (-0.1276, 51.5072)
+    edinburgh = (-3.1883, 55.9533)
+
+    matrix = haversine_km_matrix([cambridge, london], [london, edinburgh, cambridge])
+
+    assert matrix.shape == (2, 3)
+    assert matrix[0, 0] == pytest.approx(haversine_km(*cambridge, *london))
+    assert matrix[1, 1] == pytest.approx(haversine_km(*london, *edinburgh))
+    assert matrix[0, 2] == 0
+    assert 75 < matrix[0, 0] < 85
+
+
+def test_bounding_box_wraps_the_antimeridian():
+    (min_lat, max_lat), longitude_ranges = bounding_box(179.99, 0.0, 5)
+
+    assert min_lat < 0 < max_lat
+    assert len(longitude_ranges) == 2
+    # A point 1 km east, past 180 degrees, is inside the second range
+    assert longitude_ranges[1][0] <= -179.995 <= longitude_ranges[1][1]
@@ -0,0 +1,67 @@
+from sqlalchemy import func, select
+
+from app import models
+from app.services.geocode_cache import geocode_cache, normalize_geocode_query
+
+
+def test_normalize_geocode_query():
+    assert (
+        normalize_geocode_query("  King's Parade,  CAMBRIDGE,CB2 1SJ ")
+        == "kings parade cambridge cb2 1sj"
+    )
+
+
+def test_search_geolocation_is_cached(test_client, ors_client):
+    ors_client.get_coordinates.return_value = (0.1218, 52.2053)
+
+    response = test_client.post(
+        "/geocode/search/", json={"search_term": "King's Parade, Cambridge"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"longitude": 0.1218, "latitude": 52.2053}
+
+    # Same search with different case, spacing and punctuation
+    response = test_client.post(
+        "/geocode/search/", json={"search_term": "king's parade  cambridge"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"longitude": 0.1218, "latitude": 52.2053}
+    assert ors_client.get_coordinates.call_count == 1
+    assert geocode_cache.stats()["memory_hits"] == 1
+
+
+def test_geocode_cache_falls_back_to_database(test_client, ors_client):
+    ors_client.get_coordinates.return_value = (0.1218, 52.2053)
+    test_client.post("/geocode/search/", json={"search_term": "Cambridge"})
+
+    # A fresh process (or another worker) only has the database copy
+    geocode_cache.memory.clear()
+    response = test_client.post("/geocode/search/", json={"search_term": "Cambridge"})
+    assert response.json() == {"longitude": 0.1218, "latitude": 52.2053}
+    assert ors_client.get_coordinates.call_count == 1
+    assert geocode_cache.stats()["database_hits"] == 1
+
+
+def test_geocode_cache_remembers_missing_results(db_session, ors_client, run):
+    ors_client.get_coordinates.side_effect = ValueError("nothing here")
+
+    for _ in range(2):
+        try:
+            run(geocode_cache.get_coordinates(db_session, "Nowhere", ors_client))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected ValueError")
+    assert ors_client.get_coordinates.call_count == 1
+
+
+def test_geocode_cache_leaves_the_commit_to_the_caller(db_session, ors_client, run):
+    ors_client.get_coordinates.return_value = (0.1218, 52.2053)
+    db_session.add(models.Address(street="1 Pending St", city="Cambridge"))
+
+    run(geocode_cache.get_coordinates(db_session, "Cambridge", ors_client))
+    # A request failing after the lookup stores nothing, not even the address
+    run(db_session.rollback())
+
+    assert run(db_session.scalar(select(func.count(models.Address.id)))) == 0
+    assert run(db_session.scalar(select(func.count(models.GeocodeCacheEntry.id)))) == 0
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.exc import OperationalError, TimeoutError
+
+from app.api.dependencies import get_current_role
+from app.api.routes import health
+from app.main import app
+from app.models.roles import Role
+from app.utils import pool
+from app.utils.pool import TimedQueuePool, engine_options, pool_stats
+
+
+def test_readiness(test_client, monkeypatch):
+    assert test_client.get("/health/ready").json() == {"status": "ready"}
+
+    async def database_down():
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(health, "check_database", database_down)
+    assert test_client.get("/health/ready").status_code == 503
+
+
+def test_db_pool_stats_need_admin(test_client):
+    assert test_client.get("/health/db-pool").status_code == 403
+
+    app.dependency_overrides[get_current_role] = lambda: Role.ADMIN
+    response = test_client.get("/health/db-pool")
+    assert response.status_code == 200
+    assert response.json()["pool"] == "StaticPool"
+
+
+def test_pool_stats_count_checkouts_and_timeouts(tmp_path):
+    TimedQueuePool.wait_stats.clear()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    with engine.connect():
+        stats = pool_stats(engine.pool)
+        assert stats["checked_out"] == 1
+        assert stats["overflow"] == 0
+        with pytest.raises(TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine.pool)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.01
+    engine.dispose()
+
+
+def test_engine_options_for_postgres(monkeypatch):
+    monkeypatch.setattr(pool, "DB_MAX_CONNECTIONS", 90)
+    monkeypatch.setattr(pool, "WEB_CONCURRENCY", 4)
+    monkeypatch.setattr(pool, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+    options = engine_options(make_url("postgresql+asyncpg://db/app"), asyncio=True)
+    # A fifth each for four gunicorn workers and the distance worker
+    assert options["pool_size"] == 18
+    assert options["max_overflow"] == 0
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+
+    options = engine_options(make_url("postgresql://db/app"))
+    assert options["poolclass"] is TimedQueuePool
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
@@ -1,22 +1,42 @@
-import pytest
+from datetime import datetime, timedelta, timezone
 
+import httpx
+from sqlalchemy import insert, select
+from sqlalchemy.orm import joinedload
 
-@pytest.fixture
-def test_home(test_client):
-    home_data = {
-        "name": "Test Home",
-        "address": {
-            "street": "123 Test St",
-            "city": "Testville",
-            "postal_code": "12345",
-            "country": "Testland",
-            "latitude": 12.345678,
-            "longitude": 98.765432,
-        },
-    }
-    response = test_client.post("/homes/", json=home_data)
-    assert response.status_code == 200
-    return response.json()
+from app.crud.distance_failures import record_distance_failures
+from app.crud.distance_jobs import purge_finished_jobs
+from app.crud.distances import (
+    bulk_insert_distances,
+    compute_home_distances,
+    retry_distance_failures,
+)
+from app.crud.locations import delete_location
+from app.models import (
+    Distance,
+    DistanceFailure,
+    DistanceFailureReason,
+    DistanceJob,
+    DistanceJobStatus,
+    Home,
+)
+from app.schemas.distance import FailedDistance
+from app.worker import process_next_job
+
+
+def drain_jobs(run, db_session, ors_client):
+    while run(process_next_job(db_session, ors_client)):
+        pass
+
+
+def get_failures(run, db_session, home_id):
+    return run(
+        db_session.scalars(
+            select(DistanceFailure)
+            .filter_by(source_home_id=home_id)
+            .execution_options(populate_existing=True)
+        )
+    ).all()
 
 
 def test_create_home(test_client):
@@ -49,6 +69,22 @@ def test_read_homes(test_client, test_home):
     assert any(home["id"] == test_home["id"] for home in data)
 
 
+def test_read_homes_by_page(test_client, test_home):
+    home_data = {"name": "Second Home", "address": test_home["address"]}
+    second_id = test_client.post("/homes/", json=home_data).json()["id"]
+
+    response = test_client.get("/homes/page?limit=1")
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [home["id"] for home in first_page["items"]] == [test_home["id"]]
+
+    response = test_client.get(
+        "/homes/page", params={"limit": 1, "cursor": first_page["next_cursor"]}
+    )
+    assert [home["id"] for home in response.json()["items"]] == [second_id]
+    assert response.json()["next_cursor"] is None
+
+
 def test_read_home_by_id(test_client, test_home):
     home_id = test_home["id"]
     response = test_client.get(f"/homes/{home_id}")
@@ -77,3 +113,569 @@ def test_create_home_invalid_data(test_client):
     }
     response = test_client.post("/homes/", json=home_data)
     assert response.status_code == 422  # Unprocessable Entity
+
+
+def test_create_home_distances_use_matrix(test_client, db_session, ors_client, run):
+    location_data = {
+        "name": "Test Location",
+        "summary": "A brief summary",
+        "description": "A detailed description",
+        "price_estimate_min": 100,
+        "price_estimate_max": 200,
+        "address": {
+            "street": "1 Near St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 12.35,
+            "longitude": 98.77,
+        },
+    }
+    for i in range(3):
+        location_data["address"]["latitude"] = 12.35 + i / 100
+        response = test_client.post("/locations/", json=location_data)
+        assert response.status_code == 200
+    drain_jobs(run, db_session, ors_client)
+    ors_client.get_duration_matrix_minutes.return_value = [[5.0, None, 12.4]]
+
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 12.345678,
+            "longitude": 98.765432,
+        },
+    }
+    response = test_client.post("/homes/", json=home_data)
+    assert response.status_code == 200
+    assert response.json()["distances_status"] == "pending"
+    home_id = response.json()["id"]
+
+    # Distances are left to the background worker
+    ors_client.get_duration_matrix_minutes.assert_not_called()
+    response = test_client.get(f"/homes/{home_id}/distances")
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "pending",
+        "distances": [],
+        "next_cursor": None,
+    }
+
+    drain_jobs(run, db_session, ors_client)
+
+    # A single matrix call covers every location, unroutable pairs are skipped
+    ors_client.get_duration_matrix_minutes.assert_called_once()
+    ors_client.get_route_duration_minutes.assert_not_called()
+    response = test_client.get(f"/homes/{home_id}/distances")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    minutes = [d["walking_distance_minutes"] for d in response.json()["distances"]]
+    assert minutes == [5, 12]
+
+    # Recomputing for unchanged addresses is served from the route cache
+    db_home = run(
+        db_session.get(
+            Home, home_id, options=[joinedload(Home.address)], populate_existing=True
+        )
+    )
+    run(compute_home_distances(db_session, db_home, ors_client))
+    ors_client.get_duration_matrix_minutes.assert_called_once()
+    response = test_client.get(f"/homes/{home_id}/distances")
+    minutes = [d["walking_distance_minutes"] for d in response.json()["distances"]]
+    assert minutes == [5, 12]
+
+
+def test_failed_distances_are_saved_and_retried(
+    test_client, db_session, ors_client, run
+):
+    location_data = {
+        "name": "Test Location",
+        "summary": "A brief summary",
+        "description": "A detailed description",
+        "price_estimate_min": 100,
+        "price_estimate_max": 200,
+        "address": {
+            "street": "1 Near St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 22.35,
+            "longitude": 98.77,
+        },
+    }
+    for i in range(2):
+        location_data["address"]["latitude"] = 22.35 + i / 100
+        response = test_client.post("/locations/", json=location_data)
+        assert response.status_code == 200
+    drain_jobs(run, db_session, ors_client)
+
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 22.345678,
+            "longitude": 98.765432,
+        },
+    }
+    response = test_client.post("/homes/", json=home_data)
+    home_id = response.json()["id"]
+    ors_client.get_duration_matrix_minutes.side_effect = httpx.ConnectError("down")
+    drain_jobs(run, db_session, ors_client)
+
+    # Every pair is kept for a retry instead of failing the whole job
+    failures = get_failures(run, db_session, home_id)
+    assert len(failures) == 2
+    assert all(f.reason == DistanceFailureReason.ERROR for f in failures)
+
+    ors_client.get_duration_matrix_minutes.side_effect = None
+    ors_client.get_duration_matrix_minutes.return_value = [[7.0, None]]
+    result = run(retry_distance_failures(db_session, ors_client))
+
+    assert result.created == 1
+    assert [f.reason for f in result.failed] == [DistanceFailureReason.UNROUTABLE]
+    failures = get_failures(run, db_session, home_id)
+    assert [f.reason for f in failures] == [DistanceFailureReason.UNROUTABLE]
+    response = test_client.get(f"/homes/{home_id}/distances")
+    minutes = [d["walking_distance_minutes"] for d in response.json()["distances"]]
+    assert minutes == [7]
+
+
+def test_out_of_range_locations_are_not_routed(
+    test_client, db_session, ors_client, run
+):
+    location_data = {
+        "name": "Test Location",
+        "summary": "A brief summary",
+        "description": "A detailed description",
+        "price_estimate_min": 100,
+        "price_estimate_max": 200,
+        "address": {
+            "street": "1 Near St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 32.35,
+            "longitude": 98.77,
+        },
+    }
+    response = test_client.post("/locations/", json=location_data)
+    near_id = response.json()["id"]
+    # Roughly 100 km north, too far to walk
+    location_data["address"]["latitude"] = 33.25
+    response = test_client.post("/locations/", json=location_data)
+    far_id = response.json()["id"]
+    drain_jobs(run, db_session, ors_client)
+    ors_client.get_duration_matrix_minutes.reset_mock()
+    ors_client.get_duration_matrix_minutes.return_value = [[9.0]]
+
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 32.345678,
+            "longitude": 98.765432,
+        },
+    }
+    response = test_client.post("/homes/", json=home_data)
+    home_id = response.json()["id"]
+    drain_jobs(run, db_session, ors_client)
+
+    # Only the nearby location is sent to the router
+    destinations = ors_client.get_duration_matrix_minutes.call_args.kwargs[
+        "destinations"
+    ]
+    assert destinations == [(98.77, 32.35)]
+    response = test_client.get(f"/homes/{home_id}/distances")
+    assert [d["destination_location_id"] for d in response.json()["distances"]] == [
+        near_id
+    ]
+    (db_failure,) = get_failures(run, db_session, home_id)
+    assert db_failure.destination_location_id == far_id
+    assert db_failure.reason == DistanceFailureReason.OUT_OF_RANGE
+
+
+def test_nearby_locations(test_client):
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 42.0,
+            "longitude": 10.0,
+        },
+    }
+    home_id = test_client.post("/homes/", json=home_data).json()["id"]
+    location_ids = []
+    # Roughly 10, 0.5 and 3 km north of the home
+    for latitude in (42.09, 42.0045, 42.027):
+        location_data = {
+            "name": "Test Location",
+            "summary": "A brief summary",
+            "description": "A detailed description",
+            "price_estimate_min": 100,
+            "price_estimate_max": 200,
+            "address": {**home_data["address"], "latitude": latitude},
+        }
+        response = test_client.post("/locations/", json=location_data)
+        location_ids.append(response.json()["id"])
+
+    response = test_client.get(f"/homes/{home_id}/nearby?radius_km=5")
+    assert response.status_code == 200
+    nearby = response.json()
+    assert [n["location"]["id"] for n in nearby] == location_ids[1:]
+    assert 0.4 < nearby[0]["distance_km"] < 0.6
+    assert nearby[0]["walking_distance_minutes"] is None
+
+    response = test_client.get(f"/homes/{home_id}/nearby?radius_km=50&limit=1")
+    assert [n["location"]["id"] for n in response.json()] == [location_ids[1]]
+
+    assert test_client.get("/homes/9999/nearby").status_code == 404
+    assert test_client.get(f"/homes/{home_id}/nearby?radius_km=0").status_code == 422
+
+
+def test_query_distances(test_client, db_session, ors_client, run):
+    location_ids = []
+    # (price_estimate_min, price_estimate_max) for each location
+    prices = [(0, 10), (20, 40), (50, 80), (5, 30)]
+    for i, (price_min, price_max) in enumerate(prices):
+        location_data = {
+            "name": f"Location {i}",
+            "summary": "A brief summary",
+            "description": "A detailed description",
+            "price_estimate_min": price_min,
+            "price_estimate_max": price_max,
+            "address": {
+                "street": "1 Near St",
+                "city": "Testville",
+                "postal_code": "12345",
+                "country": "Testland",
+                "latitude": 62.35 + i / 100,
+                "longitude": 98.77,
+            },
+        }
+        response = test_client.post("/locations/", json=location_data)
+        location_ids.append(response.json()["id"])
+    drain_jobs(run, db_session, ors_client)
+
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 62.345678,
+            "longitude": 98.765432,
+        },
+    }
+    home_id = test_client.post("/homes/", json=home_data).json()["id"]
+    ors_client.get_duration_matrix_minutes.return_value = [[30.0, 10.0, 20.0, 10.0]]
+    drain_jobs(run, db_session, ors_client)
+
+    def destinations(**params):
+        response = test_client.get(f"/homes/{home_id}/distances", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        ids = [d["destination_location_id"] for d in body["distances"]]
+        return [location_ids.index(i) for i in ids], body["next_cursor"]
+
+    # Nearest first by default, ties broken by storage order
+    assert destinations() == ([1, 3, 2, 0], None)
+    assert destinations(order_by="id") == ([0, 1, 2, 3], None)
+    assert destinations(max_minutes=20) == ([1, 3, 2], None)
+    # Price ranges overlapping 25-45
+    assert destinations(min_price=25, max_price=45) == ([1, 3], None)
+
+    pages = []
+    cursor = None
+    while True:
+        params = {"limit": 3} if cursor is None else {"limit": 3, "cursor": cursor}
+        page, cursor = destinations(**params)
+        pages.append(page)
+        if cursor is None:
+            break
+    assert pages == [[1, 3, 2], [0]]
+
+    response = test_client.get(f"/homes/{home_id}/distances?cursor=nonsense")
+    assert response.status_code == 400
+
+
+def test_rankings(test_client, db_session, ors_client, run):
+    def location_data(i, price_min):
+        return {
+            "name": f"Location {i}",
+            "summary": "A brief summary",
+            "description": "A detailed description",
+            "price_estimate_min": price_min,
+            "price_estimate_max": price_min + 10,
+            "address": {
+                "street": "1 Near St",
+                "city": "Testville",
+                "postal_code": "12345",
+                "country": "Testland",
+                "latitude": 62.35 + i / 100,
+                "longitude": 98.77,
+            },
+        }
+
+    location_ids = [
+        test_client.post("/locations/", json=location_data(i, price)).json()["id"]
+        for i, price in enumerate([0, 20, 50])
+    ]
+    drain_jobs(run, db_session, ors_client)
+
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 62.345678,
+            "longitude": 98.765432,
+        },
+    }
+    home_id = test_client.post("/homes/", json=home_data).json()["id"]
+    ors_client.get_duration_matrix_minutes.return_value = [[30.0, 10.0, 20.0]]
+    drain_jobs(run, db_session, ors_client)
+
+    def ranked(**params):
+        response = test_client.get(f"/homes/{home_id}/rankings", params=params)
+        assert response.status_code == 200
+        return [location_ids.index(r["location_id"]) for r in response.json()]
+
+    assert ranked() == [1, 2, 0]
+    assert ranked(limit=2) == [1, 2]
+    assert ranked(max_minutes=20) == [1, 2]
+    assert ranked(max_price=20) == [1, 0]
+    first = test_client.get(f"/homes/{home_id}/rankings").json()[0]
+    assert first["location_name"] == "Location 1"
+    assert first["walking_distance_minutes"] == 10
+    assert first["city"] == "Testville"
+
+    # A new price is copied over straight away, without recomputing distances
+    response = test_client.put(
+        f"/locations/{location_ids[2]}", json=location_data(2, 5)
+    )
+    assert response.status_code == 200
+    assert ranked(max_price=20) == [1, 2, 0]
+
+    # Deleting a location removes it from every home's rankings
+    run(delete_location(db_session, location_ids[1]))
+    assert ranked() == [2, 0]
+
+    response = test_client.get("/homes/9999/rankings")
+    assert response.status_code == 404
+
+
+def test_read_distances_nonexistent_home(test_client):
+    response = test_client.get("/homes/9999/distances")
+    assert response.status_code == 404
+
+
+def test_update_home_name_only_skips_geocoding_and_distances(
+    run, test_client, db_session, ors_client, test_home
+):
+    home_id = test_home["id"]
+    drain_jobs(run, db_session, ors_client)
+
+    home_data = {"name": "Renamed Home", "address": test_home["address"]}
+    response = test_client.put(f"/homes/{home_id}", json=home_data)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed Home"
+    assert response.json()["distances_status"] is None
+    ors_client.get_coordinates.assert_not_called()
+    assert not run(process_next_job(db_session, ors_client))
+
+
+def test_update_home_address_uses_given_coordinates(
+    test_client, db_session, ors_client, test_home, run
+):
+    home_id = test_home["id"]
+    address = dict(test_home["address"], latitude=52.2053, longitude=0.1218)
+
+    response = test_client.put(
+        f"/homes/{home_id}", json={"name": "Test Home", "address": address}
+    )
+    assert response.status_code == 200
+    assert response.json()["address"]["latitude"] == 52.2053
+    assert response.json()["distances_status"] == "pending"
+    ors_client.get_coordinates.assert_not_called()
+
+
+def test_create_homes_in_bulk_computes_distances_in_one_batch(
+    test_client, db_session, ors_client, run
+):
+    location_data = {
+        "name": "Test Location",
+        "summary": "A brief summary",
+        "description": "A detailed description",
+        "price_estimate_min": 100,
+        "price_estimate_max": 200,
+        "address": {
+            "street": "1 Near St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 12.35,
+            "longitude": 98.77,
+        },
+    }
+    response = test_client.post("/locations/bulk", json=[location_data] * 2)
+    assert [result["status"] for result in response.json()] == ["created"] * 2
+    drain_jobs(run, db_session, ors_client)
+
+    def fake_matrix(sources, destinations, profile):
+        return [[10.0 + i] * len(destinations) for i in range(len(sources))]
+
+    ors_client.get_duration_matrix_minutes.side_effect = fake_matrix
+    home_data = [
+        {
+            "name": f"Home {i}",
+            "address": {
+                "street": f"{i} Test St",
+                "city": "Testville",
+                "postal_code": "12345",
+                "country": "Testland",
+                "latitude": 12.345 + i / 1000,
+                "longitude": 98.765,
+            },
+        }
+        for i in range(3)
+    ]
+    response = test_client.post("/homes/bulk", json=home_data)
+    assert response.status_code == 200
+    homes = [result["item"] for result in response.json()]
+    assert [home["name"] for home in homes] == ["Home 0", "Home 1", "Home 2"]
+    assert all(home["distances_status"] == "pending" for home in homes)
+
+    drain_jobs(run, db_session, ors_client)
+
+    # One 3 x 2 matrix lookup rather than one per home
+    ors_client.get_duration_matrix_minutes.assert_called_once()
+    assert len(ors_client.get_duration_matrix_minutes.call_args.kwargs["sources"]) == 3
+    for i, home in enumerate(homes):
+        response = test_client.get(f"/homes/{home['id']}/distances")
+        assert response.json()["status"] == "ready"
+        minutes = [d["walking_distance_minutes"] for d in response.json()["distances"]]
+        assert minutes == [10 + i] * 2
+
+
+def test_overlapping_jobs_replace_each_others_rows(
+    test_client, test_home, db_session, ors_client, run
+):
+    location_data = {
+        "name": "Test Location",
+        "summary": "A brief summary",
+        "description": "A detailed description",
+        "price_estimate_min": 10,
+        "price_estimate_max": 20,
+        "address": {
+            "street": "1 Near St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 12.35,
+            "longitude": 98.77,
+        },
+    }
+    location_id = test_client.post("/locations/", json=location_data).json()["id"]
+    ors_client.get_duration_matrix_minutes.return_value = [[5.0]]
+    drain_jobs(run, db_session, ors_client)
+
+    # What a job for the location, started before the home's job committed,
+    # writes for the same pair
+    pair = {"source_home_id": test_home["id"], "destination_location_id": location_id}
+    run(bulk_insert_distances(db_session, [{**pair, "walking_distance_minutes": 9}]))
+    for error in ("first", "second"):
+        failure = FailedDistance(
+            **pair, reason=DistanceFailureReason.ERROR, error=error
+        )
+        run(record_distance_failures(db_session, [failure]))
+    run(db_session.commit())
+
+    distances = run(
+        db_session.scalars(select(Distance.walking_distance_minutes).filter_by(**pair))
+    ).all()
+    assert distances == [9]
+    assert [f.error for f in get_failures(run, db_session, test_home["id"])] == [
+        "second"
+    ]
+
+
+def test_only_nearby_location_jobs_make_a_home_pending(
+    test_client, test_home, db_session, ors_client, run
+):
+    def location_data(latitude):
+        return {
+            "name": "Test Location",
+            "summary": "A brief summary",
+            "description": "A detailed description",
+            "price_estimate_min": 10,
+            "price_estimate_max": 20,
+            "address": {
+                "street": "1 Near St",
+                "city": "Testville",
+                "postal_code": "12345",
+                "country": "Testland",
+                "latitude": latitude,
+                "longitude": 98.77,
+            },
+        }
+
+    url = f"/homes/{test_home['id']}/distances"
+    drain_jobs(run, db_session, ors_client)
+    assert test_client.get(url).json()["status"] == "ready"
+
+    # Far out of range, its job only records the pair as out_of_range
+    test_client.post("/locations/", json=location_data(62.35))
+    assert test_client.get(url).json()["status"] == "ready"
+
+    test_client.post("/locations/", json=location_data(12.35))
+    assert test_client.get(url).json()["status"] == "pending"
+
+
+def test_finished_jobs_are_purged(test_home, db_session, run):
+    home_id = test_home["id"]
+    old = datetime.now(timezone.utc) - timedelta(days=2)
+    run(
+        db_session.execute(
+            insert(DistanceJob),
+            [
+                # Replaced by the next job, and done long ago
+                {"kind": "HOME", "target_id": home_id, "status": "FAILED"},
+                {
+                    "kind": "HOME",
+                    "target_id": home_id,
+                    "status": "DONE",
+                    "updated_at": old,
+                },
+                # The latest failure is kept, it is the home's status
+                {"kind": "HOME", "target_id": 999, "status": "FAILED"},
+            ],
+        )
+    )
+    run(db_session.commit())
+
+    assert run(purge_finished_jobs(db_session)) == 2
+    remaining = run(
+        db_session.execute(
+            select(DistanceJob.target_id, DistanceJob.status).order_by(DistanceJob.id)
+        )
+    ).all()
+    # The job queued when the home was created has not run yet
+    assert [tuple(row) for row in remaining] == [
+        (home_id, DistanceJobStatus.PENDING),
+        (999, DistanceJobStatus.FAILED),
+    ]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.services.local_routing import LocalRoutingClient
+from app.services.routing import create_routing_client
+from app.worker import process_next_job
+
+
+@pytest.fixture
+def ors_client():
+    """Run the full pipeline against the offline backend instead of a mock."""
+    return LocalRoutingClient()
+
+
+def test_create_routing_client_by_name():
+    assert isinstance(create_routing_client("local"), LocalRoutingClient)
+    with pytest.raises(ValueError):
+        create_routing_client("nope")
+
+
+def test_local_geocoding_uses_gazetteer(ors_client):
+    assert asyncio.run(ors_client.get_coordinates("Cambridge")) == (0.1218, 52.2053)
+
+    # Streets the gazetteer does not know land at a stable point in their city
+    first = asyncio.run(ors_client.get_coordinates("1 Mill Road, Cambridge, England"))
+    again = asyncio.run(ors_client.get_coordinates("1 Mill Road, Cambridge, England"))
+    other = asyncio.run(ors_client.get_coordinates("9 Hills Road, Cambridge, England"))
+    assert first == again
+    assert first != other
+    assert abs(first[0] - 0.1218) < 0.1 and abs(first[1] - 52.2053) < 0.1
+
+    with pytest.raises(ValueError):
+        asyncio.run(ors_client.get_coordinates("Atlantis"))
+
+
+def test_local_duration_matrix(ors_client):
+    cambridge = (0.1218, 52.2053)
+    london = (-0.1276, 51.5072)
+    matrix = asyncio.run(
+        ors_client.get_duration_matrix_minutes([cambridge], [cambridge, london])
+    )
+
+    assert matrix[0][0] == 0
+    # ~80 km at 5 km/h, stretched by the detour factor
+    assert 1100 < matrix[0][1] < 1400
+    assert matrix[0][1] == asyncio.run(
+        ors_client.get_route_duration_minutes(*cambridge, *london)
+    )
+
+
+def test_distances_pipeline_runs_offline(test_client, db_session, ors_client, run):
+    # No coordinates given, so both addresses are geocoded by the local backend
+    address = {
+        "city": "Cambridge",
+        "postal_code": "CB1 2JW",
+        "country": "England",
+        "latitude": None,
+        "longitude": None,
+    }
+    location_data = {
+        "name": "Station",
+        "summary": "A brief summary",
+        "description": "A detailed description",
+        "price_estimate_min": 0,
+        "price_estimate_max": 10,
+        "address": {"street": "Station Road", **address},
+    }
+    response = test_client.post("/locations/", json=location_data)
+    assert response.status_code == 200
+    home_data = {"name": "Home", "address": {"street": "Green Street", **address}}
+    response = test_client.post("/homes/", json=home_data)
+    assert response.status_code == 200
+    home_id = response.json()["id"]
+
+    while run(process_next_job(db_session, ors_client)):
+        pass
+
+    response = test_client.get(f"/homes/{home_id}/distances")
+    assert response.json()["status"] == "ready"
+    [distance] = response.json()["distances"]
+    assert 10 < distance["walking_distance_minutes"] < 40
@@ -61,6 +61,31 @@ def test_read_locations(test_client, test_location):
     assert any(location["id"] == test_location["id"] for location in data)
 
 
+def test_read_locations_by_page(test_client, test_location):
+    location_data = {**test_location, "address": {**test_location["address"]}}
+    for _ in range(2):
+        response = test_client.post("/locations/", json=location_data)
+        assert response.status_code == 200
+
+    ids = []
+    params = {"limit": 2}
+    while True:
+        response = test_client.get("/locations/page", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        ids.extend(location["id"] for location in page["items"])
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert ids == sorted(ids)
+    assert len(ids) == 3
+    assert test_client.get("/locations/page?cursor=bad").status_code == 400
+    # [true], which JSON decodes to a bool rather than an id
+    assert test_client.get("/locations/page?cursor=W3RydWVd").status_code == 400
+
+
 def test_read_location_by_id(test_client, test_location):
     location_id = test_location["id"]
     response = test_client.get(f"/locations/{location_id}")
@@ -126,3 +151,60 @@ def test_create_location_invalid_data(test_client):
     }
     response = test_client.post("/locations/", json=location_data)
     assert response.status_code == 422  # Unprocessable Entity
+
+
+def test_create_locations_in_bulk(test_client, ors_client):
+    def location(street, latitude=None):
+        return {
+            "name": f"Location on {street}",
+            "summary": "A brief summary",
+            "description": "A detailed description",
+            "price_estimate_min": 100,
+            "price_estimate_max": 200,
+            "address": {
+                "street": street,
+                "city": "Testville",
+                "postal_code": "12345",
+                "country": "Testland",
+                "latitude": latitude,
+                "longitude": None if latitude is None else 98.76,
+            },
+        }
+
+    def geocode(text):
+        if text.startswith("1 Nowhere"):
+            raise ValueError("No coordinates found for the given location.")
+        return (98.77, 12.35)
+
+    ors_client.get_coordinates.side_effect = geocode
+    response = test_client.post(
+        "/locations/bulk",
+        json=[
+            location("1 Market St"),
+            location("1 Nowhere Rd"),
+            location("2 Bridge St", latitude=12.34),
+            location("1 MARKET ST"),
+        ],
+    )
+    assert response.status_code == 200
+    results = response.json()
+
+    # Each distinct address is geocoded once
+    assert ors_client.get_coordinates.call_count == 2
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["status"] for result in results] == [
+        "created",
+        "failed",
+        "created",
+        "created",
+    ]
+    assert "No coordinates found" in results[1]["error"]
+    created = [result["item"] for result in results if result["item"]]
+    assert [item["address"]["latitude"] for item in created] == [12.35, 12.34, 12.35]
+    assert all(item["distances_status"] == "pending" for item in created)
+    assert created[1]["creator"]["email"] == "testuser@example.com"
+    assert len(test_client.get("/locations/").json()) == 3
+
+
+def test_create_locations_in_bulk_needs_items(test_client):
+    assert test_client.post("/locations/bulk", json=[]).status_code == 422
@@ -0,0 +1,78 @@
+import json
+import logging
+
+import pytest
+
+from app.utils.log import (
+    configure_logging,
+    parse_levels,
+    request_id,
+    stop_logging,
+)
+
+
+@pytest.fixture
+def log_output(capsys):
+    """Read what configure_logging wrote to stdout, and restore logging after."""
+    root = logging.getLogger()
+    handlers, level = root.handlers, root.level
+
+    def read_entries():
+        # Stopping the listener writes out everything still queued
+        stop_logging()
+        return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    yield read_entries
+    stop_logging()
+    root.handlers, root.level = handlers, level
+    logging.getLogger("app.quiet").setLevel(logging.NOTSET)
+
+
+def test_records_are_json_with_request_id_and_extras(log_output):
+    configure_logging()
+    logger = logging.getLogger("app.test")
+
+    token = request_id.set("abc123")
+    try:
+        logger.info("Job %s done", 7, extra={"job_id": 7})
+    finally:
+        request_id.reset(token)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Job failed")
+
+    done, failed = log_output()
+    assert done["message"] == "Job 7 done"
+    assert done["level"] == "INFO"
+    assert done["logger"] == "app.test"
+    assert done["request_id"] == "abc123"
+    assert done["job_id"] == 7
+    assert "request_id" not in failed
+    assert "ValueError: boom" in failed["exception"]
+
+
+def test_levels_are_set_per_module(log_output):
+    configure_logging(level="INFO", levels="app.quiet=ERROR")
+    logging.getLogger("app.quiet").warning("Hidden")
+    logging.getLogger("app.loud").warning("Shown")
+
+    assert [entry["message"] for entry in log_output()] == ["Shown"]
+    assert parse_levels(" app.worker=debug, sqlalchemy.engine=INFO ") == {
+        "app.worker": "DEBUG",
+        "sqlalchemy.engine": "INFO",
+    }
+    with pytest.raises(ValueError):
+        parse_levels("app.worker")
+
+
+def test_requests_get_an_id(test_client):
+    response = test_client.get("/")
+    assert len(response.headers["x-request-id"]) == 32
+
+    response = test_client.get("/", headers={"X-Request-ID": "from-proxy-1"})
+    assert response.headers["x-request-id"] == "from-proxy-1"
+
+    # Anything that could break a log line is replaced
+    response = test_client.get("/", headers={"X-Request-ID": "bad id\tvalue"})
+    assert response.headers["x-request-id"] != "bad id\tvalue"
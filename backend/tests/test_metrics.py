@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.api import dependencies
+from app.services import openrouteservice
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.metrics import (
+    Registry,
+    db_queries_per_request,
+    db_query_duration,
+    http_request_duration,
+    http_requests,
+    ors_errors,
+    ors_request_duration,
+    ors_requests,
+)
+from app.services.openrouteservice import OpenRouteServiceClient
+
+
+def mock_http(client, handler):
+    client._http = httpx.AsyncClient(
+        base_url=client.BASE_URL, transport=httpx.MockTransport(handler)
+    )
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("status",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    requests.inc(status="200")
+    requests.inc(2, status="500")
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{status="200"} 1',
+        'requests_total{status="500"} 2',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        "latency_seconds_sum 0.55",
+        "latency_seconds_count 2",
+    ]
+    with pytest.raises(ValueError):
+        requests.inc(route="/")
+
+
+def test_requests_are_labelled_by_route_template(test_client, test_home):
+    test_client.get(f"/homes/{test_home['id']}")
+    test_client.get("/homes/0")
+    test_client.get("/no-such-page")
+
+    route = "/homes/{home_id}"
+    assert http_requests.value(method="GET", route=route, status="200") == 1
+    assert http_requests.value(method="GET", route=route, status="404") == 1
+    assert http_requests.value(method="GET", route="unmatched", status="404") == 1
+    assert http_request_duration.count(method="GET", route=route) == 2
+
+
+def test_queries_are_counted_per_request(test_client, test_home, db_session):
+    db_session.expunge_all()
+    test_client.get(f"/homes/{test_home['id']}")
+
+    # One SELECT with the address and creator joined in
+    route = "/homes/{home_id}"
+    assert db_queries_per_request.count(method="GET", route=route) == 1
+    assert db_queries_per_request.sum(method="GET", route=route) == 1
+    assert db_query_duration.count(route=route) == 1
+
+
+def test_ors_calls_are_counted_by_endpoint(monkeypatch):
+    monkeypatch.setattr(openrouteservice, "ORS_RETRY_BASE_SECONDS", 0)
+    client = OpenRouteServiceClient(api_key="test")
+    client.circuit_breaker.failure_threshold = 1
+    responses = [httpx.Response(503), httpx.ConnectError("refused")]
+
+    def handler(request):
+        response = responses.pop(0) if responses else httpx.Response(500)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    mock_http(client, handler)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.get_route_duration_minutes(0.1, 52.2, 0.2, 52.3))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.get_coordinates("Cambridge"))
+
+    # Four attempts at directions: 503, a dropped connection, then 500 twice
+    assert ors_requests.value(endpoint="directions", status="503") == 1
+    assert ors_requests.value(endpoint="directions", status="error") == 1
+    assert ors_requests.value(endpoint="directions", status="500") == 2
+    assert ors_request_duration.count(endpoint="directions") == 4
+    assert ors_errors.value(endpoint="directions", reason="http_status") == 1
+    assert ors_errors.value(endpoint="geocode", reason="circuit_open") == 1
+
+
+def test_metrics_endpoint(monkeypatch, test_client, test_home):
+    test_client.get("/homes/")
+
+    # Closed without a token configured, and to requests without it
+    assert test_client.get("/metrics").status_code == 401
+    monkeypatch.setattr(dependencies, "METRICS_TOKEN", "scrape-secret")
+    headers = {"Authorization": "Bearer wrong"}
+    assert test_client.get("/metrics", headers=headers).status_code == 401
+
+    headers = {"Authorization": "Bearer scrape-secret"}
+    response = test_client.get("/metrics", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_requests_total{method="GET",route="/homes/",status="200"} 1'
+        in response.text
+    )
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'cache_lookups_total{cache="response",result="miss"} 1' in response.text
@@ -0,0 +1,138 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    inspect,
+)
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from app.migrate import alembic_config, run_migrations
+from app.utils.database import Base
+
+
+def test_migrations_match_models():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        run_migrations(connection)
+
+        # Anything left here needs a new migration (alembic revision --autogenerate)
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+        assert diff == []
+
+        command.downgrade(alembic_config(connection), "base")
+        assert inspect(connection).get_table_names() == ["alembic_version"]
+
+
+def baseline_metadata() -> MetaData:
+    """The tables Base.metadata.create_all made before there were migrations."""
+    metadata = MetaData()
+
+    def timestamps():
+        return [
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+            Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+        ]
+
+    Table(
+        "users",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, nullable=False),
+        Column("email", String, unique=True, index=True, nullable=False),
+        Column("hashed_password", String, nullable=False),
+        Column("role", Enum("USER", "ADMIN", "ROOT", name="role"), nullable=False),
+        *timestamps(),
+    )
+    Table(
+        "addresses",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("street", String, nullable=False),
+        Column("city", String, nullable=False),
+        Column("postal_code", String, nullable=False),
+        Column("country", String, nullable=False),
+        Column("latitude", Float, nullable=False),
+        Column("longitude", Float, nullable=False),
+        *timestamps(),
+    )
+    Table(
+        "homes",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, nullable=False),
+        Column("address_id", Integer, ForeignKey("addresses.id")),
+        Column("creation_user_id", Integer, ForeignKey("users.id")),
+        *timestamps(),
+    )
+    Table(
+        "locations",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, nullable=False),
+        Column("summary", String, nullable=True),
+        Column("description", String, nullable=False),
+        Column("price_estimate_min", Integer, nullable=False),
+        Column("price_estimate_max", Integer, nullable=False),
+        Column("address_id", Integer, ForeignKey("addresses.id")),
+        Column("creation_user_id", Integer, ForeignKey("users.id")),
+        *timestamps(),
+    )
+    Table(
+        "distances",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("source_home_id", Integer, ForeignKey("homes.id")),
+        Column("destination_location_id", Integer, ForeignKey("locations.id")),
+        Column("walking_distance_minutes", Integer, nullable=False),
+        *timestamps(),
+    )
+    return metadata
+
+
+def test_existing_create_all_schema_is_stamped_then_upgraded():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        baseline_metadata().create_all(connection)
+        connection.exec_driver_sql(
+            "INSERT INTO users (id, name, email, hashed_password, role) "
+            "VALUES (1, 'A', 'a@example.com', 'x', 'USER')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO addresses (id, street, city, postal_code, country, "
+            "latitude, longitude) VALUES (1, '1 St', 'Cambridge', 'CB1', 'UK', 52, 0)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO homes (id, name, address_id, creation_user_id) "
+            "VALUES (1, 'Home', 1, 1)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO locations (id, name, description, price_estimate_min, "
+            "price_estimate_max, address_id, creation_user_id) "
+            "VALUES (1, 'Cafe', 'Coffee', 1, 5, 1, 1)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO distances (source_home_id, destination_location_id, "
+            "walking_distance_minutes) VALUES (1, 1, 7)"
+        )
+
+        run_migrations(connection)
+
+        tables = set(inspect(connection).get_table_names())
+        assert {"distance_jobs", "distance_failures", "geocode_cache"} <= tables
+        indexes = {index["name"] for index in inspect(connection).get_indexes("homes")}
+        assert "ix_homes_creation_user_id" in indexes
+        rankings = connection.exec_driver_sql(
+            "SELECT home_id, location_id, walking_distance_minutes "
+            "FROM home_location_rankings"
+        ).all()
+        assert rankings == [(1, 1, 7)]
@@ -0,0 +1,50 @@
+import asyncio
+from unittest.mock import patch
+
+from app.services.openrouteservice import OpenRouteServiceClient
+
+
+async def fake_matrix_response(endpoint, body):
+    sources = body["sources"]
+    destinations = body["destinations"]
+    # Encode source/destination indexes into the duration so chunks can be checked
+    return {
+        "durations": [
+            [
+                (body["locations"][s][0] * 1000 + body["locations"][d][0]) * 60
+                for d in destinations
+            ]
+            for s in sources
+        ]
+    }
+
+
+def test_duration_matrix_is_chunked_to_route_limit():
+    client = OpenRouteServiceClient(api_key="test")
+    sources = [(i, 0.0) for i in range(3)]
+    destinations = [(j, 0.0) for j in range(2500)]
+
+    with patch.object(client, "_post", side_effect=fake_matrix_response) as post:
+        matrix = asyncio.run(client.get_duration_matrix_minutes(sources, destinations))
+
+    # 3 sources x 2500 destinations = 7500 routes, 3500 max per request
+    assert post.call_count == 3
+    for call in post.call_args_list:
+        body = call.args[1]
+        assert len(body["sources"]) * len(body["destinations"]) <= 3500
+    assert len(matrix) == 3
+    assert all(len(row) == 2500 for row in matrix)
+    assert matrix[2][2499] == 2 * 1000 + 2499
+    assert matrix[1][0] == 1000
+
+
+def test_duration_matrix_keeps_unroutable_pairs_as_none():
+    client = OpenRouteServiceClient(api_key="test")
+    response = {"durations": [[None, 120.0]]}
+
+    with patch.object(client, "_post", return_value=response):
+        matrix = asyncio.run(
+            client.get_duration_matrix_minutes([(0.0, 0.0)], [(1.0, 1.0), (2.0, 2.0)])
+        )
+
+    assert matrix == [[None, 2.0]]
@@ -0,0 +1,128 @@
+"""
+Regression tests for N+1 queries: an endpoint should run the same number of
+queries however many rows it returns.
+"""
+
+import pytest
+from sqlalchemy import func, select
+
+from app.crud.home import delete_home
+from app.crud.rankings import refresh_home_rankings
+from app.models import Address, Distance, Home, HomeLocationRanking, Location, User
+
+SMALL_PAGE = 2
+LARGE_PAGE = 20
+
+
+@pytest.fixture
+def seeded(db_session, run):
+    """LARGE_PAGE homes and locations, each with its own creator and address."""
+    for i in range(LARGE_PAGE):
+        creator = User(
+            name=f"Creator {i}", email=f"creator{i}@example.com", hashed_password="x"
+        )
+        home = Home(
+            name=f"Home {i}",
+            creator=creator,
+            address=Address(
+                street=f"{i} Home St",
+                city="Testville",
+                postal_code="12345",
+                country="Testland",
+                latitude=72.0,
+                longitude=10.0 + i / 1000,
+            ),
+        )
+        location = Location(
+            name=f"Location {i}",
+            summary="A brief summary",
+            description="A detailed description",
+            price_estimate_min=0,
+            price_estimate_max=10,
+            creator=creator,
+            address=Address(
+                street=f"{i} Location St",
+                city="Testville",
+                postal_code="12345",
+                country="Testland",
+                latitude=72.0,
+                longitude=10.0 - i / 1000,
+            ),
+        )
+        db_session.add_all([home, location])
+    run(db_session.commit())
+    home_id = run(db_session.scalar(select(Home.id).where(Home.name == "Home 0")))
+    for location_id in run(db_session.scalars(select(Location.id))).all():
+        db_session.add(
+            Distance(
+                source_home_id=home_id,
+                destination_location_id=location_id,
+                walking_distance_minutes=location_id % 7,
+            )
+        )
+    run(refresh_home_rankings(db_session, home_id))
+    run(db_session.commit())
+    return home_id
+
+
+def assert_constant_queries(test_client, db_session, count_queries, url):
+    counts = []
+    for limit in (SMALL_PAGE, LARGE_PAGE):
+        # Start each request from an empty identity map, as a real request would
+        db_session.expunge_all()
+        with count_queries() as statements:
+            response = test_client.get(url.format(limit=limit))
+        assert response.status_code == 200
+        assert response.json()
+        counts.append(len(statements))
+    assert counts[0] == counts[1], f"{url} ran {counts} queries for pages of " + (
+        f"{SMALL_PAGE} and {LARGE_PAGE}"
+    )
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/homes/?limit={limit}",
+        "/locations/?limit={limit}",
+        "/homes/page?limit={limit}",
+        "/locations/page?limit={limit}",
+        "/homes/{home_id}/nearby?radius_km=5&limit={limit}",
+        "/homes/{home_id}/distances?limit={limit}",
+        "/homes/{home_id}/rankings?limit={limit}",
+    ],
+)
+def test_list_endpoints_do_not_query_per_row(
+    test_client, db_session, count_queries, seeded, url
+):
+    assert_constant_queries(
+        test_client,
+        db_session,
+        count_queries,
+        url.replace("{home_id}", str(seeded)),
+    )
+
+
+def test_single_item_endpoints_load_relations_eagerly(
+    test_client, db_session, count_queries, seeded, run
+):
+    location_id = run(db_session.scalar(select(Location.id)))
+    for url in (f"/homes/{seeded}", f"/locations/{location_id}"):
+        db_session.expunge_all()
+        with count_queries() as statements:
+            assert test_client.get(url).status_code == 200
+        assert len(statements) == 1, url
+
+
+def test_delete_home_leaves_dependent_rows_to_the_database(
+    db_session, count_queries, seeded, run
+):
+    db_session.expunge_all()
+    with count_queries() as statements:
+        run(delete_home(db_session, seeded))
+
+    # ON DELETE CASCADE removes the distances and rankings, none are loaded
+    assert len(statements) == 2, statements
+    for table in (Distance, HomeLocationRanking):
+        count = run(db_session.scalar(select(func.count()).select_from(table)))
+        assert count == 0, table.__tablename__
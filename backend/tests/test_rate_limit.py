@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services import openrouteservice
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.openrouteservice import OpenRouteServiceClient
+from app.services.rate_limit import RateLimiter, TokenBucket
+
+
+def directions_response(minutes):
+    return {"features": [{"properties": {"summary": {"duration": minutes * 60}}}]}
+
+
+def mock_http(client, handler):
+    client._http = httpx.AsyncClient(
+        base_url=client.BASE_URL, transport=httpx.MockTransport(handler)
+    )
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(capacity=2, period=1)
+    bucket.take()
+    bucket.take()
+    assert 0 < bucket.time_until_available() <= 0.5
+
+
+def test_rate_limiter_backs_off_on_429():
+    rate_limiter = RateLimiter(per_minute=60, per_day=1000)
+    delay = rate_limiter.observe(429, {"retry-after": "2"})
+    assert delay == 2
+    assert rate_limiter._resume_at - time.monotonic() > 1.5
+
+    reset_at = str(time.time() + 5)
+    rate_limiter = RateLimiter(per_minute=60, per_day=1000)
+    assert (
+        rate_limiter.observe(
+            200, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": reset_at}
+        )
+        is None
+    )
+    assert rate_limiter._resume_at - time.monotonic() > 4
+
+
+def test_client_retries_rate_limited_requests():
+    client = OpenRouteServiceClient(api_key="test")
+    responses = [
+        httpx.Response(429, headers={"retry-after": "0"}),
+        httpx.Response(200, json=directions_response(3)),
+    ]
+    mock_http(client, lambda request: responses.pop(0))
+
+    minutes = asyncio.run(client.get_route_duration_minutes(0.1, 52.2, 0.2, 52.3))
+
+    assert minutes == 3
+    assert responses == []
+
+
+def test_client_retries_server_errors(monkeypatch):
+    monkeypatch.setattr(openrouteservice, "ORS_RETRY_BASE_SECONDS", 0)
+    client = OpenRouteServiceClient(api_key="test")
+    responses = [
+        httpx.Response(503),
+        httpx.Response(502),
+        httpx.Response(200, json=directions_response(4)),
+    ]
+    mock_http(client, lambda request: responses.pop(0))
+
+    minutes = asyncio.run(client.get_route_duration_minutes(0.1, 52.2, 0.2, 52.3))
+
+    assert minutes == 4
+    assert client.circuit_breaker.state == "closed"
+
+
+def test_circuit_opens_after_repeated_failures(monkeypatch):
+    monkeypatch.setattr(openrouteservice, "ORS_RETRY_BASE_SECONDS", 0)
+    client = OpenRouteServiceClient(api_key="test")
+    client.circuit_breaker.failure_threshold = 2
+    calls = 0
+
+    def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(500)
+
+    mock_http(client, handler)
+
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(client.get_route_duration_minutes(0.1, 52.2, 0.2, 52.3))
+    calls_before_open = calls
+
+    # ORS is not called again until the reset timeout has passed
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.get_route_duration_minutes(0.1, 52.2, 0.2, 52.3))
+    assert calls == calls_before_open
+    assert client.circuit_breaker.state == "open"
+
+
+def test_half_open_trial_is_released_after_other_errors(monkeypatch):
+    client = OpenRouteServiceClient(api_key="test")
+    client.circuit_breaker.failure_threshold = 1
+    client.circuit_breaker.reset_timeout = 0
+    client.circuit_breaker.record_failure()
+    assert client.circuit_breaker.state == "half_open"
+    responses = [httpx.DecodingError("bad body"), directions_response(4)]
+
+    def handler(request):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return httpx.Response(200, json=response)
+
+    mock_http(client, handler)
+    with pytest.raises(httpx.DecodingError):
+        asyncio.run(client.get_route_duration_minutes(0.1, 52.2, 0.2, 52.3))
+
+    # The failed trial re-opened the circuit, and the next trial is let through
+    minutes = asyncio.run(client.get_route_duration_minutes(0.1, 52.2, 0.2, 52.3))
+    assert minutes == 4
+    assert client.circuit_breaker.state == "closed"
+
+
+def test_directions_fallback_runs_concurrently_within_limit():
+    client = OpenRouteServiceClient(api_key="test", max_concurrency=4, use_matrix=False)
+    in_flight = 0
+    most_in_flight = 0
+
+    async def handler(request):
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=directions_response(5))
+
+    mock_http(client, handler)
+    destinations = [(0.1 * i, 52.0) for i in range(12)]
+
+    matrix = asyncio.run(
+        client.get_duration_matrix_minutes([(0.0, 52.0)], destinations)
+    )
+
+    assert matrix == [[5] * 12]
+    assert 1 < most_in_flight <= 4
+
+
+def test_quotas_are_shared_between_processes(monkeypatch):
+    # Three gunicorn workers geocode, one distance worker routes
+    monkeypatch.setattr(openrouteservice, "WEB_CONCURRENCY", 3)
+    monkeypatch.setattr(openrouteservice, "DISTANCE_WORKERS", 1)
+    monkeypatch.setitem(openrouteservice.ORS_QUOTAS, "matrix", (40, 500))
+    monkeypatch.setitem(openrouteservice.ORS_QUOTAS, "geocode", (100, 1000))
+
+    client = OpenRouteServiceClient(api_key="test")
+    assert client.rate_limiters["matrix"].minute.capacity == 40
+    assert client.rate_limiters["matrix"].day.capacity == 500
+    assert client.rate_limiters["geocode"].minute.capacity == 33
+    assert client.rate_limiters["geocode"].day.capacity == 333
+
+    monkeypatch.setattr(openrouteservice, "DISTANCE_WORKERS", 2)
+    assert openrouteservice.process_quota("directions", 40) == 20
+    assert openrouteservice.process_quota("geocode", 2) == 1
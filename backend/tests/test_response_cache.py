@@ -0,0 +1,135 @@
+import fakeredis
+import pytest
+
+from app.services.response_cache import RedisBackend, response_cache
+from app.worker import process_next_job
+
+
+def location_data(name="Test Location", price_min=100):
+    return {
+        "name": name,
+        "summary": "A brief summary",
+        "description": "A detailed description",
+        "price_estimate_min": price_min,
+        "price_estimate_max": price_min + 100,
+        "address": {
+            "street": "123 Test St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 12.345678,
+            "longitude": 98.765432,
+        },
+    }
+
+
+@pytest.fixture
+def location_id(test_client):
+    response = test_client.post("/locations/", json=location_data())
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_etag_and_not_modified(test_client, location_id):
+    url = f"/locations/{location_id}"
+    first = test_client.get(url)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    # Weak comparison, and any of several tags
+    for header in (f"W/{etag}", f'"other", {etag}', "*"):
+        response = test_client.get(url, headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+
+    response = test_client.get(url, headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.json() == first.json()
+
+
+def test_cache_hits_skip_the_database(
+    test_client, db_session, count_queries, location_id
+):
+    test_client.get("/locations/")
+    db_session.expunge_all()
+    with count_queries() as statements:
+        response = test_client.get("/locations/")
+    assert response.status_code == 200
+    assert statements == []
+    assert response_cache.stats()["hits"] == 1
+
+
+def test_writes_invalidate(test_client, location_id):
+    url = f"/locations/{location_id}"
+    etag = test_client.get(url).headers["etag"]
+    assert len(test_client.get("/locations/").json()) == 1
+
+    response = test_client.put(url, json=location_data(name="Renamed"))
+    assert response.status_code == 200
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response.headers["etag"] != etag
+
+    test_client.post("/locations/", json=location_data(name="Second"))
+    assert len(test_client.get("/locations/").json()) == 2
+
+
+def test_pending_distances_are_not_cached(
+    test_client, db_session, ors_client, location_id, run
+):
+    home_data = {
+        "name": "Test Home",
+        "address": {
+            "street": "1 Home St",
+            "city": "Testville",
+            "postal_code": "12345",
+            "country": "Testland",
+            "latitude": 12.35,
+            "longitude": 98.77,
+        },
+    }
+    home_id = test_client.post("/homes/", json=home_data).json()["id"]
+    url = f"/homes/{home_id}/distances"
+    assert test_client.get(url).json()["status"] == "pending"
+    assert test_client.get(url).json()["status"] == "pending"
+    assert response_cache.stats()["hits"] == 0
+
+    ors_client.get_duration_matrix_minutes.return_value = [[12.0]]
+    while run(process_next_job(db_session, ors_client)):
+        pass
+    body = test_client.get(url).json()
+    assert body["status"] == "ready"
+    assert [d["walking_distance_minutes"] for d in body["distances"]] == [12]
+    test_client.get(url)
+    assert response_cache.stats()["hits"] == 1
+
+    # A new location makes the home's distances pending again
+    test_client.post("/locations/", json=location_data(name="Second"))
+    assert test_client.get(url).json()["status"] == "pending"
+
+
+def test_redis_backend(monkeypatch, test_client, location_id):
+    server = fakeredis.FakeServer()
+    backend = RedisBackend(client=fakeredis.aioredis.FakeRedis(server=server))
+    monkeypatch.setattr(response_cache, "backend", backend)
+    url = f"/locations/{location_id}"
+
+    etag = test_client.get(url).headers["etag"]
+    assert test_client.get(url).headers["etag"] == etag
+    assert response_cache.stats()["hits"] == 1
+    test_client.put(url, json=location_data(name="Renamed"))
+    assert test_client.get(url).json()["name"] == "Renamed"
+
+    # Requests are served uncached while Redis is down, and writes still work
+    server.connected = False
+    response = test_client.put(url, json=location_data(name="Offline"))
+    assert response.status_code == 200
+    response = test_client.get(url)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Offline"
+    assert response_cache.stats()["hits"] == 1
@@ -0,0 +1,61 @@
+from unittest.mock import AsyncMock
+
+from sqlalchemy import func, select
+
+from app.models import RouteDuration
+from app.services.route_cache import RouteDurationCache
+
+
+def test_route_cache_only_fetches_missing_pairs(db_session, run):
+    cache = RouteDurationCache(maxsize=100, precision=4, persistent=True)
+    ors_client = AsyncMock()
+    home = (0.12181, 52.20531)
+    first, second = (0.1, 52.2), (0.2, 52.3)
+
+    ors_client.get_duration_matrix_minutes.return_value = [[5.0, None]]
+    assert run(
+        cache.get_duration_matrix_minutes(
+            db_session, ors_client, [home], [first, second]
+        )
+    ) == [[5.0, None]]
+
+    # Within the rounding precision counts as the same point
+    ors_client.get_duration_matrix_minutes.return_value = [[7.0]]
+    third = (0.3, 52.4)
+    assert run(
+        cache.get_duration_matrix_minutes(
+            db_session, ors_client, [(0.121812, 52.205312)], [first, second, third]
+        )
+    ) == [[5.0, None, 7.0]]
+    ors_client.get_duration_matrix_minutes.assert_called_with(
+        sources=[(0.121812, 52.205312)], destinations=[third], profile="foot-walking"
+    )
+
+    # A cold in-process cache is refilled from the table
+    cache.memory.clear()
+    assert run(
+        cache.get_duration_matrix_minutes(
+            db_session, ors_client, [home], [first, second, third]
+        )
+    ) == [[5.0, None, 7.0]]
+    assert ors_client.get_duration_matrix_minutes.call_count == 2
+    assert cache.stats()["database_hits"] == 3
+
+
+def test_route_cache_stores_every_new_pair_of_a_partly_cached_matrix(db_session, run):
+    cache = RouteDurationCache(maxsize=100, precision=4, persistent=True)
+    ors_client = AsyncMock()
+    a, b = (0.1, 52.1), (0.2, 52.2)
+    x, y = (0.3, 52.3), (0.4, 52.4)
+
+    ors_client.get_duration_matrix_minutes.return_value = [[1.0]]
+    run(cache.get_duration_matrix_minutes(db_session, ors_client, [a], [x]))
+    ors_client.get_duration_matrix_minutes.return_value = [[4.0]]
+    run(cache.get_duration_matrix_minutes(db_session, ors_client, [b], [y]))
+
+    # Both sources and destinations have a miss, so the whole 2 x 2 is fetched
+    ors_client.get_duration_matrix_minutes.return_value = [[1.5, 2.0], [3.0, 4.5]]
+    assert run(
+        cache.get_duration_matrix_minutes(db_session, ors_client, [a, b], [x, y])
+    ) == [[1.0, 2.0], [3.0, 4.0]]
+    assert run(db_session.scalar(select(func.count(RouteDuration.id)))) == 4
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import worker
+
+
+class StopWorker(Exception):
+    pass
+
+
+def test_worker_keeps_polling_after_errors(monkeypatch, ors_client, run):
+    polls = []
+    delays = []
+
+    async def poll(db, ors_client, retry):
+        polls.append(retry)
+        if len(polls) <= 2:
+            raise ConnectionError("database restarting")
+
+    async def sleep(delay):
+        delays.append(delay)
+        if len(delays) == 4:
+            raise StopWorker
+
+    async def wait_for_database_async():
+        pass
+
+    monkeypatch.setattr(worker, "poll", poll)
+    monkeypatch.setattr(worker, "asyncio", SimpleNamespace(sleep=sleep))
+    monkeypatch.setattr(worker, "wait_for_database_async", wait_for_database_async)
+    monkeypatch.setattr(worker, "create_routing_client", lambda: ors_client)
+    monkeypatch.setattr(worker, "POLL_INTERVAL_SECONDS", 1)
+    monkeypatch.setattr(worker, "MAX_BACKOFF_SECONDS", 3)
+
+    with pytest.raises(StopWorker):
+        run(worker.run_worker())
+
+    # Backs off while polls fail, then goes back to the usual interval
+    assert delays == [2, 3, 1, 1]
+    ors_client.aclose.assert_awaited_once()
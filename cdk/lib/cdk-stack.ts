@@ -109,29 +109,34 @@ export class CdkStack extends cdk.Stack {
       '/open_route_service_key'
     );
 
-    const container = taskDef.addContainer('LocatorContainer', {
-      image: ecs.ContainerImage.fromAsset(
-        path.resolve(__dirname, '../../backend')
+    // The API and the distance worker run from the same image and settings
+    const image = ecs.ContainerImage.fromAsset(
+      path.resolve(__dirname, '../../backend')
+    );
+    const environment = {
+      CF_ZONE_ID: cfZoneId,
+      CF_RECORD_ID: cfRecordId,
+      CF_API_TOKEN: cfApiToken,
+      DB_HOST: db.dbInstanceEndpointAddress,
+      DB_PORT: db.dbInstanceEndpointPort,
+      AUTH_HASH_SECRET_KEY: hashSecret,
+      OPENROUTESERVICE_API_KEY: openRouteServiceAPIKey,
+      DB_NAME: 'appdb',
+      DB_USER: 'postgres',
+      STAGE: 'PROD',
+    };
+    const secrets = {
+      DB_PASSWORD: ecs.Secret.fromSecretsManager(
+        dbCredentialsSecret,
+        'password'
       ),
+    };
+
+    const container = taskDef.addContainer('LocatorContainer', {
+      image,
       logging: ecs.LogDriver.awsLogs({ streamPrefix: 'AppLogs' }),
-      environment: {
-        CF_ZONE_ID: cfZoneId,
-        CF_RECORD_ID: cfRecordId,
-        CF_API_TOKEN: cfApiToken,
-        DB_HOST: db.dbInstanceEndpointAddress,
-        DB_PORT: db.dbInstanceEndpointPort,
-        AUTH_HASH_SECRET_KEY: hashSecret,
-        OPENROUTESERVICE_API_KEY: openRouteServiceAPIKey,
-        DB_NAME: 'appdb',
-        DB_USER: 'postgres',
-        STAGE: 'PROD',
-      },
-      secrets: {
-        DB_PASSWORD: ecs.Secret.fromSecretsManager(
-          dbCredentialsSecret,
-          'password'
-        ),
-      },
+      environment,
+      secrets,
     });
 
     container.addPortMappings({ containerPort: 80 });
@@ -150,5 +155,35 @@ export class CdkStack extends cdk.Stack {
       ec2.Port.tcp(80),
       'Allow public HTTP access on port 80'
     );
+
+    // Computes the distances the API queues, ECS replaces the task if it exits
+    const workerTaskDef = new ecs.FargateTaskDefinition(
+      this,
+      'LocatorWorkerTaskDef',
+      {
+        memoryLimitMiB: 512,
+        cpu: 256,
+      }
+    );
+
+    workerTaskDef.addContainer('LocatorWorkerContainer', {
+      image,
+      command: ['python', '-m', 'app.worker'],
+      logging: ecs.LogDriver.awsLogs({ streamPrefix: 'WorkerLogs' }),
+      environment,
+      secrets,
+    });
+
+    // In a public subnet with a public IP to reach ORS, as there is no NAT
+    // gateway, but nothing is allowed in
+    new ecs.FargateService(this, 'LocatorWorkerService', {
+      cluster,
+      taskDefinition: workerTaskDef,
+      assignPublicIp: true,
+      desiredCount: 1,
+      vpcSubnets: {
+        subnetType: ec2.SubnetType.PUBLIC,
+      },
+    });
   }
 }